@@ -3,8 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager, current_user, login_required
 from config import Config
+from app.utils.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login = LoginManager()
 login.login_view = 'auth.login'
@@ -20,9 +21,34 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    from app.utils.db_profiles import apply_engine_profile, attach_engine_events
+    apply_engine_profile(app)
+    from app.utils.replicas import replicas
+    replicas.init_app(app)
     db.init_app(app)
+    with app.app_context():
+        attach_engine_events(app, db.engines.values())
     migrate.init_app(app, db)
     login.init_app(app)
+
+    from app.utils.notify_hub import hub
+    hub.init_app(app)
+
+    from app.utils.refdata import refdata
+    refdata.init_app(app)
+
+    from app.utils.exchange_rate import rate_service
+    rate_service.init_app(app)
+
+    from app.utils.outbox import dispatcher
+    dispatcher.init_app(app)
+
+    from app.utils.metrics import metrics
+    metrics.init_app(app)
+
+    from app.utils.user_cache import user_cache
+    user_cache.init_app(app)
+
     from app.categories import bp as categories_bp
     app.register_blueprint(categories_bp)
 
@@ -35,6 +61,12 @@ def create_app(config_class=Config):
     from app.expenses import bp as expenses_bp
     app.register_blueprint(expenses_bp, url_prefix='/expenses')
 
+    from app.jobs import bp as jobs_bp
+    app.register_blueprint(jobs_bp, url_prefix='/jobs')
+
+    from app.messages import bp as messages_bp
+    app.register_blueprint(messages_bp, url_prefix='/messages')
+
     @app.route('/')
     def index():
         # Nếu đã đăng nhập → chuyển sang trang nhóm
@@ -43,5 +75,8 @@ def create_app(config_class=Config):
         # Nếu chưa → hiển thị trang chủ với nút đăng nhập / đăng ký
         return render_template('index.html')
     
+    from app.cli import register_commands
+    register_commands(app)
+
     app.jinja_env.filters['currency_vnd'] = currency_vnd
     return app
\ No newline at end of file
@@ -1,9 +1,14 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify
+import json
+from flask import render_template, redirect, url_for, flash, request, jsonify, Response, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.auth import bp
 from app.models import User, Friendship, Notification
+from app.utils.notify_hub import hub, OVERFLOW
+from app.utils.replicas import read_only
+from app.utils.search import search_users, min_query_length, SUGGEST_SIZE
+from app.utils.notification_counts import unread_count, mark_read
 
 # ------------------ ĐĂNG NHẬP ------------------
 @bp.route('/login', methods=['GET', 'POST'])
@@ -65,31 +70,157 @@ def profile():
 # ------------------ TÌM KIẾM NGƯỜI DÙNG ------------------
 @bp.route('/search_friends', methods=['GET'])
 @login_required
+@read_only
 def search_friends():
+    """Tìm theo tiền tố tên / email qua index; bạn bè và người chung nhóm lên trước."""
     query = request.args.get('q', '').strip()
-    results = []
+    cursor = request.args.get('after')
+    results, next_cursor = search_users(current_user.id, query, cursor=cursor)
+    return render_template('search_friends.html', query=query, results=results,
+                           next_cursor=next_cursor, min_length=min_query_length())
 
-    if query:
-        results = User.query.filter(
-            (User.username.ilike(f"%{query}%")) | (User.email.ilike(f"%{query}%"))
-        ).all()
 
-    return render_template('search_friends.html', query=query, results=results)
+@bp.route('/search_friends/suggest', methods=['GET'])
+@login_required
+@read_only
+def search_friends_suggest():
+    """Autocomplete: vài kết quả đầu cho ô tìm kiếm (JSON)."""
+    query = request.args.get('q', '').strip()
+    results, _ = search_users(current_user.id, query, limit=SUGGEST_SIZE)
+    return jsonify([{
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "avatar": user.avatar,
+        "tier": tier
+    } for user, tier in results])
+
+
+NOTIFICATION_PAGE_SIZE = 20
+NOTIFICATION_PAGE_MAX = 100
 
 
 @bp.route('/notifications_data')
 @login_required
+@read_only
 def notifications_data():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).all()
-
-    notif_list = []
-    for n in notifications:
-        notif_list.append({
-            "id": n.id,
-            "message": n.message,
-            "is_read": n.is_read,
-            "created_at": n.created_at.strftime("%d/%m/%Y %H:%M"),
-            "link": n.link or "#"
-        })
-
-    return jsonify(notif_list)
\ No newline at end of file
+    """
+    Trả về thông báo mới nhất (không có since_id) hoặc chỉ các thông báo có
+    id > since_id. Kèm ETag theo id mới nhất và số chưa đọc; request có
+    If-None-Match khớp → 304.
+    """
+    since_id = request.args.get('since_id', type=int)
+    limit = request.args.get('limit', NOTIFICATION_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, NOTIFICATION_PAGE_MAX))
+
+    q = Notification.query.filter_by(user_id=current_user.id)
+    if since_id is not None:
+        # Lấy phần chênh lệch theo thứ tự tăng dần để không bỏ sót khi has_more
+        rows = q.filter(Notification.id > since_id).order_by(Notification.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+    else:
+        rows = q.order_by(Notification.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+    latest_id = rows[0].id if rows else (since_id or 0)
+    # Kèm số chưa đọc: mark_read đổi is_read mà không đổi latest_id
+    etag = f"notif-{current_user.id}-{latest_id}-{unread_count(current_user.id)}"
+
+    response = jsonify({
+        "items": [n.to_dict() for n in rows],
+        "latest_id": latest_id,
+        "has_more": has_more
+    })
+    # 304 chỉ khi client gửi If-None-Match khớp (make_conditional)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+@bp.route('/notifications/unread_count')
+@login_required
+@read_only
+def notifications_unread_count():
+    """Số thông báo chưa đọc (badge): đọc một dòng bộ đếm; ETag theo số đó → 304."""
+    count = unread_count(current_user.id)
+    response = jsonify({"unread": count})
+    response.set_etag(f"unread-{current_user.id}-{count}", weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+@bp.route('/notifications/mark_read', methods=['POST'])
+@login_required
+def notifications_mark_read():
+    """Đánh dấu đã đọc tất cả, hoặc các thông báo có id <= up_to_id, bằng một câu UPDATE."""
+    data = request.get_json(silent=True) or request.form
+    up_to_id = data.get('up_to_id', request.args.get('up_to_id'))
+    try:
+        up_to_id = int(up_to_id) if up_to_id not in (None, '') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "up_to_id không hợp lệ."}), 400
+    marked = mark_read(current_user.id, up_to_id)
+    db.session.commit()
+    if not request.is_json and request.form:
+        return redirect(request.referrer or url_for('index'))
+    return jsonify({"marked": marked, "unread": unread_count(current_user.id)})
+
+
+def _sse(item):
+    return f"id: {item['id']}\nevent: notification\ndata: {json.dumps(item, ensure_ascii=False)}\n\n"
+
+
+@bp.route('/notifications/stream')
+@login_required
+def notifications_stream():
+    """
+    Kênh Server-Sent Events đẩy thông báo mới. Khi kết nối lại, trình duyệt
+    gửi Last-Event-ID (hoặc ?last_event_id= lần đầu) để lấy bù phần bị lỡ.
+    Worker đã đủ kết nối SSE → 503, client chuyển sang poll since_id.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('last_event_id', type=int)
+    heartbeat = current_app.config['NOTIFICATION_STREAM_HEARTBEAT']
+
+    # Đăng ký trước khi đọc backlog để không hở khoảng nào
+    if last_event_id is None:
+        last_event_id = db.session.query(db.func.max(Notification.id)).filter(
+            Notification.user_id == current_user.id
+        ).scalar() or 0
+    sub = hub.subscribe(current_user.id, floor=last_event_id)
+    if sub is None:
+        response = jsonify({"error": "Kênh thông báo đang đầy, hãy dùng /auth/notifications_data."})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    rows = Notification.query.filter(
+        Notification.user_id == current_user.id,
+        Notification.id > last_event_id
+    ).order_by(Notification.id).limit(NOTIFICATION_PAGE_MAX).all()
+    backlog = [n.to_dict() for n in rows]
+    for item in backlog:
+        sub.mark_delivered(item["id"])
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            for item in backlog:
+                yield _sse(item)
+            while True:
+                item = sub.get(timeout=heartbeat)
+                if item is None:
+                    yield ": ping\n\n"
+                elif item is OVERFLOW:
+                    break
+                else:
+                    yield _sse(item)
+        finally:
+            hub.unsubscribe(sub)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
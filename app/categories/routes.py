@@ -3,11 +3,27 @@ from flask_login import login_required
 from app import db
 from app.categories import bp
 from app.models import Category
+from app.utils.refdata import refdata
+from collections import namedtuple
+
+CategoryRecord = namedtuple('CategoryRecord', 'id name icon')
+
+
+@refdata.loader('categories')
+def load_categories():
+    rows = db.session.query(Category.id, Category.name, Category.icon).order_by(Category.id).all()
+    return tuple(CategoryRecord(*r) for r in rows)
+
+
+def cached_categories():
+    """Danh sách loại chi tiêu (id, name, icon) từ cache dữ liệu tham chiếu."""
+    return refdata.get('categories')
+
 
 @bp.route('/list')
 @login_required
 def list_categories():
-    categories = Category.query.all()
+    categories = cached_categories()
     return render_template('categories.html', categories=categories)
 
 @bp.route('/new', methods=['GET', 'POST'])
@@ -23,6 +39,7 @@ def new_category():
 
         cat = Category(name=name, icon=icon)
         db.session.add(cat)
+        refdata.invalidate('categories')
         db.session.commit()
         flash("Đã thêm loại chi tiêu mới!", "success")
         return redirect(url_for('categories.list_categories'))
@@ -34,6 +51,7 @@ def new_category():
 def delete_category(cat_id):
     cat = Category.query.get_or_404(cat_id)
     db.session.delete(cat)
+    refdata.invalidate('categories')
     db.session.commit()
     flash("Đã xóa loại chi tiêu!", "success")
     return redirect(url_for('categories.list_categories'))
@@ -0,0 +1,285 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from app import db
+
+balances_cli = AppGroup('balances', help='Quản lý sổ cái số dư group_balance.')
+
+
+def _groups(group_id):
+    from app.models import Group
+    q = Group.query.order_by(Group.id)
+    if group_id is not None:
+        q = q.filter(Group.id == group_id)
+    return q.all()
+
+
+@balances_cli.command('rebuild')
+@click.option('--group-id', type=int, default=None, help='Chỉ rebuild một nhóm.')
+def rebuild_balances(group_id):
+    """Tính lại sổ cái từ lịch sử chi tiêu rồi kiểm tra lại."""
+    from app.utils.balances import rebuild_group_balances, verify_group_balances
+    groups = _groups(group_id)
+    for group in groups:
+        rebuild_group_balances(group)
+    db.session.commit()
+
+    failed = 0
+    for group in groups:
+        problems = verify_group_balances(group)
+        failed += len(problems)
+        for uid, problem in problems:
+            click.echo(f"❌ group {group.id} user {uid}: {problem}")
+    click.echo(f"Đã rebuild {len(groups)} nhóm, {failed} sai lệch.")
+    if failed:
+        raise SystemExit(1)
+
+
+@balances_cli.command('verify')
+@click.option('--group-id', type=int, default=None, help='Chỉ kiểm tra một nhóm.')
+def verify_balances(group_id):
+    """So sánh sổ cái với kết quả tính lại toàn bộ (không ghi gì)."""
+    from app.utils.balances import verify_group_balances
+    failed = 0
+    groups = _groups(group_id)
+    for group in groups:
+        for uid, problem in verify_group_balances(group):
+            failed += 1
+            click.echo(f"❌ group {group.id} user {uid}: {problem}")
+    click.echo(f"Đã kiểm tra {len(groups)} nhóm, {failed} sai lệch.")
+    if failed:
+        raise SystemExit(1)
+
+
+analytics_cli = AppGroup('analytics', help='Bảng thống kê chi tiêu group_spending.')
+
+
+def _echo_spending_problems(group, problems):
+    for (category_id, year_month), problem in problems:
+        click.echo(f"❌ group {group.id} loại {category_id} tháng {year_month}: {problem}")
+
+
+@analytics_cli.command('rebuild')
+@click.option('--group-id', type=int, default=None, help='Chỉ rebuild một nhóm.')
+def rebuild_spending(group_id):
+    """Tính lại bảng thống kê từ lịch sử chi tiêu rồi kiểm tra lại."""
+    from app.utils.analytics import rebuild_group_spending, verify_group_spending
+    groups = _groups(group_id)
+    cells = 0
+    for group in groups:
+        cells += rebuild_group_spending(group.id)
+        db.session.commit()
+
+    failed = 0
+    for group in groups:
+        problems = verify_group_spending(group.id)
+        failed += len(problems)
+        _echo_spending_problems(group, problems)
+    click.echo(f"Đã rebuild thống kê {len(groups)} nhóm ({cells} dòng), {failed} sai lệch.")
+    if failed:
+        raise SystemExit(1)
+
+
+@analytics_cli.command('verify')
+@click.option('--group-id', type=int, default=None, help='Chỉ kiểm tra một nhóm.')
+def verify_spending(group_id):
+    """So sánh bảng thống kê với kết quả tính lại toàn bộ (không ghi gì)."""
+    from app.utils.analytics import verify_group_spending
+    failed = 0
+    groups = _groups(group_id)
+    for group in groups:
+        problems = verify_group_spending(group.id)
+        failed += len(problems)
+        _echo_spending_problems(group, problems)
+    click.echo(f"Đã kiểm tra thống kê {len(groups)} nhóm, {failed} sai lệch.")
+    if failed:
+        raise SystemExit(1)
+
+
+rates_cli = AppGroup('rates', help='Tỷ giá ngoại tệ.')
+
+
+@rates_cli.command('refresh')
+@click.argument('currencies', nargs=-1)
+def refresh_rates(currencies):
+    """Lấy tỷ giá mới từ provider live và lưu làm last-known-good."""
+    from app.utils.exchange_rate import rate_service
+    updated = rate_service.refresh([c.upper() for c in currencies] or None)
+    for currency, rate in sorted(updated.items()):
+        click.echo(f"{currency}: {rate:,.2f} VND")
+    if not updated:
+        click.echo("⚠️ Không provider live nào trả về tỷ giá.")
+        raise SystemExit(1)
+
+
+expenses_cli = AppGroup('expenses', help='Chi tiêu.')
+
+
+@expenses_cli.command('import')
+@click.argument('group_id', type=int)
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--as', 'email', required=True, help='Email người thực hiện nhập (created_by).')
+def import_expenses_command(group_id, path, email):
+    """Nhập chi tiêu từ file CSV/XLSX có bố cục giống file xuất."""
+    from flask import current_app
+    from app.models import Group, User
+    from app.utils.expense_import import import_expenses, read_rows, ImportValidationError
+
+    group = db.session.get(Group, group_id)
+    user = User.query.filter_by(email=email).first()
+    if group is None or user is None:
+        raise click.ClickException('Không tìm thấy nhóm hoặc người dùng.')
+
+    with open(path, 'rb') as f, current_app.test_request_context():
+        try:
+            count, total = import_expenses(group, read_rows(f, path), user)
+        except ImportValidationError as e:
+            db.session.rollback()
+            for line, message in e.errors:
+                click.echo(f"❌ dòng {line}: {message}")
+            raise SystemExit(1)
+        db.session.commit()
+    click.echo(f"Đã nhập {count} chi tiêu ({total:,.0f} VND) vào nhóm {group.name}.")
+
+
+outbox_cli = AppGroup('outbox', help='Outbox thông báo.')
+
+
+@outbox_cli.command('dispatch')
+@click.option('--loop', is_flag=True, help='Chạy liên tục (dùng khi OUTBOX_DISPATCH_MODE=external).')
+@click.option('--interval', type=float, default=2.0, show_default=True)
+def dispatch_outbox(loop, interval):
+    """Phát các sự kiện outbox chưa được phát."""
+    import time
+    from app.utils.outbox import dispatch_pending
+    while True:
+        total = 0
+        while True:
+            done = dispatch_pending()
+            total += done
+            if not done:
+                break
+        if total or not loop:
+            click.echo(f"Đã phát {total} sự kiện.")
+        if not loop:
+            break
+        time.sleep(interval)
+
+
+@click.command('worker')
+@click.option('--threads', type=int, default=4, show_default=True, help='Số job chạy song song.')
+@click.option('--type', 'job_types', multiple=True, help='Chỉ nhận các loại job này (lặp lại được).')
+@click.option('--visibility-timeout', type=int, default=300, show_default=True,
+              help='Số giây giữ job trước khi worker khác được nhận lại.')
+@click.option('--poll-interval', type=float, default=1.0, show_default=True)
+@with_appcontext
+def worker_command(threads, job_types, visibility_timeout, poll_interval):
+    """Chạy worker xử lý hàng đợi công việc nền."""
+    import signal
+    from flask import current_app
+    from app.utils.jobs import HANDLERS, Worker
+
+    unknown = set(job_types) - set(HANDLERS)
+    if unknown:
+        raise click.ClickException(f"Loại job không tồn tại: {', '.join(sorted(unknown))}")
+
+    worker = Worker(current_app._get_current_object(), job_types=list(job_types) or None, threads=threads,
+                    visibility_timeout=visibility_timeout, poll_interval=poll_interval)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop())
+    click.echo(f"Worker {worker.worker_id} nhận: {', '.join(worker.job_types)}")
+    worker.run()
+    click.echo("Worker đã dừng.")
+
+
+replica_cli = AppGroup('replica', help='DB replica chỉ đọc.')
+
+
+@replica_cli.command('sync')
+def sync_replicas():
+    """Chép DB primary sang các replica SQLite (thử định tuyến replica cục bộ)."""
+    import sqlite3
+    from app.utils.replicas import REPLICA_PREFIX
+    primary = db.engine
+    if primary.dialect.name != 'sqlite':
+        raise click.ClickException('Chỉ hỗ trợ primary SQLite; với PostgreSQL hãy dùng streaming replication.')
+    replica_keys = sorted(k for k in db.engines if isinstance(k, str) and k.startswith(REPLICA_PREFIX))
+    if not replica_keys:
+        raise click.ClickException('Chưa cấu hình DB_REPLICA_URLS.')
+    for key in replica_keys:
+        engine = db.engines[key]
+        if engine.dialect.name != 'sqlite':
+            click.echo(f"⚠️ {key}: bỏ qua (không phải SQLite)")
+            continue
+        engine.dispose()
+        src = sqlite3.connect(primary.url.database)
+        dst = sqlite3.connect(engine.url.database)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        click.echo(f"{key}: đã chép {primary.url.database} → {engine.url.database}")
+
+
+@click.command('seed-load')
+@click.option('--users', type=int, default=100, show_default=True)
+@click.option('--groups', type=int, default=10, show_default=True)
+@click.option('--members', type=int, default=5, show_default=True, help='Số thành viên mỗi nhóm.')
+@click.option('--expenses', type=int, default=10000, show_default=True, help='Tổng số chi tiêu (chia đều các nhóm).')
+@click.option('--notifications', type=int, default=50, show_default=True, help='Số thông báo mỗi user.')
+@click.option('--days', type=int, default=730, show_default=True, help='Rải ngày chi tiêu trong N ngày gần nhất.')
+@click.option('--seed', type=int, default=42, show_default=True)
+@with_appcontext
+def seed_load_command(users, groups, members, expenses, notifications, days, seed):
+    """Sinh dữ liệu giả quy mô lớn để đo hiệu năng (mật khẩu: password)."""
+    import time
+    from app.utils.seed_load import seed_load
+    t0 = time.perf_counter()
+    seed_load(users=users, groups=groups, members=members, expenses=expenses,
+              notifications=notifications, days=days, seed=seed, progress=click.echo)
+    click.echo(f"Xong sau {time.perf_counter() - t0:.1f}s.")
+
+
+notifications_cli = AppGroup('notifications', help='Thông báo.')
+
+
+@notifications_cli.command('rebuild-counters')
+def rebuild_notification_counters():
+    """Tính lại bộ đếm thông báo chưa đọc của mọi user từ bảng notification."""
+    from app.utils.notification_counts import rebuild_counters
+    click.echo(f"Đã tính lại bộ đếm cho {rebuild_counters()} user có thông báo chưa đọc.")
+
+
+search_cli = AppGroup('search', help='Index tìm kiếm.')
+
+
+@search_cli.command('rebuild')
+def rebuild_search():
+    """Tạo (nếu thiếu) và dựng lại index tìm kiếm người dùng và chi tiêu."""
+    from app.utils.search import rebuild_user_index, rebuild_expense_index
+    click.echo(f"Đã dựng lại index người dùng (backend: {rebuild_user_index()}).")
+    click.echo(f"Đã dựng lại index chi tiêu (backend: {rebuild_expense_index()}).")
+
+
+messages_cli = AppGroup('messages', help='Tin nhắn trực tiếp.')
+
+
+@messages_cli.command('rebuild')
+def rebuild_messages():
+    """Gán hội thoại cho tin nhắn cũ và tính lại bộ đếm chưa đọc từ bảng message."""
+    from app.utils.messaging import rebuild_conversations
+    click.echo(f"Đã tính lại {rebuild_conversations()} hội thoại.")
+
+
+def register_commands(app):
+    app.cli.add_command(balances_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(rates_cli)
+    app.cli.add_command(expenses_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(seed_load_command)
+    app.cli.add_command(replica_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(messages_cli)
+    app.cli.add_command(notifications_cli)
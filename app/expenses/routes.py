@@ -1,107 +1,120 @@
-from flask import render_template, request, redirect, url_for, flash, Response, send_file, current_app
+from flask import render_template, request, redirect, url_for, flash, Response, send_file, current_app, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.expenses import bp
 from app.models import Expense, Group, Notification, User, ExpenseShare
-from io import BytesIO
 from datetime import datetime, date
-from openpyxl import Workbook
-from sqlalchemy import func
-from app.utils.exchange_rate import get_exchange_rate
-
-
-def get_exchange_rate_to_vnd(currency):
-    """
-    Trả về tỷ giá 1 <currency> = X VND (cố định)
-    Ví dụ: 1 USD = 25,000 VND
-    """
-    fixed_rates = {
-        "VND": 1.0,
-        "USD": 25000.0,
-        "EUR": 27000.0,
-        "JPY": 170.0,
-        "KRW": 20.0,
-        "SGD": 18000.0,
-        "THB": 700.0
-    }
-
-    cur = (currency or "VND").upper()
-    return fixed_rates.get(cur, 1.0)  
-
-
-@bp.route('/<int:group_id>/list')
-@login_required
-def expense_list(group_id):
-    group = Group.query.get_or_404(group_id)
-
-    q = Expense.query.filter_by(group_id=group_id)
-    _from = request.args.get('from')
-    _to = request.args.get('to')
-    user_id = request.args.get('user_id')
-
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import joinedload
+from app.utils.exchange_rate import get_exchange_rate, ExchangeRateUnavailable, UnsupportedCurrency
+from app.utils.balances import record_expense, record_settlement
+from app.utils.analytics import record_spending
+from app.utils.settlement import suggest_settlements
+from app.utils.outbox import enqueue
+from app.utils.expense_export import export_query, iter_rows, stream_csv, write_xlsx
+from app.utils.expense_import import import_expenses, read_rows, ImportValidationError
+from app.utils.jobs import enqueue_job
+from app.categories.routes import cached_categories
+from app.utils.replicas import read_only
+from app.utils.notification_counts import add_notifications
+from app.utils.search import expense_match
+
+
+def expense_filters(group_id, args):
+    """Điều kiện lọc dùng chung cho danh sách và xuất file: q, from, to, user_id, category_id."""
+    filters = [Expense.group_id == group_id]
+    _from = args.get('from')
+    _to = args.get('to')
+    user_id = args.get('user_id')
+    category_id = args.get('category_id')
+    query = (args.get('q') or '').strip()
+
+    if query:
+        # Tìm toàn văn trong tiêu đề / ghi chú (index FTS5 / tsvector, bỏ dấu)
+        match = expense_match(group_id, query)
+        if match is not None:
+            filters.append(match)
     if _from:
         try:
-            from_dt = datetime.strptime(_from, '%Y-%m-%d')
-            q = q.filter(Expense.date >= from_dt)
-        except:
+            filters.append(Expense.date >= datetime.strptime(_from, '%Y-%m-%d'))
+        except ValueError:
             pass
     if _to:
         try:
-            to_dt = datetime.strptime(_to, '%Y-%m-%d')
-            q = q.filter(Expense.date <= to_dt)
-        except:
+            filters.append(Expense.date <= datetime.strptime(_to, '%Y-%m-%d'))
+        except ValueError:
             pass
     if user_id:
         try:
-            uid = int(user_id)
-            q = q.filter_by(user_id=uid)
-        except:
+            filters.append(Expense.user_id == int(user_id))
+        except ValueError:
+            pass
+    if category_id:
+        try:
+            filters.append(Expense.category_id == int(category_id))
+        except ValueError:
             pass
+    return filters
 
-    expenses = q.order_by(Expense.date.desc()).all()
-    total = sum(e.amount for e in expenses)
+
+EXPENSE_PAGE_SIZE = 50
+
+
+def encode_cursor(expense):
+    return f"{expense.date.isoformat()}_{expense.id}"
+
+
+def decode_cursor(cursor):
+    """Trả về (date, id) hoặc None nếu cursor không hợp lệ."""
+    try:
+        date_part, id_part = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+
+@bp.route('/<int:group_id>/list')
+@login_required
+@read_only
+def expense_list(group_id):
+    group = Group.query.get_or_404(group_id)
+    filters = expense_filters(group_id, request.args)
+
+    # 🔹 Phân trang keyset theo (date, id) giảm dần: chi phí mỗi trang không đổi
+    q = Expense.query.options(
+        joinedload(Expense.payer), joinedload(Expense.category)
+    ).filter(*filters)
+    cursor = decode_cursor(request.args.get('cursor'))
+    if cursor:
+        c_date, c_id = cursor
+        q = q.filter(or_(Expense.date < c_date, and_(Expense.date == c_date, Expense.id < c_id)))
+    expenses = q.order_by(Expense.date.desc(), Expense.id.desc()).limit(EXPENSE_PAGE_SIZE + 1).all()
+    next_cursor = None
+    if len(expenses) > EXPENSE_PAGE_SIZE:
+        expenses = expenses[:EXPENSE_PAGE_SIZE]
+        next_cursor = encode_cursor(expenses[-1])
+
+    # 🔹 Tổng quy đổi VND: trang hiện tại và toàn bộ kết quả lọc (SUM trong SQL)
+    page_total = sum(e.base_amount_vnd or 0 for e in expenses)
+    total = db.session.query(func.coalesce(func.sum(Expense.base_amount_vnd), 0)).filter(*filters).scalar()
+    filter_args = {k: v for k, v in request.args.items() if k != 'cursor' and v}
 
     # 🔹 Tính tổng chi / nợ từng thành viên
-    member_balances = group.calculate_balances()
-
-    # 🔹 Tính toán gợi ý nợ nần (settlement)
-    debt_suggestions = []
-    creditors = []  # người được nhận (balance > 0)
-    debtors = []    # người nợ (balance < 0)
-
-    for member in group.members:
-        bal = member_balances[member.id]["balance"]
-        if bal > 0:
-            creditors.append({"user": member, "amount": bal})
-        elif bal < 0:
-            debtors.append({"user": member, "amount": -bal})
-
-    # 🔄 Thuật toán cân bằng nợ
-    creditors.sort(key=lambda x: x["amount"], reverse=True)
-    debtors.sort(key=lambda x: x["amount"], reverse=True)
-
-    i, j = 0, 0
-    while i < len(debtors) and j < len(creditors):
-        debtor = debtors[i]
-        creditor = creditors[j]
-        amount = min(debtor["amount"], creditor["amount"])
-        debt_suggestions.append({
-            "from": debtor["user"],
-            "to": creditor["user"],
-            "amount": amount
-        })
-        debtor["amount"] -= amount
-        creditor["amount"] -= amount
-        if debtor["amount"] == 0:
-            i += 1
-        if creditor["amount"] == 0:
-            j += 1
+    member_balances = group.get_balances()
+
+    # 🔹 Gợi ý thanh toán nợ (số nguyên, cache theo revision của nhóm)
+    debt_suggestions = suggest_settlements(group, member_balances)
 
     return render_template(
         'expenses.html',
         group=group,
         expenses=expenses,
         total=total,
+        page_total=page_total,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
+        filter_args=filter_args,
+        categories=cached_categories(),
         member_balances=member_balances,
         debt_suggestions=debt_suggestions
     )
@@ -109,10 +122,9 @@ def expense_list(group_id):
 @bp.route('/<int:group_id>/new', methods=['GET', 'POST'])
 @login_required
 def expense_new(group_id):
-    from app.models import Category
     group = Group.query.get_or_404(group_id)
     members = group.members
-    categories = Category.query.all()
+    categories = cached_categories()
     shares = []
 
     if request.method == 'POST':
@@ -123,7 +135,11 @@ def expense_new(group_id):
         notes = request.form.get('note', '')
         currency = request.form['currency']
 
-        rate = get_exchange_rate(currency, "VND")
+        try:
+            rate = get_exchange_rate(currency, "VND")
+        except ExchangeRateUnavailable:
+            flash(f'Không lấy được tỷ giá {currency}, vui lòng thử lại sau.', 'danger')
+            return redirect(url_for('expenses.expense_new', group_id=group_id))
         base_amount_vnd = round(amount * rate, 2)
         category_id = request.form.get('category_id')
 
@@ -170,17 +186,17 @@ def expense_new(group_id):
                 db.session.rollback()
                 return redirect(url_for('expenses.expense_new', group_id=group_id))
         db.session.add_all(shares)
-
-    # 🟢 GỬI THÔNG BÁO cho các thành viên khác
-        for member in group.members:
-            if member.id != current_user.id:
-                notif = Notification(
-                    user_id=member.id,
-                    message=f"{current_user.username} đã thêm chi tiêu mới: {title} ({expense.amount_formatted})",
-                    link=url_for('expenses.expense_detail', expense_id=expense.id),
-                    type="expense"
-                )
-                db.session.add(notif)
+        record_expense(expense, shares)
+        record_spending(expense)
+
+        # 🟢 GỬI THÔNG BÁO cho các thành viên khác: ghi 1 sự kiện outbox,
+        # dispatcher nền sẽ tạo thông báo cho từng thành viên
+        enqueue(
+            'expense_created', group_id, current_user.id,
+            message=f"{current_user.username} đã thêm chi tiêu mới: {title} ({expense.amount_formatted})",
+            link=url_for('expenses.expense_detail', expense_id=expense.id),
+            type="expense"
+        )
 
         db.session.commit()
         flash('Thêm chi tiêu thành công và thông báo đã được gửi!', 'success')
@@ -198,36 +214,72 @@ def delete_expense(expense_id):
         return redirect(url_for('expenses.expense_list', group_id=expense.group_id))
 
     group_id = expense.group_id
+    record_expense(expense, expense.shares, sign=-1)
+    record_spending(expense, sign=-1)
     db.session.delete(expense)
     db.session.commit()
     flash('Xóa chi tiêu thành công!', 'success')
     return redirect(url_for('expenses.expense_list', group_id=group_id))
 
-# export excel
+# export excel / csv
 @bp.route('/<int:group_id>/export')
 @login_required
+@read_only
 def export_expenses(group_id):
     group = Group.query.get_or_404(group_id)
-    expenses = Expense.query.filter_by(group_id=group_id).order_by(Expense.date).all()
+    fmt = request.args.get('format', 'xlsx')
+    filters = expense_filters(group_id, request.args)
+
+    # Export lớn (hoặc ?async=1) chạy bằng `flask worker`, trả về trang theo dõi job
+    if request.args.get('async') == '1' or \
+            db.session.query(func.count(Expense.id)).filter(*filters).scalar() > current_app.config['EXPORT_ASYNC_THRESHOLD']:
+        args = {k: v for k, v in request.args.items() if k not in ('async', 'format')}
+        job = enqueue_job('expenses.export', {"group_id": group_id, "format": fmt, "args": args},
+                          created_by=current_user.id)
+        db.session.commit()
+        return redirect(url_for('jobs.job_detail', job_id=job.id))
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"Group_{group_id}_expenses"
-    ws.append(["Tên chi tiêu", "Số tiền", "Ngày tạo", "Ghi chú", "Người trả"])
+    rows = iter_rows(export_query(filters))
+
+    if fmt == 'csv':
+        return Response(
+            stream_with_context(stream_csv(rows)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename=group_{group.id}_expenses.csv'}
+        )
+
+    tmp = write_xlsx(rows, title=f"Group_{group.id}_expenses")
+    filename = f"group_{group.id}_expenses.xlsx"
+    return send_file(tmp, as_attachment=True, download_name=filename, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+@bp.route('/<int:group_id>/import', methods=['GET', 'POST'])
+@login_required
+def import_expenses_view(group_id):
+    group = Group.query.get_or_404(group_id)
+    errors = []
+
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or not file.filename:
+            flash('Vui lòng chọn file CSV hoặc Excel.', 'danger')
+            return redirect(url_for('expenses.import_expenses_view', group_id=group_id))
+        try:
+            count, total = import_expenses(group, read_rows(file.stream, file.filename), current_user)
+        except ImportValidationError as e:
+            db.session.rollback()
+            errors = e.errors
+            flash('File có dòng không hợp lệ, chưa có chi tiêu nào được nhập.', 'danger')
+        else:
+            db.session.commit()
+            flash(f'Đã nhập {count} chi tiêu ({total:,.0f} ₫).'.replace(",", "."), 'success')
+            return redirect(url_for('expenses.expense_list', group_id=group_id))
 
-    for e in expenses:
-        payer = User.query.get(e.user_id)
-        payer_name = payer.username if payer else ""
-        ws.append([e.title, int(round(e.amount)), e.currency, int(round(e.base_amount_vnd)), e.date.strftime('%Y-%m-%d'), e.note or "", payer_name])
-    bio = BytesIO()
-    wb.save(bio)
-    bio.seek(0)
+    return render_template('import_expenses.html', group=group, errors=errors)
 
-    filename = f"group_{group_id}_expenses.xlsx"
-    return send_file(bio, as_attachment=True, download_name=filename, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
 @bp.route('/detail/<int:expense_id>')
 @login_required
+@read_only
 def expense_detail(expense_id):
     expense = Expense.query.get_or_404(expense_id)
     shares = ExpenseShare.query.filter_by(expense_id=expense.id).all()
@@ -265,7 +317,7 @@ def remind_payment(to_user_id):
         type='payment_reminder',
         created_at=datetime.utcnow()
     )
-    db.session.add(notif)
+    add_notifications([notif])
     db.session.commit()
 
     flash(f'✅ Đã gửi nhắc thanh toán cho {to_user.username}', 'success')
@@ -294,6 +346,7 @@ def settle_debt(from_user_id, to_user_id, group_id):
     # ✅ Đánh dấu là đã thanh toán
     for s in shares:
         s.is_settled = True
+    record_settlement(group_id, from_user_id, sum(s.share_amount for s in shares))
 
     db.session.commit()
 
@@ -304,7 +357,7 @@ def settle_debt(from_user_id, to_user_id, group_id):
         type="payment_confirmed",
         created_at=datetime.utcnow()
     )
-    db.session.add(notif)
+    add_notifications([notif])
     db.session.commit()
 
     flash(f'✅ Đã xác nhận {User.query.get(from_user_id).username} đã thanh toán!', 'success')
@@ -313,7 +366,12 @@ def settle_debt(from_user_id, to_user_id, group_id):
 @bp.route('/get_rate/<string:currency>')
 @login_required
 def get_rate(currency):
-    rate = get_exchange_rate_to_vnd(currency.upper())
+    try:
+        rate = get_exchange_rate(currency.upper(), "VND")
+    except UnsupportedCurrency:
+        return {"error": f"Không hỗ trợ tiền tệ {currency.upper()}"}, 400
+    except ExchangeRateUnavailable:
+        return {"error": f"Không lấy được tỷ giá {currency.upper()}"}, 503
     # trả về tỷ giá 1 <currency> = rate VND
     return {"rate": rate}
 @bp.route('/update/<int:expense_id>', methods=['POST'])
@@ -342,6 +400,6 @@ def update_expense(expense_id):
 @bp.route('/notifications')
 @login_required
 def get_notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.timestamp.desc()).limit(10).all()
+    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.id.desc()).limit(10).all()
     return render_template('notifications_list.html', notifications=notifications)
 
@@ -1,16 +1,54 @@
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, current_app, jsonify, abort
 from flask_login import login_required, current_user
 from app import db
 from app.groups import bp
-from app.models import Group, User
+from app.models import Group, User, Expense, GroupMember, GroupBalance, GroupSpending
+from app.utils.balances import add_member_balance, remove_member_balance, computed_balance
+from app.utils.jobs import enqueue_job
+from app.utils.analytics import spending_summary, DEFAULT_MONTHS
+from app.utils.replicas import read_only
+
+
+def group_summaries(user_id):
+    """
+    Các nhóm của user kèm số thành viên, tổng chi (VND), ngày chi tiêu gần
+    nhất và số dư của user — một truy vấn duy nhất. Mỗi cột tổng hợp là
+    subquery tương quan đi theo khóa chính / index (group_member,
+    group_spending, ix_expense_group_id_date) nên chi phí mỗi nhóm không phụ
+    thuộc số chi tiêu; số dư đọc từ sổ cái group_balance, thiếu dòng sổ cái
+    (dữ liệu cũ chưa rebuild) thì tính bù từ lịch sử như get_group_balances.
+    """
+    member_count = db.select(db.func.count()).where(
+        GroupMember.c.group_id == Group.id
+    ).correlate(Group).scalar_subquery()
+    total_vnd = db.select(db.func.coalesce(db.func.sum(GroupSpending.total_vnd), 0.0)).where(
+        GroupSpending.group_id == Group.id
+    ).correlate(Group).scalar_subquery()
+    last_activity = db.select(db.func.max(Expense.date)).where(
+        Expense.group_id == Group.id
+    ).correlate(Group).scalar_subquery()
+    my_groups = db.select(GroupMember.c.group_id).where(GroupMember.c.user_id == user_id)
+
+    return db.session.execute(
+        db.select(
+            Group,
+            member_count.label('member_count'),
+            total_vnd.label('total_vnd'),
+            last_activity.label('last_activity'),
+            db.func.coalesce(GroupBalance.balance, computed_balance(Group.id, user_id)).label('balance'),
+        ).outerjoin(
+            GroupBalance, db.and_(GroupBalance.group_id == Group.id, GroupBalance.user_id == user_id)
+        ).where(
+            db.or_(Group.id.in_(my_groups), Group.creator_id == user_id)
+        ).order_by(last_activity.desc().nulls_last(), Group.id.desc())
+    ).all()
 
 
 @bp.route('/list')
 @login_required
+@read_only
 def group_list():
-    groups = Group.query.filter(
-        (Group.creator_id == current_user.id) | (Group.members.any(id=current_user.id))
-    ).all()
+    groups = group_summaries(current_user.id)
     return render_template('groups.html', groups=groups)
 
 
@@ -26,6 +64,8 @@ def group_new():
         new_group = Group(name=name, creator_id=current_user.id)
         new_group.members.append(current_user)
         db.session.add(new_group)
+        db.session.flush()
+        add_member_balance(new_group.id, current_user.id)
         db.session.commit()
         flash('Tạo nhóm mới thành công!', 'success')
         return redirect(url_for('groups.group_list'))
@@ -46,6 +86,7 @@ def add_member(group_id):
         flash('⚠️ Người này đã có trong nhóm rồi.', 'warning')
     else:
         group.members.append(user)
+        add_member_balance(group.id, user.id)
         db.session.commit()
         flash(f'✅ Đã thêm {user.username} vào nhóm {group.name}', 'success')
 
@@ -66,6 +107,7 @@ def remove_member(group_id, user_id):
         flash("Người dùng này không thuộc nhóm!", "warning")
     else:
         group.members.remove(user)
+        remove_member_balance(group.id, user.id)
         db.session.commit()
         flash(f"Đã xóa {user.username} khỏi nhóm!", "success")
 
@@ -80,7 +122,43 @@ def delete_group(group_id):
         flash('Bạn không có quyền xóa nhóm này.', 'danger')
         return redirect(url_for('groups.group_list'))
 
+    # Nhóm nhiều chi tiêu: xóa theo lô trong worker để không khóa DB lâu
+    n_expenses = db.session.query(db.func.count(Expense.id)).filter_by(group_id=group.id).scalar()
+    if n_expenses > current_app.config['GROUP_DELETE_ASYNC_THRESHOLD']:
+        job = enqueue_job('groups.delete', {"group_id": group.id}, created_by=current_user.id)
+        db.session.commit()
+        flash('Nhóm có nhiều chi tiêu, đang được xóa trong nền.', 'info')
+        return redirect(url_for('jobs.job_detail', job_id=job.id))
+
     db.session.delete(group)
     db.session.commit()
     flash('Đã xóa nhóm thành công.', 'success')
     return redirect(url_for('groups.group_list'))
+
+
+def _member_group(group_id):
+    group = Group.query.get_or_404(group_id)
+    if current_user not in group.members:
+        abort(404)
+    return group
+
+
+@bp.route('/<int:group_id>/analytics')
+@login_required
+@read_only
+def group_analytics(group_id):
+    group = _member_group(group_id)
+    months = request.args.get('months', DEFAULT_MONTHS, type=int)
+    return render_template('analytics.html', group=group, summary=spending_summary(group.id, months))
+
+
+@bp.route('/<int:group_id>/analytics/data')
+@login_required
+@read_only
+def group_analytics_data(group_id):
+    """Chi tiêu theo loại × tháng (đọc từ bảng tổng hợp group_spending)."""
+    group = _member_group(group_id)
+    months = request.args.get('months', DEFAULT_MONTHS, type=int)
+    response = jsonify(spending_summary(group.id, months))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
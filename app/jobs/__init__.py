@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+bp = Blueprint('jobs', __name__, template_folder='templates')
+
+from app.jobs import routes, tasks
@@ -0,0 +1,46 @@
+from flask import render_template, abort, send_file, url_for
+from flask_login import login_required, current_user
+from app.jobs import bp
+from app.models import Job
+from app.utils.jobs import SUCCEEDED
+from app.utils.replicas import read_only
+
+
+def _own_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    if job.created_by != current_user.id:
+        abort(404)
+    return job
+
+
+def _job_json(job):
+    data = job.to_dict()
+    result = data.pop("result") or {}
+    if job.status == SUCCEEDED and result.get("path"):
+        data["download_url"] = url_for('jobs.job_download', job_id=job.id)
+    return data
+
+
+@bp.route('/<int:job_id>')
+@login_required
+def job_detail(job_id):
+    job = _own_job(job_id)
+    return render_template('job_detail.html', job=job, info=_job_json(job))
+
+
+@bp.route('/<int:job_id>/status')
+@login_required
+@read_only
+def job_status(job_id):
+    return _job_json(_own_job(job_id))
+
+
+@bp.route('/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    job = _own_job(job_id)
+    result = job.to_dict()["result"] or {}
+    if job.status != SUCCEEDED or not result.get("path"):
+        abort(404)
+    return send_file(result["path"], as_attachment=True, download_name=result.get("filename"),
+                     mimetype=result.get("mimetype"))
@@ -0,0 +1,90 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import Job, Expense, ExpenseShare, Group, GroupBalance, GroupMember, GroupSpending, OutboxEvent
+from app.utils.jobs import job_handler, job_output_path, SUCCEEDED, FAILED
+
+DELETE_BATCH = 1000
+
+
+@job_handler('expenses.export')
+def export_expenses_job(payload, job):
+    from app.expenses.routes import expense_filters
+    from app.utils.expense_export import export_query, iter_rows, stream_csv, write_xlsx
+
+    group_id = payload["group_id"]
+    rows = iter_rows(export_query(expense_filters(group_id, payload.get("args", {}))))
+    if payload.get("format") == 'csv':
+        path = job_output_path(job, 'csv')
+        with open(path, 'wb') as f:
+            for chunk in stream_csv(rows):
+                f.write(chunk)
+        mimetype = 'text/csv'
+    else:
+        path = job_output_path(job, 'xlsx')
+        with write_xlsx(rows, title=f"Group_{group_id}_expenses") as tmp, open(path, 'wb') as f:
+            shutil.copyfileobj(tmp, f)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return {
+        "path": path,
+        "filename": f"group_{group_id}_expenses{os.path.splitext(path)[1]}",
+        "mimetype": mimetype
+    }
+
+
+@job_handler('rates.refresh', max_attempts=1)
+def refresh_rates_job(payload, job):
+    from app.utils.exchange_rate import rate_service
+    return {"updated": rate_service.refresh(payload.get("currencies"))}
+
+
+@job_handler('outbox.dispatch', max_attempts=1)
+def dispatch_outbox_job(payload, job):
+    from app.utils.outbox import dispatch_pending
+    total = 0
+    while True:
+        done = dispatch_pending()
+        total += done
+        if not done:
+            return {"dispatched": total}
+
+
+@job_handler('groups.delete')
+def delete_group_job(payload, job):
+    """Xóa nhóm lớn theo từng lô để không giữ khóa ghi quá lâu."""
+    group_id = payload["group_id"]
+    deleted = 0
+    while True:
+        ids = [i for (i,) in db.session.query(Expense.id).filter_by(group_id=group_id).limit(DELETE_BATCH).all()]
+        if not ids:
+            break
+        db.session.query(ExpenseShare).filter(ExpenseShare.expense_id.in_(ids)).delete(synchronize_session=False)
+        db.session.query(Expense).filter(Expense.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+
+    db.session.query(GroupBalance).filter_by(group_id=group_id).delete(synchronize_session=False)
+    db.session.query(GroupSpending).filter_by(group_id=group_id).delete(synchronize_session=False)
+    db.session.query(OutboxEvent).filter_by(group_id=group_id).delete(synchronize_session=False)
+    db.session.execute(GroupMember.delete().where(GroupMember.c.group_id == group_id))
+    db.session.query(Group).filter_by(id=group_id).delete(synchronize_session=False)
+    db.session.commit()
+    return {"expenses_deleted": deleted}
+
+
+@job_handler('jobs.cleanup', max_attempts=1)
+def cleanup_jobs(payload, job):
+    """Xóa job đã xong quá JOB_RETENTION_DAYS ngày cùng file kết quả."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config.get('JOB_RETENTION_DAYS', 7))
+    old = Job.query.filter(Job.status.in_([SUCCEEDED, FAILED]), Job.finished_at < cutoff).all()
+    for j in old:
+        result = j.to_dict()["result"] or {}
+        if result.get("path") and os.path.exists(result["path"]):
+            os.remove(result["path"])
+        db.session.delete(j)
+    db.session.commit()
+    return {"deleted": len(old)}
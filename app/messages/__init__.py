@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+bp = Blueprint('messages', __name__)
+
+from app.messages import routes
\ No newline at end of file
@@ -0,0 +1,94 @@
+from flask import request, jsonify, abort
+from flask_login import login_required, current_user
+from app import db
+from app.messages import bp
+from app.models import User
+from app.utils.messaging import (
+    get_conversation, send_message, mark_read, unread_total, list_conversations, history,
+    HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX, MAX_MESSAGE_LENGTH
+)
+from app.utils.replicas import read_only
+
+
+def _other_user(user_id):
+    if user_id == current_user.id:
+        abort(400)
+    return User.query.get_or_404(user_id)
+
+
+@bp.route('/conversations')
+@login_required
+@read_only
+def conversations():
+    """Danh sách hội thoại, mới nhất trước; trang sau bằng ?before=<next_cursor>."""
+    items, next_cursor = list_conversations(current_user.id, before=request.args.get('before', type=int))
+    return jsonify({
+        "items": items,
+        "next_cursor": next_cursor,
+        "unread_total": unread_total(current_user.id)
+    })
+
+
+@bp.route('/unread_count')
+@login_required
+@read_only
+def unread_count():
+    return jsonify({"unread": unread_total(current_user.id)})
+
+
+@bp.route('/with/<int:user_id>')
+@login_required
+def conversation_history(user_id):
+    """
+    Lịch sử với một người. Không tham số: trang mới nhất; ?before_id=: trang
+    cũ hơn; ?after_id=: tin mới hơn (gọi khi nhận thông báo type='message').
+    Đọc từ primary để tin vừa được báo luôn có mặt.
+    """
+    other = _other_user(user_id)
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_PAGE_MAX))
+    conversation = get_conversation(current_user.id, other.id)
+    if conversation is None:
+        return jsonify({"conversation_id": None, "items": [], "has_more": False})
+    rows, has_more = history(conversation.id, before_id=request.args.get('before_id', type=int),
+                             after_id=request.args.get('after_id', type=int), limit=limit)
+    return jsonify({
+        "conversation_id": conversation.id,
+        "items": [m.to_dict() for m in rows],
+        "has_more": has_more
+    })
+
+
+@bp.route('/with/<int:user_id>', methods=['POST'])
+@login_required
+def send(user_id):
+    other = _other_user(user_id)
+    data = request.get_json(silent=True) or request.form
+    content = (data.get('content') or '').strip()
+    if not content:
+        return jsonify({"error": "Nội dung tin nhắn trống."}), 400
+    if len(content) > MAX_MESSAGE_LENGTH:
+        return jsonify({"error": f"Tin nhắn dài quá {MAX_MESSAGE_LENGTH} ký tự."}), 400
+
+    message = send_message(current_user, other.id, content)
+    db.session.commit()
+    return jsonify(message.to_dict()), 201
+
+
+@bp.route('/with/<int:user_id>/read', methods=['POST'])
+@login_required
+def read(user_id):
+    """Đánh dấu đã đọc mọi tin từ người này, hoặc tới ?up_to_id= (một câu UPDATE)."""
+    other = _other_user(user_id)
+    conversation = get_conversation(current_user.id, other.id)
+    if conversation is None:
+        return jsonify({"marked": 0, "unread_total": unread_total(current_user.id)})
+    data = request.get_json(silent=True) or request.form
+    up_to_id = data.get('up_to_id', request.args.get('up_to_id'))
+    try:
+        up_to_id = int(up_to_id) if up_to_id not in (None, '') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "up_to_id không hợp lệ."}), 400
+
+    marked = mark_read(current_user.id, conversation.id, up_to_id)
+    db.session.commit()
+    return jsonify({"marked": marked, "unread_total": unread_total(current_user.id)})
@@ -1,6 +1,7 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login
+import json
 from datetime import datetime
 
 
@@ -32,14 +33,18 @@ class User(UserMixin, db.Model):
 
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    # Cache LRU trong tiến trình: request đã đăng nhập thường không cần truy vấn user
+    from app.utils.user_cache import user_cache
+    return user_cache.load(int(id))
 
 
 # ---------------- GROUP ----------------
 GroupMember = db.Table(
     'group_member',
-    db.Column('user_id', db.Integer, db.ForeignKey('user.id')),
-    db.Column('group_id', db.Integer, db.ForeignKey('group.id'))
+    db.Column('group_id', db.Integer, db.ForeignKey('group.id'), primary_key=True),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    # Tra cứu "các nhóm của user" (group_list)
+    db.Index('ix_group_member_user_id', 'user_id', 'group_id')
 )
 
 
@@ -48,9 +53,13 @@ class Group(db.Model):
     name = db.Column(db.String(255), nullable=False)
     creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     limit_amount = db.Column(db.Float, default=0.0)
+    # Tăng mỗi khi sổ cái số dư thay đổi, dùng làm khóa cache gợi ý thanh toán
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     members = db.relationship('User', secondary=GroupMember, backref=db.backref('groups', lazy='dynamic'))
     expenses = db.relationship('Expense', backref='group', lazy=True, cascade="all, delete-orphan")
+    balance_rows = db.relationship('GroupBalance', backref='group', lazy=True, cascade="all, delete-orphan")
+    spending_rows = db.relationship('GroupSpending', backref='group', lazy=True, cascade="all, delete-orphan")
 
     def total_amount(self):
         return sum(e.amount for e in self.expenses)
@@ -58,22 +67,43 @@ class Group(db.Model):
     def __repr__(self):
         return f'<Group {self.name}>'
     def calculate_balances(self):
-        balances = {}
-        for member in self.members:
-            paid = sum(e.base_amount_vnd for e in self.expenses if e.user_id == member.id)
-            owed = 0
-            for e in self.expenses:
-                for s in e.shares:
-                    if s.user_id == member.id and not getattr(s, 'is_settled', False):
-                        owed += s.share_amount
-            balance = paid - owed
-            balances[member.id] = {
-                "user": member,
-                "paid": paid,
-                "owed": owed,
-                "balance": balance
-            }
-        return balances
+        # Tính bằng truy vấn tổng hợp SQL (xem app/utils/balances.py)
+        from app.utils.balances import compute_group_balances
+        return compute_group_balances(self)
+
+    def get_balances(self):
+        # Đọc từ sổ cái group_balance (O(số thành viên))
+        from app.utils.balances import get_group_balances
+        return get_group_balances(self)
+
+
+# ---------------- GROUP BALANCE ----------------
+class GroupBalance(db.Model):
+    """Sổ cái số dư từng thành viên, cập nhật dần trong cùng transaction với chi tiêu."""
+    __tablename__ = 'group_balance'
+    group_id = db.Column(db.Integer, db.ForeignKey('group.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    paid = db.Column(db.Float, nullable=False, default=0.0)
+    owed = db.Column(db.Float, nullable=False, default=0.0)
+    balance = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<GroupBalance group={self.group_id} user={self.user_id} {self.balance}>'
+
+
+# ---------------- GROUP SPENDING ----------------
+class GroupSpending(db.Model):
+    """Tổng chi tiêu (VND) theo nhóm × loại chi tiêu × tháng, cập nhật dần cùng transaction với chi tiêu."""
+    __tablename__ = 'group_spending'
+    group_id = db.Column(db.Integer, db.ForeignKey('group.id'), primary_key=True)
+    # 0 = chưa phân loại (khóa chính không nhận NULL)
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    year_month = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM'
+    total_vnd = db.Column(db.Float, nullable=False, default=0.0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<GroupSpending group={self.group_id} category={self.category_id} {self.year_month} {self.total_vnd}>'
 
 
 # ---------------- MEMBERSHIP ----------------
@@ -87,6 +117,12 @@ class Membership(db.Model):
 
 # ---------------- EXPENSE ----------------
 class Expense(db.Model):
+    __table_args__ = (
+        # expense_list: lọc theo nhóm, sắp xếp/keyset theo (date, id)
+        db.Index('ix_expense_group_id_date', 'group_id', 'date', 'id'),
+        # tổng đã trả theo người trả, lọc theo người trả
+        db.Index('ix_expense_group_id_user_id', 'group_id', 'user_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -116,6 +152,10 @@ class Expense(db.Model):
 
 # ---------------- FRIENDSHIP ----------------
 class Friendship(db.Model):
+    __table_args__ = (
+        # profile: bạn bè đã chấp nhận của user
+        db.Index('ix_friendship_user_id_status', 'user_id', 'status', 'friend_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     friend_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -125,6 +165,12 @@ class Friendship(db.Model):
 
 # ---------------- NOTIFICATION ----------------
 class Notification(db.Model):
+    __table_args__ = (
+        # notifications_data / stream: theo user, cursor theo id
+        db.Index('ix_notification_user_id_id', 'user_id', 'id'),
+        # Khử trùng lặp khi dispatcher outbox chạy lại một sự kiện
+        db.Index('uq_notification_event_id_user_id', 'event_id', 'user_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     message = db.Column(db.String(255), nullable=False)
@@ -132,26 +178,159 @@ class Notification(db.Model):
     type = db.Column(db.String(50), default='general')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     link = db.Column(db.String(255))
+    event_id = db.Column(db.Integer, db.ForeignKey('outbox_event.id', ondelete='SET NULL'), nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "message": self.message,
+            "is_read": self.is_read,
+            "created_at": self.created_at.strftime("%d/%m/%Y %H:%M") if self.created_at else "",
+            "link": self.link or "#"
+        }
 
     def __repr__(self):
         return f'<Notification {self.message}>'
 
 
+class NotificationCounter(db.Model):
+    """Số thông báo chưa đọc của mỗi user, cập nhật cùng transaction với thông báo."""
+    __tablename__ = 'notification_counter'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<NotificationCounter user={self.user_id} unread={self.unread_count}>'
+
+
+# ---------------- OUTBOX ----------------
+class OutboxEvent(db.Model):
+    """Sự kiện cần phát thông báo, ghi cùng transaction với thay đổi gốc."""
+    __tablename__ = 'outbox_event'
+    __table_args__ = (
+        db.Index('ix_outbox_event_dispatched_at_id', 'dispatched_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('group.id', ondelete='CASCADE'), nullable=True)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    dispatched_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.kind}>'
+
+
+# ---------------- JOB ----------------
+class Job(db.Model):
+    """Công việc nền (xuất file, làm mới tỷ giá, xóa lớn...) do `flask worker` xử lý."""
+    __tablename__ = 'job'
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_job_type_status', 'type', 'status'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued / running / succeeded / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "result": json.loads(self.result) if self.result else None,
+            "created_at": self.created_at.strftime("%d/%m/%Y %H:%M") if self.created_at else "",
+            "finished_at": self.finished_at.strftime("%d/%m/%Y %H:%M") if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.type} {self.status}>'
+
+
 # ---------------- MESSAGE ----------------
 class Message(db.Model):
+    __table_args__ = (
+        # Lịch sử một cuộc trò chuyện: keyset theo id
+        db.Index('ix_message_conversation_id_id', 'conversation_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "sender_id": self.sender_id,
+            "receiver_id": self.receiver_id,
+            "content": self.content,
+            "timestamp": self.timestamp.strftime("%d/%m/%Y %H:%M") if self.timestamp else "",
+            "is_read": bool(self.is_read)
+        }
 
     def __repr__(self):
         return f'<Message {self.id} from {self.sender_id} to {self.receiver_id}>'
 
 
+# ---------------- CONVERSATION ----------------
+class Conversation(db.Model):
+    """Một cặp người dùng nhắn tin trực tiếp; user_low_id < user_high_id nên mỗi cặp có đúng một dòng."""
+    __tablename__ = 'conversation'
+    __table_args__ = (
+        db.UniqueConstraint('user_low_id', 'user_high_id', name='uq_conversation_pair'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Conversation {self.id} {self.user_low_id}-{self.user_high_id}>'
+
+
+class ConversationParticipant(db.Model):
+    """Trạng thái cuộc trò chuyện theo từng người: tin cuối, đã đọc tới đâu, số tin chưa đọc."""
+    __tablename__ = 'conversation_participant'
+    __table_args__ = (
+        # Danh sách hội thoại của user, mới nhất trước (keyset theo last_message_id)
+        db.Index('ix_conversation_participant_user_id_last', 'user_id', 'last_message_id'),
+    )
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    other_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=False, default=0)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ConversationParticipant {self.conversation_id} user={self.user_id} unread={self.unread_count}>'
+
+
 #---------------- ExpenseShare ----------------
 class ExpenseShare(db.Model):
+    __table_args__ = (
+        db.Index('ix_expense_share_expense_id', 'expense_id'),
+        # settle_debt và tổng nợ chưa thanh toán theo user
+        db.Index('ix_expense_share_user_id_is_settled', 'user_id', 'is_settled'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     expense_id = db.Column(db.Integer, db.ForeignKey('expense.id'))
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -159,6 +338,30 @@ class ExpenseShare(db.Model):
     share_amount = db.Column(db.Float, nullable=False, default=0.0)
     share_percent = db.Column(db.Float, nullable=True)
     user = db.relationship('User')
+# ---------------- EXCHANGE RATE ----------------
+class ExchangeRate(db.Model):
+    """Tỷ giá tốt gần nhất lấy được từ provider live (1 currency = rate_vnd VND)."""
+    __tablename__ = 'exchange_rate'
+    currency = db.Column(db.String(10), primary_key=True)
+    rate_vnd = db.Column(db.Float, nullable=False)
+    provider = db.Column(db.String(50))
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ExchangeRate {self.currency}={self.rate_vnd}>'
+
+
+# ---------------- REFDATA VERSION ----------------
+class RefdataVersion(db.Model):
+    """Phiên bản của từng bảng dữ liệu tham chiếu được cache (xem app/utils/refdata.py)."""
+    __tablename__ = 'refdata_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RefdataVersion {self.name}={self.version}>'
+
+
 # ---------------- CATEGORY ----------------
 class Category(db.Model):
     __tablename__ = 'category'
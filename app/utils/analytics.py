@@ -0,0 +1,163 @@
+"""
+Thống kê chi tiêu theo nhóm × loại chi tiêu × tháng.
+
+Bảng group_spending được cộng dồn trong cùng transaction với việc thêm / xóa
+chi tiêu, nên dashboard chỉ cần đọc vài chục dòng theo khóa chính
+(group_id, ...) thay vì quét toàn bộ bảng expense.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Category, Expense, GroupSpending
+
+UNCATEGORIZED = 0
+# Sai số cho phép khi so bảng thống kê với kết quả tính lại (VND)
+SPENDING_TOLERANCE = 0.01
+DEFAULT_MONTHS = 24
+MAX_MONTHS = 120
+
+
+def month_key(value):
+    return (value or datetime.utcnow()).strftime('%Y-%m')
+
+
+def months_back(months, today=None):
+    """Tháng đầu tiên ('YYYY-MM') của cửa sổ `months` tháng tính cả tháng hiện tại."""
+    today = today or datetime.utcnow()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _increment(key, total, count):
+    return db.session.query(GroupSpending).filter_by(**key).update({
+        GroupSpending.total_vnd: GroupSpending.total_vnd + total,
+        GroupSpending.expense_count: GroupSpending.expense_count + count,
+    }, synchronize_session=False)
+
+
+def _apply(group_id, deltas):
+    """Cộng dồn {(category_id, year_month): (total, count)} vào group_spending."""
+    for (category_id, year_month), (total, count) in deltas.items():
+        if not total and not count:
+            continue
+        key = dict(group_id=group_id, category_id=category_id, year_month=year_month)
+        if _increment(key, total, count):
+            if count < 0:
+                db.session.query(GroupSpending).filter_by(**key).filter(
+                    GroupSpending.expense_count <= 0
+                ).delete(synchronize_session=False)
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(GroupSpending).values(total_vnd=total, expense_count=count, **key))
+        except IntegrityError:
+            # Request khác vừa tạo dòng cùng khóa: cộng vào dòng đó
+            _increment(key, total, count)
+
+
+def _key(category_id, date):
+    return (int(category_id) if category_id else UNCATEGORIZED, month_key(date))
+
+
+def record_spending(expense, sign=1):
+    """Ghi nhận (sign=1) hoặc hoàn tác (sign=-1) một chi tiêu vào bảng thống kê."""
+    _apply(expense.group_id, {
+        _key(expense.category_id, expense.date): (sign * (expense.base_amount_vnd or 0.0), sign)
+    })
+
+
+def record_spending_bulk(group_id, rows):
+    """Ghi nhận một lô chi tiêu: rows là các dict có category_id, date, base_amount_vnd."""
+    deltas = defaultdict(lambda: [0.0, 0])
+    for r in rows:
+        entry = deltas[_key(r.get("category_id"), r.get("date"))]
+        entry[0] += r.get("base_amount_vnd") or 0.0
+        entry[1] += 1
+    _apply(group_id, {k: tuple(v) for k, v in deltas.items()})
+
+
+def compute_group_spending(group_id):
+    """Tính {(category_id, year_month): [total, count]} từ bảng expense (đọc theo lô)."""
+    deltas = defaultdict(lambda: [0.0, 0])
+    q = db.session.query(Expense.category_id, Expense.date, Expense.base_amount_vnd).filter(
+        Expense.group_id == group_id
+    ).execution_options(yield_per=5000)
+    for category_id, date, amount in q:
+        entry = deltas[_key(category_id, date)]
+        entry[0] += amount or 0.0
+        entry[1] += 1
+    return deltas
+
+
+def rebuild_group_spending(group_id):
+    """Tính lại group_spending của một nhóm từ bảng expense."""
+    deltas = compute_group_spending(group_id)
+    db.session.query(GroupSpending).filter_by(group_id=group_id).delete(synchronize_session=False)
+    if deltas:
+        db.session.execute(db.insert(GroupSpending), [
+            {"group_id": group_id, "category_id": c, "year_month": ym, "total_vnd": t, "expense_count": n}
+            for (c, ym), (t, n) in deltas.items()
+        ])
+    return len(deltas)
+
+
+def verify_group_spending(group_id):
+    """So sánh group_spending với kết quả tính lại; trả về danh sách (khóa, sai lệch)."""
+    fresh = compute_group_spending(group_id)
+    rows = {(r.category_id, r.year_month): r for r in GroupSpending.query.filter_by(group_id=group_id).all()}
+    problems = []
+    for key, (total, count) in fresh.items():
+        stored = rows.pop(key, None)
+        if stored is None:
+            problems.append((key, "thiếu dòng thống kê"))
+            continue
+        if stored.expense_count != count:
+            problems.append((key, f"expense_count: bảng {stored.expense_count} != tính lại {count}"))
+        if abs(stored.total_vnd - total) > SPENDING_TOLERANCE:
+            problems.append((key, f"total_vnd: bảng {stored.total_vnd:.2f} != tính lại {total:.2f}"))
+    for key in rows:
+        problems.append((key, "dòng thống kê không còn chi tiêu nào"))
+    return problems
+
+
+def spending_summary(group_id, months=DEFAULT_MONTHS):
+    """
+    Chi tiêu theo loại × tháng trong `months` tháng gần nhất (một truy vấn theo
+    khóa chính). Trả về dict sẵn sàng cho JSON / template.
+    """
+    months = max(1, min(months, MAX_MONTHS))
+    start = months_back(months)
+    rows = db.session.query(
+        GroupSpending.category_id, GroupSpending.year_month,
+        GroupSpending.total_vnd, GroupSpending.expense_count
+    ).filter(
+        GroupSpending.group_id == group_id, GroupSpending.year_month >= start
+    ).order_by(GroupSpending.year_month, GroupSpending.category_id).all()
+
+    category_ids = {c for c, _, _, _ in rows if c != UNCATEGORIZED}
+    names = dict(db.session.query(Category.id, Category.name).filter(Category.id.in_(category_ids)).all()) \
+        if category_ids else {}
+
+    by_month = defaultdict(float)
+    by_category = defaultdict(float)
+    cells = []
+    for category_id, year_month, total, count in rows:
+        by_month[year_month] += total
+        by_category[category_id] += total
+        cells.append({"category_id": category_id or None, "month": year_month,
+                      "total_vnd": round(total, 2), "count": count})
+
+    return {
+        "from": start,
+        "months": months,
+        "categories": [
+            {"id": c or None, "name": names.get(c, "Chưa phân loại"), "total_vnd": round(t, 2)}
+            for c, t in sorted(by_category.items(), key=lambda kv: -kv[1])
+        ],
+        "by_month": [{"month": m, "total_vnd": round(t, 2)} for m, t in sorted(by_month.items())],
+        "cells": cells,
+        "total_vnd": round(sum(by_month.values()), 2)
+    }
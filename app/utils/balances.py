@@ -0,0 +1,204 @@
+from collections import defaultdict
+from sqlalchemy import func, or_
+from app import db
+from app.models import Expense, ExpenseShare, Group, GroupBalance
+
+# Sai số cho phép khi so sánh sổ cái với kết quả tính lại (cộng dồn float)
+LEDGER_TOLERANCE = 0.01
+
+
+def _unsettled():
+    # is_settled có thể NULL với dữ liệu cũ → coi như chưa thanh toán
+    return or_(ExpenseShare.is_settled.is_(False), ExpenseShare.is_settled.is_(None))
+
+
+def paid_by_user(group_id, user_ids=None):
+    """Tổng tiền (VND) mỗi người đã trả trong nhóm: {user_id: paid}."""
+    q = db.session.query(
+        Expense.user_id, func.sum(Expense.base_amount_vnd)
+    ).filter(Expense.group_id == group_id)
+    if user_ids is not None:
+        q = q.filter(Expense.user_id.in_(user_ids))
+    rows = q.group_by(Expense.user_id).all()
+    return {uid: float(total or 0) for uid, total in rows}
+
+
+def owed_by_user(group_id, user_ids=None):
+    """Tổng phần chia chưa thanh toán (VND) của mỗi người: {user_id: owed}."""
+    q = db.session.query(
+        ExpenseShare.user_id, func.sum(ExpenseShare.share_amount)
+    ).join(
+        Expense, ExpenseShare.expense_id == Expense.id
+    ).filter(Expense.group_id == group_id, _unsettled())
+    if user_ids is not None:
+        q = q.filter(ExpenseShare.user_id.in_(user_ids))
+    rows = q.group_by(ExpenseShare.user_id).all()
+    return {uid: float(total or 0) for uid, total in rows}
+
+
+def computed_balance(group_id, user_id):
+    """
+    Biểu thức SQL: số dư (đã trả - còn nợ) của user_id trong group_id tính từ
+    lịch sử chi tiêu. group_id có thể là cột (Group.id) để dùng làm subquery
+    tương quan, ví dụ giá trị bù khi thiếu dòng sổ cái.
+    """
+    paid = db.select(func.coalesce(func.sum(Expense.base_amount_vnd), 0.0)).where(
+        Expense.group_id == group_id, Expense.user_id == user_id
+    ).scalar_subquery()
+    owed = db.select(func.coalesce(func.sum(ExpenseShare.share_amount), 0.0)).join(
+        Expense, ExpenseShare.expense_id == Expense.id
+    ).where(
+        Expense.group_id == group_id, ExpenseShare.user_id == user_id, _unsettled()
+    ).scalar_subquery()
+    return paid - owed
+
+
+def compute_group_balances(group, members=None):
+    """
+    Tính paid / owed / balance cho mọi thành viên bằng 2 truy vấn tổng hợp
+    thay vì duyệt thành viên × chi tiêu × phần chia trong Python.
+    Trả về cùng cấu trúc với Group.calculate_balances cũ.
+    """
+    if members is None:
+        members = group.members
+    paid = paid_by_user(group.id)
+    owed = owed_by_user(group.id)
+
+    balances = {}
+    for member in members:
+        p = paid.get(member.id, 0.0)
+        o = owed.get(member.id, 0.0)
+        balances[member.id] = {
+            "user": member,
+            "paid": p,
+            "owed": o,
+            "balance": p - o
+        }
+    return balances
+
+
+# ---------------- SỔ CÁI group_balance ----------------
+def _row(balances, member):
+    entry = balances[member.id]
+    return {"user": member, "paid": entry["paid"], "owed": entry["owed"], "balance": entry["balance"]}
+
+
+def get_group_balances(group, members=None):
+    """
+    Đọc số dư từ bảng group_balance theo khóa chính, không phụ thuộc độ dài
+    lịch sử chi tiêu. Thành viên chưa có dòng trong sổ cái (dữ liệu cũ chưa
+    rebuild) được tính bù bằng truy vấn tổng hợp giới hạn theo user đó.
+    """
+    if members is None:
+        members = group.members
+    rows = GroupBalance.query.filter_by(group_id=group.id).all()
+    ledger = {r.user_id: {"paid": r.paid, "owed": r.owed, "balance": r.balance} for r in rows}
+
+    missing = [m for m in members if m.id not in ledger]
+    if missing:
+        ids = [m.id for m in missing]
+        paid = paid_by_user(group.id, ids)
+        owed = owed_by_user(group.id, ids)
+        for uid in ids:
+            p, o = paid.get(uid, 0.0), owed.get(uid, 0.0)
+            ledger[uid] = {"paid": p, "owed": o, "balance": p - o}
+
+    return {m.id: _row(ledger, m) for m in members}
+
+
+def bump_revision(group_id):
+    """Đánh dấu số dư của nhóm đã thay đổi (vô hiệu cache gợi ý thanh toán)."""
+    db.session.query(Group).filter_by(id=group_id).update(
+        {Group.revision: Group.revision + 1}, synchronize_session=False
+    )
+
+
+def _apply(group_id, deltas):
+    """Cộng dồn {user_id: (paid, owed)} vào sổ cái bằng UPDATE tương đối."""
+    changed = False
+    for uid, (paid, owed) in deltas.items():
+        if not paid and not owed:
+            continue
+        db.session.query(GroupBalance).filter_by(group_id=group_id, user_id=uid).update({
+            GroupBalance.paid: GroupBalance.paid + paid,
+            GroupBalance.owed: GroupBalance.owed + owed,
+            GroupBalance.balance: GroupBalance.balance + (paid - owed),
+        }, synchronize_session=False)
+        changed = True
+    if changed:
+        bump_revision(group_id)
+
+
+def record_expense(expense, shares, sign=1):
+    """Ghi nhận (sign=1) hoặc hoàn tác (sign=-1) một chi tiêu vào sổ cái."""
+    deltas = defaultdict(lambda: [0.0, 0.0])
+    deltas[expense.user_id][0] += sign * (expense.base_amount_vnd or 0.0)
+    for s in shares:
+        if not s.is_settled:
+            deltas[s.user_id][1] += sign * (s.share_amount or 0.0)
+    _apply(expense.group_id, {uid: tuple(v) for uid, v in deltas.items()})
+
+
+def record_bulk(group_id, paid, owed):
+    """Ghi nhận một lô chi tiêu đã cộng gộp: paid / owed là {user_id: tổng}."""
+    deltas = {uid: (paid.get(uid, 0.0), owed.get(uid, 0.0)) for uid in set(paid) | set(owed)}
+    _apply(group_id, deltas)
+
+
+def record_settlement(group_id, user_id, amount):
+    """Các phần chia của user_id vừa được đánh dấu đã thanh toán."""
+    _apply(group_id, {user_id: (0.0, -amount)})
+
+
+def add_member_balance(group_id, user_id):
+    """Tạo dòng sổ cái cho thành viên mới (tính từ lịch sử nếu được thêm lại)."""
+    paid = paid_by_user(group_id, [user_id]).get(user_id, 0.0)
+    owed = owed_by_user(group_id, [user_id]).get(user_id, 0.0)
+    row = db.session.get(GroupBalance, (group_id, user_id))
+    if row is None:
+        row = GroupBalance(group_id=group_id, user_id=user_id)
+        db.session.add(row)
+    row.paid, row.owed, row.balance = paid, owed, paid - owed
+    bump_revision(group_id)
+    return row
+
+
+def remove_member_balance(group_id, user_id):
+    db.session.query(GroupBalance).filter_by(
+        group_id=group_id, user_id=user_id
+    ).delete(synchronize_session=False)
+    bump_revision(group_id)
+
+
+def rebuild_group_balances(group):
+    """Tính lại toàn bộ sổ cái của một nhóm từ bảng expense / expense_share."""
+    fresh = compute_group_balances(group)
+    rows = {r.user_id: r for r in GroupBalance.query.filter_by(group_id=group.id).all()}
+    for uid, entry in fresh.items():
+        row = rows.pop(uid, None)
+        if row is None:
+            row = GroupBalance(group_id=group.id, user_id=uid)
+            db.session.add(row)
+        row.paid, row.owed, row.balance = entry["paid"], entry["owed"], entry["balance"]
+    for row in rows.values():
+        db.session.delete(row)
+    bump_revision(group.id)
+    return fresh
+
+
+def verify_group_balances(group):
+    """So sánh sổ cái với kết quả tính lại; trả về danh sách sai lệch."""
+    fresh = compute_group_balances(group)
+    rows = {r.user_id: r for r in GroupBalance.query.filter_by(group_id=group.id).all()}
+    problems = []
+    for uid, row in fresh.items():
+        stored = rows.pop(uid, None)
+        if stored is None:
+            problems.append((uid, "thiếu dòng sổ cái"))
+            continue
+        for field in ("paid", "owed", "balance"):
+            if abs(getattr(stored, field) - row[field]) > LEDGER_TOLERANCE:
+                problems.append((uid, f"{field}: sổ cái {getattr(stored, field):.2f} != tính lại {row[field]:.2f}"))
+    for uid in rows:
+        problems.append((uid, "dòng sổ cái của người không còn trong nhóm"))
+    return problems
@@ -0,0 +1,123 @@
+"""
+Profile cấu hình engine DB theo môi trường chạy.
+
+DB_ENGINE_PROFILE:
+  'auto'       – chọn theo SQLALCHEMY_DATABASE_URI (mặc định)
+  'sqlite'     – WAL, synchronous=NORMAL, busy_timeout, mmap_size (PRAGMA mỗi kết nối)
+  'postgresql' – pool có giới hạn, pre-ping, recycle, statement_timeout;
+                 DB_PGBOUNCER=1 cho PgBouncer chế độ transaction pooling
+  'default'    – giữ nguyên mặc định của SQLAlchemy (dùng để so sánh)
+
+apply_engine_profile() chạy trước db.init_app (đặt SQLALCHEMY_ENGINE_OPTIONS),
+attach_engine_events() chạy sau khi engine đã được tạo (kèm hàm vn_fold cho
+mọi engine SQLite).
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILE_DEFAULTS = {
+    'DB_ENGINE_PROFILE': 'auto',
+    # SQLite
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_CACHE_SIZE_KB': 64 * 1024,
+    # PostgreSQL
+    'DB_POOL_SIZE': 10,
+    'DB_MAX_OVERFLOW': 20,
+    'DB_POOL_TIMEOUT': 10,
+    'DB_POOL_RECYCLE': 1800,
+    'DB_STATEMENT_TIMEOUT_MS': 15000,
+    'DB_PGBOUNCER': False,
+}
+
+
+def resolve_profile(app):
+    profile = app.config['DB_ENGINE_PROFILE']
+    if profile != 'auto':
+        return profile
+    backend = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    return backend if backend in ('sqlite', 'postgresql') else 'default'
+
+
+def apply_engine_profile(app):
+    for key, value in PROFILE_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    profile = resolve_profile(app)
+    app.config['DB_ENGINE_PROFILE_RESOLVED'] = profile
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+
+    if profile == 'sqlite':
+        connect_args = dict(options.get('connect_args') or {})
+        # timeout của sqlite3 = busy handler ở tầng driver (giây)
+        connect_args.setdefault('timeout', app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+        options['connect_args'] = connect_args
+
+    elif profile == 'postgresql':
+        options.setdefault('pool_pre_ping', True)
+        options.setdefault('pool_recycle', app.config['DB_POOL_RECYCLE'])
+        options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', app.config['DB_POOL_TIMEOUT'])
+        connect_args = dict(options.get('connect_args') or {})
+        connect_args.setdefault('application_name', app.import_name)
+        if not app.config['DB_PGBOUNCER']:
+            # PgBouncer từ chối tham số khởi động 'options' → khi đó dùng SET LOCAL
+            timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+            if timeout:
+                connect_args.setdefault('options', f'-c statement_timeout={int(timeout)}')
+        options['connect_args'] = connect_args
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    return profile
+
+
+def _sqlite_pragmas(app):
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size=-{int(app.config['SQLITE_CACHE_SIZE_KB'])}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+    def on_connect(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def _pgbouncer_statement_timeout(timeout):
+    # Chế độ transaction pooling: SET phiên không giữ được → SET LOCAL mỗi transaction
+    def on_begin(conn):
+        # Cursor DBAPI trực tiếp: psycopg2 tự mở transaction ở câu lệnh đầu tiên
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f'SET LOCAL statement_timeout = {int(timeout)}')
+        finally:
+            cursor.close()
+    return on_begin
+
+
+def _sqlite_functions(dbapi_conn, connection_record):
+    """Hàm SQL tự định nghĩa cho SQLite (mọi profile): vn_fold = search.fold."""
+    from app.utils.search import fold
+    dbapi_conn.create_function('vn_fold', 1, fold, deterministic=True)
+
+
+def attach_engine_events(app, engines):
+    profile = app.config.get('DB_ENGINE_PROFILE_RESOLVED')
+    for engine in engines:
+        backend = engine.dialect.name
+        if backend == 'sqlite':
+            event.listen(engine, 'connect', _sqlite_functions)
+        if profile == 'sqlite' and backend == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            event.listen(engine, 'connect', _sqlite_pragmas(app))
+        elif profile == 'postgresql' and backend == 'postgresql' and app.config['DB_PGBOUNCER']:
+            timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+            if timeout:
+                event.listen(engine, 'begin', _pgbouncer_statement_timeout(timeout))
@@ -1,12 +1,282 @@
-import requests
+"""
+Dịch vụ tỷ giá: 1 <currency> = X VND.
+
+Thứ tự tra cứu:
+  1. cache trong bộ nhớ của tiến trình (TTL),
+  2. các provider "live" theo EXCHANGE_RATE_PROVIDERS (timeout chặt),
+  3. tỷ giá tốt gần nhất đã lưu trong bảng exchange_rate,
+  4. các provider tĩnh (bảng tỷ giá cố định).
+Không còn trả về 1.0 khi lỗi: nếu không có nguồn nào thì raise
+ExchangeRateUnavailable để route báo lỗi cho người dùng.
+
+Chỉ tra các tiền tệ hỗ trợ (EXCHANGE_RATE_CURRENCIES và bảng tĩnh); mã lạ
+raise UnsupportedCurrency trước khi chạm cache / provider, nên chuỗi tùy ý
+từ request không sinh lượt gọi ra ngoài hay mục cache mới.
+Tỷ giá dự phòng (3, 4) chỉ được cache FALLBACK_TTL giây. Mỗi tiền tệ chỉ có
+một lượt gọi provider tại một thời điểm (single-flight). Làm mới định kỳ do
+job 'rates.refresh' (JOB_SCHEDULE) đảm nhận.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+
+# TTL cache của tỷ giá dự phòng (tốt gần nhất / bảng tĩnh) khi live lỗi
+FALLBACK_TTL = 60
+
+
+class ExchangeRateUnavailable(Exception):
+    pass
+
+
+class UnsupportedCurrency(ExchangeRateUnavailable):
+    """Mã tiền tệ không nằm trong danh sách hỗ trợ (không gọi provider)."""
+
+
+# ---------------- PROVIDERS ----------------
+class StaticRateProvider:
+    """Provider đọc từ một dict cố định; dùng làm fallback hoặc stub khi test."""
+    name = 'static'
+    live = False
+
+    def __init__(self, rates):
+        self.rates = {k.upper(): float(v) for k, v in rates.items()}
+
+    def get_rate(self, currency):
+        if currency not in self.rates:
+            raise ExchangeRateUnavailable(f'{self.name}: không có tỷ giá {currency}')
+        return self.rates[currency]
+
+
+class FixedRateProvider(StaticRateProvider):
+    name = 'fixed'
+    # Tỷ giá cố định (trước đây là get_exchange_rate_to_vnd trong expenses/routes.py)
+    FIXED_RATES = {
+        "VND": 1.0,
+        "USD": 25000.0,
+        "EUR": 27000.0,
+        "JPY": 170.0,
+        "KRW": 20.0,
+        "SGD": 18000.0,
+        "THB": 700.0
+    }
+
+    def __init__(self, rates=None):
+        super().__init__(rates or self.FIXED_RATES)
+
+
+class ExchangeRateHostProvider:
+    name = 'exchangerate_host'
+    live = True
+    url = 'https://api.exchangerate.host/convert'
+
+    def __init__(self, connect_timeout, read_timeout):
+        import requests  # chỉ nạp khi provider live được dùng lần đầu
+        self.timeout = (connect_timeout, read_timeout)
+        self._http = requests.Session()
+        self._errors = (requests.RequestException, ValueError, KeyError, TypeError)
+
+    def get_rate(self, currency):
+        try:
+            response = self._http.get(self.url, params={"from": currency, "to": "VND"}, timeout=self.timeout)
+            response.raise_for_status()
+            rate = float(response.json()["result"])
+        except self._errors as e:
+            raise ExchangeRateUnavailable(f'{self.name}: {e}') from e
+        if rate <= 0:
+            raise ExchangeRateUnavailable(f'{self.name}: tỷ giá không hợp lệ {rate}')
+        return rate
+
+
+PROVIDERS = {
+    'fixed': lambda app: FixedRateProvider(),
+    'exchangerate_host': lambda app: ExchangeRateHostProvider(
+        app.config['EXCHANGE_RATE_CONNECT_TIMEOUT'], app.config['EXCHANGE_RATE_READ_TIMEOUT']
+    ),
+}
+
+
+def register_provider(name, factory):
+    """factory(app) -> provider có .name, .live và .get_rate(currency)."""
+    PROVIDERS[name] = factory
+
+
+# ---------------- SERVICE ----------------
+class RateService:
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._providers = None
+        self._app = None
+
+    def init_app(self, app):
+        app.config.setdefault('EXCHANGE_RATE_PROVIDERS', ['exchangerate_host', 'fixed'])
+        app.config.setdefault('EXCHANGE_RATE_TTL', 3600)
+        app.config.setdefault('EXCHANGE_RATE_CONNECT_TIMEOUT', 2.0)
+        app.config.setdefault('EXCHANGE_RATE_READ_TIMEOUT', 3.0)
+        app.config.setdefault('EXCHANGE_RATE_MAX_STALE', 7 * 24 * 3600)
+        app.config.setdefault('EXCHANGE_RATE_CURRENCIES', ['USD', 'EUR', 'JPY', 'KRW', 'SGD', 'THB'])
+        app.extensions['exchange_rate'] = self
+        self._app = app
+
+        from app.utils.refdata import refdata
+        refdata.loader('exchange_rates')(load_stored_rates)
+        self._providers = None
+        self.clear()
+
+    @property
+    def providers(self):
+        if self._providers is None:
+            self._providers = [PROVIDERS[name](self._app) for name in self._app.config['EXCHANGE_RATE_PROVIDERS']]
+        return self._providers
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, currency):
+        with self._lock:
+            entry = self._cache.get(currency)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+
+    def _store(self, currency, rate, ttl):
+        with self._lock:
+            self._cache[currency] = (rate, time.monotonic() + ttl)
+
+    @property
+    def supported(self):
+        """Tập mã tiền tệ được phép tra: cấu hình + mọi mã có trong provider tĩnh."""
+        codes = {c.upper() for c in self._app.config['EXCHANGE_RATE_CURRENCIES']} | {'VND'}
+        for provider in self.providers:
+            codes.update(getattr(provider, 'rates', ()))
+        return codes
+
+    def _flight_lock(self, currency):
+        with self._lock:
+            return self._flights.setdefault(currency, threading.Lock())
+
+    def get_rate(self, currency):
+        currency = (currency or 'VND').upper()
+        if currency == 'VND':
+            return 1.0
+        if currency not in self.supported:
+            raise UnsupportedCurrency(f'Không hỗ trợ tiền tệ {currency}')
+        rate = self._cached(currency)
+        if rate is not None:
+            return rate
+        # Single-flight: khi cache hết hạn chỉ một thread gọi provider cho mỗi
+        # tiền tệ, các thread khác chờ rồi đọc lại cache
+        with self._flight_lock(currency):
+            rate = self._cached(currency)
+            if rate is not None:
+                return rate
+            return self._resolve(currency)
+
+    def _fetch_live(self, currency, errors):
+        """Thử lần lượt các provider live; lưu và cache tỷ giá đầu tiên lấy được."""
+        for provider in self.providers:
+            if not provider.live:
+                continue
+            try:
+                rate = provider.get_rate(currency)
+            except ExchangeRateUnavailable as e:
+                errors.append(str(e))
+                continue
+            self._persist(currency, rate, provider.name)
+            self._store(currency, rate, self._app.config['EXCHANGE_RATE_TTL'])
+            return rate
+        return None
+
+    def _resolve(self, currency):
+        errors = []
+        rate = self._fetch_live(currency, errors)
+        if rate is not None:
+            return rate
+
+        # Nguồn live lỗi: dùng tỷ giá dự phòng (tốt gần nhất, rồi bảng tĩnh)
+        # nhưng chỉ cache ngắn để sớm thử lại live
+        fallback_ttl = min(FALLBACK_TTL, self._app.config['EXCHANGE_RATE_TTL'])
+        last = self._last_known_good(currency)
+        if last is not None:
+            self._store(currency, last, fallback_ttl)
+            return last
+
+        for provider in self.providers:
+            if provider.live:
+                continue
+            try:
+                rate = provider.get_rate(currency)
+            except ExchangeRateUnavailable as e:
+                errors.append(str(e))
+                continue
+            self._store(currency, rate, fallback_ttl)
+            return rate
+
+        current_app.logger.warning('Không lấy được tỷ giá %s: %s', currency, '; '.join(errors))
+        raise ExchangeRateUnavailable(f'Không lấy được tỷ giá {currency}')
+
+    # ---------------- last-known-good ----------------
+    def _persist(self, currency, rate, provider_name):
+        from app import db
+        from app.models import ExchangeRate
+        from app.utils.refdata import refdata
+        table = ExchangeRate.__table__
+        values = {"rate_vnd": rate, "provider": provider_name, "fetched_at": datetime.utcnow()}
+        try:
+            # Kết nối riêng: lưu tỷ giá không phụ thuộc transaction của request
+            with db.engine.begin() as conn:
+                updated = conn.execute(table.update().where(table.c.currency == currency).values(**values))
+                if updated.rowcount == 0:
+                    conn.execute(table.insert().values(currency=currency, **values))
+                refdata.invalidate('exchange_rates', connection=conn)
+        except Exception:
+            current_app.logger.exception('Không lưu được tỷ giá %s', currency)
+
+    def _last_known_good(self, currency):
+        from app.utils.refdata import refdata
+        entry = refdata.get('exchange_rates').get(currency)
+        if entry is None:
+            return None
+        rate, fetched_at = entry
+        oldest = datetime.utcnow() - timedelta(seconds=self._app.config['EXCHANGE_RATE_MAX_STALE'])
+        return rate if fetched_at >= oldest else None
+
+    # ---------------- làm mới định kỳ (job 'rates.refresh') ----------------
+    def refresh(self, currencies=None):
+        """
+        Lấy lại tỷ giá từ provider live cho các tiền tệ hỗ trợ (mặc định
+        EXCHANGE_RATE_CURRENCIES); trả về {currency: rate} đã cập nhật.
+        """
+        currencies = {c.upper() for c in currencies or self._app.config['EXCHANGE_RATE_CURRENCIES']}
+        updated = {}
+        for currency in sorted(currencies & self.supported - {'VND'}):
+            with self._flight_lock(currency):
+                rate = self._fetch_live(currency, [])
+            if rate is not None:
+                updated[currency] = rate
+        return updated
+
+
+rate_service = RateService()
+
+
+def load_stored_rates():
+    """Bảng exchange_rate (tỷ giá live tốt gần nhất): {currency: (rate_vnd, fetched_at)}."""
+    from app import db
+    from app.models import ExchangeRate
+    rows = db.session.query(ExchangeRate.currency, ExchangeRate.rate_vnd, ExchangeRate.fetched_at).all()
+    return {currency: (rate, fetched_at) for currency, rate, fetched_at in rows}
+
 
 def get_exchange_rate(from_currency, to_currency="VND"):
+    """Tỷ giá 1 from_currency = X to_currency (quy đổi qua VND)."""
+    from_currency = (from_currency or "VND").upper()
+    to_currency = (to_currency or "VND").upper()
     if from_currency == to_currency:
         return 1.0
-    try:
-        url = f"https://api.exchangerate.host/convert?from={from_currency}&to={to_currency}"
-        response = requests.get(url)
-        data = response.json()
-        return data.get("result", 1.0)
-    except Exception:
-        return 1.0
+    return rate_service.get_rate(from_currency) / rate_service.get_rate(to_currency)
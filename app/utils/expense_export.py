@@ -0,0 +1,71 @@
+"""
+Xuất chi tiêu ra CSV / Excel với bộ nhớ không đổi theo kích thước nhóm:
+truy vấn đọc theo lô (yield_per) và đã join sẵn người trả + loại chi tiêu,
+CSV được stream trực tiếp, Excel dùng chế độ write-only ghi ra file tạm.
+"""
+import csv
+import io
+import tempfile
+
+from app import db
+from app.models import Expense, User, Category
+
+EXPORT_HEADER = ["Tên chi tiêu", "Số tiền", "Tiền tệ", "Quy đổi VND", "Ngày tạo", "Ghi chú", "Người trả", "Loại chi tiêu"]
+CHUNK_SIZE = 1000
+
+
+def export_query(filters):
+    """filters: danh sách điều kiện SQLAlchemy trên Expense (group, ngày, người trả, loại)."""
+    return db.session.query(
+        Expense.title, Expense.amount, Expense.currency, Expense.base_amount_vnd,
+        Expense.date, Expense.note, User.username, Category.name
+    ).join(
+        User, User.id == Expense.user_id
+    ).outerjoin(
+        Category, Category.id == Expense.category_id
+    ).filter(*filters).order_by(
+        Expense.date, Expense.id
+    ).execution_options(yield_per=CHUNK_SIZE)
+
+
+def iter_rows(query):
+    for title, amount, currency, base_vnd, date, note, payer, category in query:
+        yield [
+            title,
+            int(round(amount or 0)),
+            currency,
+            int(round(base_vnd or 0)),
+            date.strftime('%Y-%m-%d') if date else "",
+            note or "",
+            payer or "",
+            category or ""
+        ]
+
+
+def stream_csv(rows):
+    """Sinh từng khối CSV (UTF-8 có BOM để Excel đọc đúng tiếng Việt)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write('﻿')
+    writer.writerow(EXPORT_HEADER)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % CHUNK_SIZE == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode('utf-8')
+
+
+def write_xlsx(rows, title):
+    """Ghi workbook write-only ra file tạm trên đĩa và trả về file đã seek(0)."""
+    from openpyxl import Workbook  # import khi cần: worker không xuất Excel không phải nạp openpyxl
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title)
+    ws.append(EXPORT_HEADER)
+    for row in rows:
+        ws.append(row)
+    tmp = tempfile.TemporaryFile()
+    wb.save(tmp)
+    tmp.seek(0)
+    return tmp
@@ -0,0 +1,225 @@
+"""
+Nhập hàng loạt chi tiêu từ file CSV / Excel có cùng bố cục cột với file xuất
+(EXPORT_HEADER). Quy trình:
+  1. lượt 1 đọc và kiểm tra từng dòng theo dạng stream (lô BATCH_SIZE dòng):
+     thành viên nhóm một truy vấn, loại chi tiêu mới một truy vấn mỗi lô,
+     tỷ giá qua dịch vụ có cache (mỗi loại tiền một lần), chưa ghi gì,
+  2. có lỗi thì dừng, báo tối đa MAX_ERRORS dòng,
+  3. lượt 2 đọc lại file, INSERT hàng loạt Expense / ExpenseShare theo lô
+     trong một transaction,
+  4. cập nhật sổ cái số dư một lần và gửi một thông báo tổng hợp mỗi thành viên.
+Chi tiêu được chia đều cho mọi thành viên hiện tại của nhóm.
+"""
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+
+from flask import url_for
+
+from app import db
+from app.models import Expense, ExpenseShare, User, GroupMember, Category, Notification
+from app.utils.balances import record_bulk
+from app.utils.analytics import record_spending_bulk
+from app.utils.exchange_rate import get_exchange_rate, ExchangeRateUnavailable
+from app.utils.expense_export import EXPORT_HEADER
+from app.utils.notification_counts import add_notifications
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 50
+
+
+class ImportValidationError(Exception):
+    """Lỗi dữ liệu nhập; errors là danh sách (số dòng, thông báo)."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} dòng không hợp lệ")
+        self.errors = errors
+
+
+class _RowSource:
+    """Nguồn dòng đọc lại được: mỗi lần duyệt tua stream về đầu và đọc stream."""
+
+    def __init__(self, stream, filename):
+        self.stream = stream
+        self.filename = filename
+
+    def __iter__(self):
+        self.stream.seek(0)
+        return _iter_rows(self.stream, self.filename)
+
+
+def read_rows(stream, filename):
+    """
+    (số dòng, list giá trị) từ file CSV hoặc XLSX, bỏ qua dòng tiêu đề. Duyệt
+    được nhiều lần (stream phải seek được) cho hai lượt của import_expenses.
+    """
+    return _RowSource(stream, filename)
+
+
+def _iter_rows(stream, filename):
+    text = None
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        rows = csv.reader(text)
+
+    try:
+        for line_no, row in enumerate(rows, 1):
+            row = list(row)
+            if line_no == 1:
+                header = [str(c).strip() if c is not None else '' for c in row]
+                if header[:7] != EXPORT_HEADER[:7]:
+                    raise ImportValidationError([(1, "Dòng tiêu đề không khớp định dạng file xuất: " + ", ".join(EXPORT_HEADER))])
+                continue
+            if not any(c not in (None, '') for c in row):
+                continue
+            yield line_no, row
+    finally:
+        if text is not None:
+            # Không để TextIOWrapper đóng stream gốc: lượt sau còn đọc lại
+            text.detach()
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d')
+
+
+def _add_error(errors, line_no, message):
+    """Ghi một lỗi; đủ MAX_ERRORS thì dừng ngay, không đọc phần còn lại của file."""
+    errors.append((line_no, message))
+    if len(errors) >= MAX_ERRORS:
+        raise ImportValidationError(sorted(errors))
+
+
+def parse_rows(rows, errors):
+    """Kiểm tra định dạng từng dòng; sinh các dòng hợp lệ, lỗi ghi vào errors."""
+    for line_no, row in rows:
+        row += [None] * (len(EXPORT_HEADER) - len(row))
+        title, amount, currency, _base, date, note, payer, category = row[:8]
+        try:
+            amount = float(amount)
+            if amount <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            _add_error(errors, line_no, f"Số tiền không hợp lệ: {amount!r}")
+            continue
+        try:
+            date = _parse_date(date)
+        except (TypeError, ValueError):
+            _add_error(errors, line_no, f"Ngày không hợp lệ: {date!r}")
+            continue
+        if not payer:
+            _add_error(errors, line_no, "Thiếu người trả")
+            continue
+        yield {
+            "line": line_no,
+            "title": (str(title).strip() if title else '') or 'Không tên',
+            "amount": amount,
+            "currency": (str(currency).strip().upper() if currency else '') or 'VND',
+            "date": date,
+            "note": str(note) if note else '',
+            "payer": str(payer).strip(),
+            "category": str(category).strip() if category else None,
+        }
+
+
+def _batches(rows, errors):
+    parsed = parse_rows(rows, errors)
+    while True:
+        batch = list(islice(parsed, BATCH_SIZE))
+        if not batch:
+            return
+        yield batch
+
+
+def import_expenses(group, rows, created_by):
+    """
+    Nhập các dòng vào nhóm trong một transaction. `rows` phải duyệt lại được
+    (read_rows, list): lượt 1 chỉ đọc và kiểm tra, tra loại chi tiêu và tỷ
+    giá (có thể gọi provider live); lượt 2 INSERT theo lô BATCH_SIZE dòng. Vì
+    vậy không có lượt gọi mạng hay ghi trên kết nối khác nào khi transaction
+    ghi đang mở, và bộ nhớ không phụ thuộc kích thước file.
+    Trả về (số chi tiêu, tổng VND); raise ImportValidationError nếu có dòng lỗi
+    (không ghi gì).
+    """
+    errors = []
+
+    # Người trả phải là thành viên nhóm: 1 truy vấn
+    member_rows = db.session.query(User.id, User.username).join(
+        GroupMember, GroupMember.c.user_id == User.id
+    ).filter(GroupMember.c.group_id == group.id).all()
+    members = {name: uid for uid, name in member_rows}
+    member_ids = [uid for uid, _ in member_rows]
+    categories, rates = {}, {}
+
+    # Lượt 1: kiểm tra, gom loại chi tiêu / tiền tệ (chưa ghi gì)
+    for batch in _batches(rows, errors):
+        # Loại chi tiêu mới gặp trong lô: 1 truy vấn mỗi lô
+        new_names = {r["category"] for r in batch if r["category"] and r["category"] not in categories}
+        if new_names:
+            found = dict(db.session.query(Category.name, Category.id).filter(Category.name.in_(new_names)).all())
+            categories.update({name: found.get(name) for name in new_names})
+
+        for r in batch:
+            if r["payer"] not in members:
+                _add_error(errors, r["line"], f"'{r['payer']}' không phải thành viên nhóm")
+            if r["category"] and categories[r["category"]] is None:
+                _add_error(errors, r["line"], f"Không có loại chi tiêu '{r['category']}'")
+            if r["currency"] not in rates:
+                try:
+                    rates[r["currency"]] = get_exchange_rate(r["currency"], "VND")
+                except ExchangeRateUnavailable:
+                    rates[r["currency"]] = None
+            if rates[r["currency"]] is None:
+                _add_error(errors, r["line"], f"Không lấy được tỷ giá {r['currency']}")
+    if errors:
+        raise ImportValidationError(sorted(errors))
+
+    # Lượt 2: INSERT theo lô bằng tỷ giá / loại đã tra ở lượt 1
+    paid, owed = defaultdict(float), defaultdict(float)
+    count, total = 0, 0.0
+    for batch in _batches(rows, errors):
+        expense_rows = []
+        for r in batch:
+            base = r["amount"] * rates[r["currency"]]
+            expense_rows.append({
+                "title": r["title"], "amount": r["amount"], "currency": r["currency"],
+                "base_amount_vnd": base, "note": r["note"], "date": r["date"],
+                "group_id": group.id, "user_id": members[r["payer"]], "created_by": created_by.id,
+                "category_id": categories.get(r["category"]),
+            })
+        ids = db.session.scalars(
+            db.insert(Expense).returning(Expense.id, sort_by_parameter_order=True), expense_rows
+        ).all()
+
+        share_rows = []
+        for expense_id, row in zip(ids, expense_rows):
+            per_person = round(row["base_amount_vnd"] / len(member_ids), 2)
+            paid[row["user_id"]] += row["base_amount_vnd"]
+            total += row["base_amount_vnd"]
+            for uid in member_ids:
+                owed[uid] += per_person
+                share_rows.append({"expense_id": expense_id, "user_id": uid, "share_amount": per_person, "is_settled": False})
+        db.session.execute(db.insert(ExpenseShare), share_rows)
+        record_spending_bulk(group.id, expense_rows)
+        count += len(batch)
+
+    if not count:
+        return 0, 0.0
+
+    record_bulk(group.id, paid, owed)
+
+    # Một thông báo tổng hợp cho mỗi thành viên thay vì một thông báo mỗi dòng
+    message = f"{created_by.username} đã nhập {count} chi tiêu vào nhóm {group.name} ({total:,.0f} ₫)".replace(",", ".")
+    link = url_for('expenses.expense_list', group_id=group.id)
+    notifs = [Notification(user_id=uid, message=message, link=link, type="expense_import")
+              for uid in member_ids if uid != created_by.id]
+    add_notifications(notifs)
+    return count, total
@@ -0,0 +1,214 @@
+"""
+Hàng đợi công việc nền lưu trong DB của ứng dụng, chạy bằng `flask worker`.
+
+- enqueue_job(): route ghi một dòng job rồi trả về ngay (kèm link theo dõi).
+- Worker nhận job bằng UPDATE có điều kiện (chỉ một worker thắng), giữ job
+  bằng "visibility timeout" (locked_until) và gia hạn định kỳ khi đang chạy;
+  worker chết thì job tự được nhận lại sau khi hết hạn.
+- Lỗi: thử lại với backoff lũy thừa tới max_attempts rồi chuyển 'failed'.
+- JOB_CONCURRENCY = {type: n}: giới hạn số job cùng loại chạy đồng thời
+  trên toàn bộ các worker (đếm job 'running' còn hạn trong DB).
+"""
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, select
+
+from app import db
+from app.models import Job
+
+HANDLERS = {}
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+
+def job_handler(job_type, max_attempts=3):
+    """Đăng ký hàm xử lý: fn(payload: dict, job: Job) -> dict kết quả (JSON)."""
+    def decorator(fn):
+        HANDLERS[job_type] = (fn, max_attempts)
+        return fn
+    return decorator
+
+
+def enqueue_job(job_type, payload=None, created_by=None, delay=0):
+    """Thêm job vào session hiện tại; caller tự commit."""
+    _, max_attempts = HANDLERS[job_type]
+    job = Job(
+        type=job_type,
+        payload=json.dumps(payload or {}, ensure_ascii=False),
+        max_attempts=max_attempts,
+        created_by=created_by,
+        run_after=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.session.add(job)
+    return job
+
+
+def job_output_path(job, extension):
+    folder = current_app.config.get('JOB_OUTPUT_DIR') or os.path.join(current_app.instance_path, 'jobs')
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"job_{job.id}.{extension}")
+
+
+# ---------------- nhận / hoàn tất ----------------
+def _claimable(now):
+    return or_(
+        and_(Job.status == QUEUED, Job.run_after <= now),
+        # worker trước đã chết / quá hạn visibility timeout
+        and_(Job.status == RUNNING, Job.locked_until < now)
+    )
+
+
+def claim_job(job_type, worker_id, visibility_timeout, limit=None):
+    """Nhận một job loại job_type; trả về id hoặc None."""
+    now = datetime.utcnow()
+    if limit is not None:
+        running = db.session.query(db.func.count(Job.id)).filter(
+            Job.type == job_type, Job.status == RUNNING, Job.locked_until >= now
+        ).scalar()
+        if running >= limit:
+            db.session.rollback()
+            return None
+
+    candidate = db.session.execute(
+        select(Job.id).where(Job.type == job_type, _claimable(now)).order_by(Job.id).limit(1)
+    ).scalar()
+    if candidate is None:
+        db.session.rollback()
+        return None
+
+    claimed = db.session.query(Job).filter(Job.id == candidate, _claimable(now)).update({
+        Job.status: RUNNING,
+        Job.locked_by: worker_id,
+        Job.locked_until: now + timedelta(seconds=visibility_timeout),
+        Job.attempts: Job.attempts + 1,
+    }, synchronize_session=False)
+    db.session.commit()
+    return candidate if claimed else None
+
+
+def extend_lease(job_ids, worker_id, visibility_timeout):
+    if not job_ids:
+        return
+    db.session.query(Job).filter(
+        Job.id.in_(job_ids), Job.locked_by == worker_id, Job.status == RUNNING
+    ).update({Job.locked_until: datetime.utcnow() + timedelta(seconds=visibility_timeout)},
+             synchronize_session=False)
+    db.session.commit()
+
+
+def run_job(job_id, worker_id):
+    """Chạy handler của job và ghi kết quả / lỗi."""
+    job = db.session.get(Job, job_id)
+    if job is None or job.status != RUNNING or job.locked_by != worker_id:
+        return
+    handler, _ = HANDLERS[job.type]
+    try:
+        result = handler(json.loads(job.payload or '{}'), job)
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts:
+            job.status = FAILED
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+        job.locked_by = job.locked_until = None
+        db.session.commit()
+        current_app.logger.exception('job %s (%s) failed', job_id, job.type)
+        return
+
+    job.status = SUCCEEDED
+    job.result = json.dumps(result or {}, ensure_ascii=False)
+    job.error = None
+    job.finished_at = datetime.utcnow()
+    job.locked_by = job.locked_until = None
+    db.session.commit()
+
+
+# ---------------- worker ----------------
+class Worker:
+    def __init__(self, app, job_types=None, threads=4, visibility_timeout=300, poll_interval=1.0):
+        self.app = app
+        self.job_types = job_types or sorted(HANDLERS)
+        self.threads = threads
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.limits = app.config.get('JOB_CONCURRENCY', {})
+        self.schedule = app.config.get('JOB_SCHEDULE', {})
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._running = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._next_run = {}
+
+    def stop(self):
+        self._stop.set()
+
+    def _execute(self, job_id, job_type):
+        try:
+            with self.app.app_context():
+                try:
+                    run_job(job_id, self.worker_id)
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+
+    def _enqueue_periodic(self):
+        """JOB_SCHEDULE = {type: giây}: thêm job định kỳ nếu chưa có job cùng loại đang chờ."""
+        now = time.monotonic()
+        for job_type, interval in self.schedule.items():
+            if job_type not in self.job_types or self._next_run.get(job_type, 0) > now:
+                continue
+            self._next_run[job_type] = now + interval
+            pending = db.session.query(Job.id).filter(
+                Job.type == job_type, Job.status.in_([QUEUED, RUNNING])
+            ).first()
+            if pending is None:
+                enqueue_job(job_type)
+            db.session.commit()
+
+    def run(self):
+        last_heartbeat = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='job') as pool:
+            while not self._stop.is_set():
+                claimed_any = False
+                with self.app.app_context():
+                    try:
+                        self._enqueue_periodic()
+                        for job_type in self.job_types:
+                            with self._lock:
+                                busy = len(self._running)
+                            if busy >= self.threads:
+                                break
+                            job_id = claim_job(job_type, self.worker_id, self.visibility_timeout,
+                                               self.limits.get(job_type))
+                            if job_id is None:
+                                continue
+                            claimed_any = True
+                            with self._lock:
+                                self._running[job_id] = job_type
+                            pool.submit(self._execute, job_id, job_type)
+
+                        if time.monotonic() - last_heartbeat > self.visibility_timeout / 3:
+                            with self._lock:
+                                ids = list(self._running)
+                            extend_lease(ids, self.worker_id, self.visibility_timeout)
+                            last_heartbeat = time.monotonic()
+                    except Exception:
+                        self.app.logger.exception('worker loop error')
+                    finally:
+                        db.session.remove()
+                if not claimed_any:
+                    self._stop.wait(self.poll_interval)
@@ -0,0 +1,211 @@
+"""
+Tin nhắn trực tiếp giữa hai người dùng.
+
+- Mỗi cặp người dùng có một dòng conversation (user_low_id < user_high_id,
+  UNIQUE) và hai dòng conversation_participant, mỗi người một dòng, giữ tin
+  cuối, đã đọc tới id nào và số tin chưa đọc. Danh sách hội thoại và badge
+  chưa đọc chỉ đọc các dòng này, không COUNT(*) trên bảng message.
+- Lịch sử: keyset theo message.id trên index (conversation_id, id).
+- Giao tin: khi số chưa đọc của người nhận chuyển 0 → 1, một Notification
+  type='message' được đẩy qua kênh SSE thông báo sẵn có (hub + poller liên
+  worker). Client đang mở hội thoại lấy phần mới bằng ?after_id=; không có
+  thêm vòng polling nào trên bảng message.
+"""
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Conversation, ConversationParticipant, Message, Notification, User
+from app.utils.notification_counts import add_notifications
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_PAGE_MAX = 200
+CONVERSATION_PAGE_SIZE = 20
+MAX_MESSAGE_LENGTH = 4000
+PREVIEW_LENGTH = 60
+
+
+def _pair(user_a, user_b):
+    return (user_a, user_b) if user_a < user_b else (user_b, user_a)
+
+
+def get_conversation(user_a, user_b, create=False):
+    """Cuộc trò chuyện của cặp (user_a, user_b); tạo mới nếu create=True."""
+    low, high = _pair(user_a, user_b)
+    conversation = Conversation.query.filter_by(user_low_id=low, user_high_id=high).first()
+    if conversation is not None or not create:
+        return conversation
+    try:
+        with db.session.begin_nested():
+            conversation = Conversation(user_low_id=low, user_high_id=high)
+            db.session.add(conversation)
+            db.session.flush()
+            db.session.execute(db.insert(ConversationParticipant), [
+                {"conversation_id": conversation.id, "user_id": low, "other_user_id": high},
+                {"conversation_id": conversation.id, "user_id": high, "other_user_id": low},
+            ])
+    except IntegrityError:
+        # Request khác vừa tạo cùng cặp: dùng dòng đó
+        conversation = Conversation.query.filter_by(user_low_id=low, user_high_id=high).one()
+    return conversation
+
+
+def _participant(conversation_id, user_id):
+    return db.session.query(ConversationParticipant).filter_by(
+        conversation_id=conversation_id, user_id=user_id
+    )
+
+
+def send_message(sender, receiver_id, content):
+    """
+    Ghi tin nhắn, cập nhật bộ đếm của hai phía trong cùng transaction và (nếu
+    người nhận chưa có tin chưa đọc) hẹn đẩy thông báo sau commit.
+    """
+    conversation = get_conversation(sender.id, receiver_id, create=True)
+    message = Message(sender_id=sender.id, receiver_id=receiver_id, content=content,
+                      conversation_id=conversation.id, is_read=False)
+    db.session.add(message)
+    db.session.flush()
+
+    _participant(conversation.id, sender.id).update({
+        ConversationParticipant.last_message_id: message.id,
+        ConversationParticipant.last_read_id: message.id,
+    }, synchronize_session=False)
+    _participant(conversation.id, receiver_id).update({
+        ConversationParticipant.last_message_id: message.id,
+        ConversationParticipant.unread_count: ConversationParticipant.unread_count + 1,
+    }, synchronize_session=False)
+
+    unread = _participant(conversation.id, receiver_id).with_entities(
+        ConversationParticipant.unread_count
+    ).scalar()
+    if unread == 1:
+        preview = content if len(content) <= PREVIEW_LENGTH else content[:PREVIEW_LENGTH] + '…'
+        notif = Notification(user_id=receiver_id, message=f"💬 {sender.username}: {preview}", type='message')
+        add_notifications([notif])
+    return message
+
+
+def mark_read(user_id, conversation_id, up_to_id=None):
+    """
+    Đánh dấu đã đọc mọi tin gửi tới user_id trong hội thoại (tới up_to_id nếu
+    có) bằng một câu UPDATE; bộ đếm giảm đúng số dòng vừa đổi. Trả về số đó.
+    """
+    q = db.session.query(Message).filter(
+        Message.conversation_id == conversation_id,
+        Message.receiver_id == user_id,
+        or_(Message.is_read.is_(False), Message.is_read.is_(None)),
+    )
+    if up_to_id is not None:
+        q = q.filter(Message.id <= up_to_id)
+    changed = q.update({Message.is_read: True}, synchronize_session=False)
+
+    read_to = up_to_id if up_to_id is not None else ConversationParticipant.last_message_id
+    _participant(conversation_id, user_id).update({
+        ConversationParticipant.unread_count: case(
+            (ConversationParticipant.unread_count > changed, ConversationParticipant.unread_count - changed),
+            else_=0,
+        ),
+        ConversationParticipant.last_read_id: case(
+            (ConversationParticipant.last_read_id < read_to, read_to),
+            else_=ConversationParticipant.last_read_id,
+        ),
+    }, synchronize_session=False)
+    return changed
+
+
+def unread_total(user_id):
+    """Tổng tin chưa đọc của user, cộng từ các dòng bộ đếm."""
+    return db.session.query(func.coalesce(func.sum(ConversationParticipant.unread_count), 0)).filter(
+        ConversationParticipant.user_id == user_id
+    ).scalar()
+
+
+def list_conversations(user_id, before=None, limit=CONVERSATION_PAGE_SIZE):
+    """
+    Hội thoại của user, tin mới nhất trước; keyset theo last_message_id.
+    Trả về (danh sách dict, cursor trang sau hoặc None).
+    """
+    q = db.session.query(ConversationParticipant, User, Message).join(
+        User, User.id == ConversationParticipant.other_user_id
+    ).outerjoin(
+        Message, Message.id == ConversationParticipant.last_message_id
+    ).filter(
+        ConversationParticipant.user_id == user_id,
+        ConversationParticipant.last_message_id > 0,
+    )
+    if before is not None:
+        q = q.filter(ConversationParticipant.last_message_id < before)
+    rows = q.order_by(ConversationParticipant.last_message_id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0].last_message_id
+    items = [{
+        "conversation_id": p.conversation_id,
+        "user": {"id": u.id, "username": u.username, "avatar": u.avatar},
+        "unread_count": p.unread_count,
+        "last_read_id": p.last_read_id,
+        "last_message": m.to_dict() if m is not None else None,
+    } for p, u, m in rows]
+    return items, next_cursor
+
+
+def history(conversation_id, before_id=None, after_id=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Tin nhắn của hội thoại. after_id: phần mới hơn (tăng dần, dùng khi nhận
+    thông báo có tin mới); ngược lại: trang cũ hơn before_id (giảm dần).
+    Trả về (danh sách Message, còn nữa hay không).
+    """
+    q = Message.query.filter(Message.conversation_id == conversation_id)
+    if after_id is not None:
+        rows = q.filter(Message.id > after_id).order_by(Message.id.asc()).limit(limit + 1).all()
+    else:
+        if before_id is not None:
+            q = q.filter(Message.id < before_id)
+        rows = q.order_by(Message.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    return rows[:limit], has_more
+
+
+def rebuild_conversations():
+    """
+    Gán conversation cho các tin nhắn cũ chưa có và tính lại bộ đếm của mọi
+    hội thoại từ bảng message. Trả về số hội thoại.
+    """
+    # Tin thiếu người gửi / người nhận hoặc tự gửi cho mình không thuộc cặp
+    # nào: giữ nguyên
+    pairs = db.session.query(Message.sender_id, Message.receiver_id).filter(
+        Message.conversation_id.is_(None),
+        Message.sender_id.isnot(None),
+        Message.receiver_id.isnot(None),
+        Message.sender_id != Message.receiver_id,
+    ).distinct().all()
+    for sender_id, receiver_id in pairs:
+        conversation = get_conversation(sender_id, receiver_id, create=True)
+        db.session.query(Message).filter(
+            Message.conversation_id.is_(None),
+            or_(
+                (Message.sender_id == sender_id) & (Message.receiver_id == receiver_id),
+                (Message.sender_id == receiver_id) & (Message.receiver_id == sender_id),
+            )
+        ).update({Message.conversation_id: conversation.id}, synchronize_session=False)
+
+    last = dict(db.session.query(Message.conversation_id, func.max(Message.id)).group_by(
+        Message.conversation_id
+    ).all())
+    unread = {(cid, uid): n for cid, uid, n in db.session.query(
+        Message.conversation_id, Message.receiver_id, func.count(Message.id)
+    ).filter(
+        or_(Message.is_read.is_(False), Message.is_read.is_(None))
+    ).group_by(Message.conversation_id, Message.receiver_id).all()}
+
+    participants = ConversationParticipant.query.all()
+    for p in participants:
+        p.last_message_id = last.get(p.conversation_id, 0)
+        p.unread_count = unread.get((p.conversation_id, p.user_id), 0)
+        if not p.unread_count:
+            p.last_read_id = p.last_message_id
+    db.session.commit()
+    return len({p.conversation_id for p in participants})
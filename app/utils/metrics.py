@@ -0,0 +1,210 @@
+"""
+Đo SQL và độ trễ theo từng endpoint, xuất dạng text Prometheus ở /metrics.
+
+- Sự kiện engine SQLAlchemy (before/after_cursor_execute) đếm số câu SQL và
+  thời gian SQL của request hiện tại (lưu trong flask.g).
+- Hook request của Flask ghi: số request theo status, histogram độ trễ, kích
+  thước response và số câu SQL mỗi request.
+- Request chậm hơn METRICS_SLOW_REQUEST_MS được ghi log kèm các câu SQL tốn
+  thời gian nhất.
+
+Số liệu nằm trong bộ nhớ của từng tiến trình: với nhiều worker gunicorn,
+Prometheus cần scrape từng worker (hoặc chạy 1 worker cho /metrics).
+
+/metrics lộ tên endpoint và câu SQL chậm nên không công khai: chỉ địa chỉ
+trong METRICS_ALLOWED_IPS (mặc định loopback) hoặc request kèm
+"Authorization: Bearer <METRICS_TOKEN>" được đọc, còn lại 404.
+"""
+import hmac
+import ipaddress
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, abort, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.total}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _statement_key(statement):
+    return ' '.join(statement.split())[:300]
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = defaultdict(int)  # (endpoint, method, status) -> n
+            self._latency = {}
+            self._size = {}
+            self._queries = {}
+            self._sql_count = defaultdict(int)
+            self._sql_seconds = defaultdict(float)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_SLOW_REQUEST_MS', 1000)
+        app.config.setdefault('METRICS_SLOW_TOP_SQL', 5)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+        app.extensions['metrics'] = self
+        self._app = app
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        @app.before_request
+        def _start_request():
+            g.metrics_start = time.perf_counter()
+            g.sql_count = 0
+            g.sql_seconds = 0.0
+            g.sql_statements = defaultdict(lambda: [0, 0.0])
+
+        @app.after_request
+        def _finish_request(response):
+            start = g.pop('metrics_start', None)
+            if start is not None:
+                self._record(response, time.perf_counter() - start)
+            return response
+
+        self._allowed = [ipaddress.ip_network(n.strip(), strict=False)
+                         for n in app.config['METRICS_ALLOWED_IPS'] if n.strip()]
+        app.add_url_rule('/metrics', 'metrics', self.render)
+
+    # ---------------- ghi nhận ----------------
+    def _record(self, response, elapsed):
+        endpoint = request.endpoint or 'unmatched'
+        size = response.calculate_content_length() or 0  # response stream: không biết trước → 0
+        count, seconds = g.get('sql_count', 0), g.get('sql_seconds', 0.0)
+        with self._lock:
+            self._requests[(endpoint, request.method, response.status_code)] += 1
+            self._latency.setdefault(endpoint, _Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self._size.setdefault(endpoint, _Histogram(SIZE_BUCKETS)).observe(size)
+            self._queries.setdefault(endpoint, _Histogram(QUERY_BUCKETS)).observe(count)
+            self._sql_count[endpoint] += count
+            self._sql_seconds[endpoint] += seconds
+
+        threshold = self._app.config['METRICS_SLOW_REQUEST_MS']
+        if threshold and elapsed * 1000 >= threshold:
+            top = sorted(g.get('sql_statements', {}).items(), key=lambda kv: -kv[1][1])
+            lines = [f'  {t * 1000:8.1f} ms  x{n:<4} {stmt}'
+                     for stmt, (n, t) in top[:self._app.config['METRICS_SLOW_TOP_SQL']]]
+            self._app.logger.warning(
+                'Request chậm %s %s (%s): %.0f ms, %d câu SQL (%.0f ms)%s',
+                request.method, request.path, endpoint, elapsed * 1000, count, seconds * 1000,
+                ''.join('\n' + line for line in lines)
+            )
+
+    # ---------------- xuất ----------------
+    def _authorized(self):
+        token = self._app.config['METRICS_TOKEN']
+        if token:
+            scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() == 'bearer' and hmac.compare_digest(given.encode(), token.encode()):
+                return True
+        try:
+            addr = ipaddress.ip_address(request.remote_addr or '')
+        except ValueError:
+            return False
+        return any(addr in network for network in self._allowed)
+
+    def render(self):
+        if not self._authorized():
+            # 404 thay vì 403: không cho biết endpoint tồn tại
+            abort(404)
+        return Response('\n'.join(self.lines()) + '\n', mimetype='text/plain; version=0.0.4')
+
+    def lines(self):
+        with self._lock:
+            yield '# HELP http_requests_total Số request theo endpoint, method và status.'
+            yield '# TYPE http_requests_total counter'
+            for (endpoint, method, status), n in sorted(self._requests.items()):
+                yield f'http_requests_total{{endpoint="{_label(endpoint)}",method="{method}",status="{status}"}} {n}'
+
+            for name, help_text, data in (
+                ('http_request_duration_seconds', 'Độ trễ request (giây).', self._latency),
+                ('http_response_size_bytes', 'Kích thước response (byte, 0 nếu stream).', self._size),
+                ('db_queries_per_request', 'Số câu SQL mỗi request.', self._queries),
+            ):
+                yield f'# HELP {name} {help_text}'
+                yield f'# TYPE {name} histogram'
+                for endpoint, hist in sorted(data.items()):
+                    yield from hist.lines(name, f'endpoint="{_label(endpoint)}"')
+
+            yield '# HELP db_queries_total Tổng số câu SQL theo endpoint.'
+            yield '# TYPE db_queries_total counter'
+            for endpoint, n in sorted(self._sql_count.items()):
+                yield f'db_queries_total{{endpoint="{_label(endpoint)}"}} {n}'
+            yield '# HELP db_query_duration_seconds_total Tổng thời gian SQL theo endpoint (giây).'
+            yield '# TYPE db_query_duration_seconds_total counter'
+            for endpoint, t in sorted(self._sql_seconds.items()):
+                yield f'db_query_duration_seconds_total{{endpoint="{_label(endpoint)}"}} {t}'
+
+
+metrics = RequestMetrics()
+
+
+# Lắng nghe mọi engine; chỉ đếm khi đang trong request đã bật đo (g.sql_count)
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if not has_request_context() or 'sql_count' not in g:
+        return
+    g.sql_count += 1
+    g.sql_seconds += elapsed
+    entry = g.sql_statements[_statement_key(statement)]
+    entry[0] += 1
+    entry[1] += elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    conn = context.connection
+    if conn is not None and conn.info.get('metrics_query_start'):
+        conn.info['metrics_query_start'].pop()
@@ -0,0 +1,95 @@
+"""
+Bộ đếm thông báo chưa đọc (bảng notification_counter).
+
+- Mọi nơi tạo thông báo đi qua add_notifications() (ORM) hoặc
+  record_event_notifications() (INSERT ... SELECT của outbox); bộ đếm được
+  cộng trong cùng transaction nên badge luôn khớp với bảng notification.
+- Đánh dấu đã đọc là một câu UPDATE trên notification (tất cả hoặc tới id
+  N); bộ đếm trừ đúng số dòng vừa đổi.
+- Badge chỉ đọc một dòng theo khóa chính: GET /auth/notifications/unread_count.
+"""
+from collections import Counter
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Notification, NotificationCounter
+from app.utils.notify_hub import hub
+
+
+def _increment(user_id, delta):
+    return db.session.query(NotificationCounter).filter_by(user_id=user_id).update({
+        NotificationCounter.unread_count: NotificationCounter.unread_count + delta,
+    }, synchronize_session=False)
+
+
+def record_unread(counts):
+    """Cộng {user_id: số thông báo chưa đọc mới} vào bộ đếm."""
+    for user_id, delta in counts.items():
+        if not delta or _increment(user_id, delta):
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(NotificationCounter).values(user_id=user_id, unread_count=delta))
+        except IntegrityError:
+            # Request khác vừa tạo dòng cùng user: cộng vào dòng đó
+            _increment(user_id, delta)
+
+
+def add_notifications(notifications):
+    """Thêm thông báo vào session, cộng bộ đếm và hẹn đẩy qua SSE sau commit."""
+    if not notifications:
+        return
+    db.session.add_all(notifications)
+    record_unread(Counter(n.user_id for n in notifications if not n.is_read))
+    hub.publish_on_commit(notifications)
+
+
+def record_event_notifications(event_id):
+    """Cộng bộ đếm cho các thông báo outbox vừa INSERT ... SELECT theo event_id."""
+    rows = db.session.query(Notification.user_id, func.count(Notification.id)).filter(
+        Notification.event_id == event_id,
+        or_(Notification.is_read.is_(False), Notification.is_read.is_(None)),
+    ).group_by(Notification.user_id).all()
+    record_unread(dict(rows))
+
+
+def unread_count(user_id):
+    return db.session.query(NotificationCounter.unread_count).filter_by(user_id=user_id).scalar() or 0
+
+
+def mark_read(user_id, up_to_id=None):
+    """
+    Đánh dấu đã đọc mọi thông báo của user (hoặc có id <= up_to_id) bằng một
+    câu UPDATE và trừ bộ đếm đúng số dòng đó. Trả về số dòng đã đổi.
+    """
+    q = db.session.query(Notification).filter(
+        Notification.user_id == user_id,
+        or_(Notification.is_read.is_(False), Notification.is_read.is_(None)),
+    )
+    if up_to_id is not None:
+        q = q.filter(Notification.id <= up_to_id)
+    changed = q.update({Notification.is_read: True}, synchronize_session=False)
+    if changed:
+        db.session.query(NotificationCounter).filter_by(user_id=user_id).update({
+            NotificationCounter.unread_count: case(
+                (NotificationCounter.unread_count > changed, NotificationCounter.unread_count - changed),
+                else_=0,
+            ),
+        }, synchronize_session=False)
+    return changed
+
+
+def rebuild_counters():
+    """Tính lại toàn bộ bộ đếm từ bảng notification. Trả về số user có thông báo chưa đọc."""
+    rows = db.session.query(Notification.user_id, func.count(Notification.id)).filter(
+        or_(Notification.is_read.is_(False), Notification.is_read.is_(None))
+    ).group_by(Notification.user_id).all()
+    db.session.query(NotificationCounter).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(NotificationCounter), [
+            {"user_id": user_id, "unread_count": n} for user_id, n in rows
+        ])
+    db.session.commit()
+    return len(rows)
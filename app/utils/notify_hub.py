@@ -0,0 +1,189 @@
+"""
+Hub pub/sub trong tiến trình cho kênh Server-Sent Events thông báo.
+
+- publish_on_commit(): các route gọi trước db.session.commit(); thông báo
+  chỉ được đẩy tới người đang kết nối sau khi transaction commit thành công.
+- Nhiều worker gunicorn: bảng notification chính là outbox bền vững. Mỗi
+  worker chạy một luồng poller duy nhất (chỉ khi có người đang nghe) đọc
+  các dòng id > con trỏ cho đúng những user đang kết nối tới worker đó, nên
+  tải DB là 1 truy vấn / worker / chu kỳ, không phụ thuộc số kết nối.
+- Mỗi kết nối khử trùng lặp theo id, nên nhận trùng từ publish cục bộ,
+  poller hay backlog Last-Event-ID đều an toàn.
+- Mỗi kết nối SSE giữ một thread của worker gthread: tối đa
+  NOTIFICATION_STREAM_MAX_CONNECTIONS kết nối / worker, vượt quá thì
+  subscribe() trả về None (route trả 503, client chuyển sang poll since_id).
+"""
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Giá trị mặc định, có thể ghi đè trong config
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_MAX_CONNECTIONS = 4
+# Quét lùi một khoảng id để không bỏ sót transaction commit chậm (PostgreSQL)
+POLL_LOOKBACK = 200
+POLL_BATCH = 500
+RECENT_IDS = 512
+
+OVERFLOW = object()
+
+
+class Subscription:
+    def __init__(self, user_id, maxsize, floor=0):
+        self.user_id = user_id
+        # Chỉ nhận thông báo có id > floor (client đã có phần còn lại)
+        self.floor = floor
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._recent = deque(maxlen=RECENT_IDS)
+        self._recent_set = set()
+        self._lock = threading.Lock()
+
+    def mark_delivered(self, event_id):
+        """Trả về False nếu id này đã được gửi cho kết nối."""
+        with self._lock:
+            if event_id in self._recent_set:
+                return False
+            if len(self._recent) == self._recent.maxlen:
+                self._recent_set.discard(self._recent[0])
+            self._recent.append(event_id)
+            self._recent_set.add(event_id)
+            return True
+
+    def offer(self, item):
+        if item["id"] <= self.floor or not self.mark_delivered(item["id"]):
+            return
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Client quá chậm: đóng stream, trình duyệt sẽ kết nối lại với
+            # Last-Event-ID và lấy bù từ DB nên không mất thông báo.
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(OVERFLOW)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class NotificationHub:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._app = None
+        self._poller = None
+        self._cursor = None
+
+    def init_app(self, app):
+        app.config.setdefault('NOTIFICATION_HUB_BACKEND', 'db')
+        app.config.setdefault('NOTIFICATION_STREAM_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+        app.config.setdefault('NOTIFICATION_STREAM_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        app.config.setdefault('NOTIFICATION_STREAM_HEARTBEAT', 15)
+        app.config.setdefault('NOTIFICATION_STREAM_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)
+        app.extensions['notification_hub'] = self
+        self._app = app
+
+    # ---------------- đăng ký ----------------
+    def subscribe(self, user_id, floor=0):
+        """Đăng ký một kết nối; None nếu worker đã đủ số kết nối tối đa."""
+        sub = Subscription(user_id, self._app.config['NOTIFICATION_STREAM_QUEUE_SIZE'], floor)
+        limit = self._app.config['NOTIFICATION_STREAM_MAX_CONNECTIONS']
+        with self._lock:
+            if limit and sum(len(s) for s in self._subscribers.values()) >= limit:
+                return None
+            self._subscribers[user_id].add(sub)
+        if self._app.config['NOTIFICATION_HUB_BACKEND'] == 'db':
+            self._ensure_poller()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    # ---------------- phát ----------------
+    def publish(self, user_id, item):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for sub in subs:
+            sub.offer(item)
+
+    def publish_on_commit(self, notifications):
+        """Chụp dữ liệu thông báo ngay (sau flush) và phát khi session commit."""
+        from app import db
+        if not notifications:
+            return
+        db.session.flush()
+        pending = db.session.info.setdefault('notification_hub_pending', [])
+        pending.extend((n.user_id, n.to_dict()) for n in notifications)
+
+    def _flush_pending(self, session):
+        pending = session.info.pop('notification_hub_pending', None)
+        for user_id, item in pending or ():
+            self.publish(user_id, item)
+
+    # ---------------- poller liên worker ----------------
+    def _ensure_poller(self):
+        with self._lock:
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._poll_loop, name='notification-hub-poller', daemon=True)
+            self._poller.start()
+
+    def _poll_loop(self):
+        from app import db
+        from app.models import Notification
+
+        app = self._app
+        interval = app.config['NOTIFICATION_STREAM_POLL_INTERVAL']
+        with app.app_context():
+            if self._cursor is None:
+                self._cursor = db.session.query(db.func.max(Notification.id)).scalar() or 0
+            db.session.remove()
+            while True:
+                time.sleep(interval)
+                with self._lock:
+                    user_ids = list(self._subscribers)
+                if not user_ids:
+                    continue
+                try:
+                    rows = Notification.query.filter(
+                        Notification.id > self._cursor - POLL_LOOKBACK,
+                        Notification.user_id.in_(user_ids)
+                    ).order_by(Notification.id).limit(POLL_BATCH).all()
+                    for n in rows:
+                        self.publish(n.user_id, n.to_dict())
+                        self._cursor = max(self._cursor, n.id)
+                except Exception:
+                    app.logger.exception('notification hub poll failed')
+                finally:
+                    db.session.remove()
+
+
+hub = NotificationHub()
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    hub._flush_pending(session)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('notification_hub_pending', None)
@@ -0,0 +1,194 @@
+"""
+Transactional outbox cho thông báo nhóm.
+
+Request chỉ ghi MỘT dòng outbox_event trong cùng transaction với thay đổi
+gốc (ví dụ chi tiêu mới). Dispatcher chạy nền mở rộng sự kiện thành thông
+báo bằng một câu INSERT ... SELECT trên group_member, đánh dấu đã phát trong
+cùng transaction. Nếu dispatcher chết giữa chừng, sự kiện được chạy lại
+(at-least-once); NOT EXISTS + unique (event_id, user_id) đảm bảo mỗi thành
+viên chỉ nhận một thông báo cho mỗi sự kiện.
+
+OUTBOX_DISPATCH_MODE:
+  'thread'   – luồng nền trong tiến trình, khởi động ở request đầu tiên và được
+               đánh thức sau mỗi commit (mặc định)
+  'inline'   – phát ngay sau commit trong cùng request (tiện khi test)
+  'external' – chỉ phát bằng `flask outbox dispatch --loop` / worker riêng
+"""
+import json
+import threading
+from datetime import datetime
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, exists, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import GroupMember, Notification, OutboxEvent
+from app.utils.notify_hub import hub
+from app.utils.notification_counts import record_event_notifications
+
+DEFAULT_POLL_INTERVAL = 5.0
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 10
+
+
+def enqueue(kind, group_id, actor_id, **payload):
+    """Ghi sự kiện vào session hiện tại; được phát sau khi transaction commit."""
+    evt = OutboxEvent(kind=kind, group_id=group_id, actor_id=actor_id,
+                      payload=json.dumps(payload, ensure_ascii=False))
+    db.session.add(evt)
+    db.session.info['outbox_pending'] = True
+    return evt
+
+
+def _fan_out_group(evt, payload, now):
+    """INSERT ... SELECT: một thông báo cho mỗi thành viên (trừ người tạo)."""
+    member = GroupMember.c.user_id
+    already = exists().where(Notification.event_id == evt.id, Notification.user_id == member)
+    rows = select(
+        member,
+        literal(payload["message"]),
+        literal(payload.get("link")),
+        literal(payload.get("type", evt.kind)),
+        literal(False),
+        literal(now),
+        literal(evt.id),
+    ).where(GroupMember.c.group_id == evt.group_id, ~already)
+    if evt.actor_id is not None:
+        rows = rows.where(member != evt.actor_id)
+    db.session.execute(
+        db.insert(Notification).from_select(
+            ['user_id', 'message', 'link', 'type', 'is_read', 'created_at', 'event_id'], rows
+        )
+    )
+
+
+def dispatch_event(evt):
+    """
+    Phát một sự kiện trong transaction hiện tại. Trước hết nhận sự kiện bằng
+    UPDATE có điều kiện dispatched_at IS NULL: dispatcher khác đã phát (và
+    commit) thì trả về False, không cộng bộ đếm chưa đọc lần thứ hai.
+    """
+    now = datetime.utcnow()
+    claimed = db.session.query(OutboxEvent).filter(
+        OutboxEvent.id == evt.id, OutboxEvent.dispatched_at.is_(None)
+    ).update({OutboxEvent.dispatched_at: now}, synchronize_session=False)
+    if not claimed:
+        return False
+    payload = json.loads(evt.payload or '{}')
+    _fan_out_group(evt, payload, now)
+    record_event_notifications(evt.id)
+    hub.publish_on_commit(Notification.query.filter_by(event_id=evt.id).all())
+    return True
+
+
+def dispatch_pending(limit=BATCH_SIZE):
+    """
+    Phát các sự kiện chưa phát; mỗi sự kiện một transaction. Sự kiện lỗi được
+    tăng attempts, ghi log rồi bỏ qua để không chặn các sự kiện sau (thử lại ở
+    lượt sau, tối đa MAX_ATTEMPTS lần). Trả về số sự kiện đã phát.
+    """
+    ids = [i for (i,) in db.session.query(OutboxEvent.id).filter(
+        OutboxEvent.dispatched_at.is_(None), OutboxEvent.attempts < MAX_ATTEMPTS
+    ).order_by(OutboxEvent.id).limit(limit).all()]
+    db.session.rollback()
+
+    done = 0
+    for event_id in ids:
+        evt = db.session.get(OutboxEvent, event_id)
+        if evt is None or evt.dispatched_at is not None:
+            continue
+        try:
+            dispatched = dispatch_event(evt)
+            db.session.commit()
+            done += dispatched
+        except IntegrityError:
+            # Dispatcher khác vừa phát cùng sự kiện
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            db.session.query(OutboxEvent).filter_by(id=event_id).update(
+                {OutboxEvent.attempts: OutboxEvent.attempts + 1}, synchronize_session=False
+            )
+            db.session.commit()
+            current_app.logger.exception('outbox event %s dispatch failed', event_id)
+    return done
+
+
+class OutboxDispatcher:
+    def __init__(self):
+        self._app = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('OUTBOX_DISPATCH_MODE', 'thread')
+        app.config.setdefault('OUTBOX_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        app.extensions['outbox'] = self
+        self._app = app
+
+        @app.before_request
+        def _start_dispatcher():
+            # Sau restart có thể còn sự kiện chưa phát mà không có commit nào
+            # đánh thức: khởi động luồng (quét ngay) ở request đầu tiên của
+            # worker, không bao giờ trong master của gunicorn
+            if app.config['OUTBOX_DISPATCH_MODE'] == 'thread' and self._thread is None:
+                self._ensure_thread()
+
+        @app.after_request
+        def _dispatch_inline(response):
+            if g.pop('outbox_dispatch', False):
+                try:
+                    dispatch_pending()
+                except Exception:
+                    app.logger.exception('outbox dispatch failed')
+            return response
+
+    def notify(self):
+        """Gọi sau khi transaction có sự kiện mới commit."""
+        mode = self._app.config['OUTBOX_DISPATCH_MODE']
+        if mode == 'inline':
+            # Không thể chạy SQL trong after_commit: phát ở after_request
+            if has_request_context():
+                g.outbox_dispatch = True
+        elif mode == 'thread':
+            self._ensure_thread()
+            self._wake.set()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='outbox-dispatcher', daemon=True)
+            self._thread.start()
+            self._wake.set()
+
+    def _run(self):
+        app = self._app
+        while True:
+            self._wake.wait(app.config['OUTBOX_POLL_INTERVAL'])
+            self._wake.clear()
+            with app.app_context():
+                try:
+                    while dispatch_pending() == BATCH_SIZE:
+                        pass
+                except Exception:
+                    app.logger.exception('outbox dispatch failed')
+                finally:
+                    db.session.remove()
+
+
+dispatcher = OutboxDispatcher()
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_dispatcher(session):
+    if session.info.pop('outbox_pending', False) and dispatcher._app is not None:
+        dispatcher.notify()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop('outbox_pending', None)
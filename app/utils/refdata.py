@@ -0,0 +1,121 @@
+"""
+Cache dữ liệu tham chiếu (loại chi tiêu, tỷ giá đã lưu...) trong tiến trình.
+
+- Mỗi bảng tham chiếu đăng ký một hàm nạp: @refdata.loader('categories').
+  Hàm nạp trả về dữ liệu bất biến (tuple / namedtuple / dict không bị sửa),
+  không trả đối tượng ORM vì chúng gắn với session của một request.
+- Phiên bản của từng bảng nằm trong bảng refdata_version. invalidate(name)
+  tăng phiên bản trong cùng transaction với thay đổi, nên mọi worker đều
+  thấy dữ liệu mới: mỗi tiến trình kiểm tra phiên bản (một SELECT nhỏ cho
+  mọi bảng) tối đa mỗi REFDATA_CHECK_INTERVAL giây.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import RefdataVersion
+
+DEFAULT_CHECK_INTERVAL = 5.0
+
+
+class RefdataCache:
+    def __init__(self):
+        self._loaders = {}
+        self._data = {}      # name -> (version, value)
+        self._versions = {}  # name -> version trong DB ở lần kiểm tra gần nhất
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._app = None
+
+    def init_app(self, app):
+        app.config.setdefault('REFDATA_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+        app.extensions['refdata'] = self
+        self._app = app
+        self.clear()
+
+    def loader(self, name):
+        """Đăng ký hàm nạp fn() -> dữ liệu cho bảng tham chiếu `name`."""
+        def decorator(fn):
+            self._loaders[name] = fn
+            return fn
+        return decorator
+
+    def clear(self, name=None):
+        with self._lock:
+            if name is None:
+                self._data.clear()
+                self._checked_at = 0.0
+            else:
+                self._data.pop(name, None)
+
+    def _current_versions(self):
+        interval = self._app.config['REFDATA_CHECK_INTERVAL'] if self._app else 0
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < interval:
+                return self._versions
+        versions = dict(db.session.query(RefdataVersion.name, RefdataVersion.version).all())
+        with self._lock:
+            self._versions, self._checked_at = versions, now
+        return versions
+
+    def get(self, name):
+        version = self._current_versions().get(name, 0)
+        with self._lock:
+            entry = self._data.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = self._loaders[name]()
+        with self._lock:
+            self._data[name] = (version, value)
+        return value
+
+    def invalidate(self, name, connection=None):
+        """
+        Tăng phiên bản của `name`. Mặc định ghi vào session hiện tại (commit
+        cùng thay đổi dữ liệu); truyền `connection` khi thay đổi được ghi
+        bằng một kết nối riêng.
+        """
+        table = RefdataVersion.__table__
+        execute = connection.execute if connection is not None else db.session.execute
+        updated = execute(
+            table.update().where(table.c.name == name).values(version=table.c.version + 1)
+        ).rowcount
+        if not updated:
+            try:
+                if connection is not None:
+                    with connection.begin_nested():
+                        connection.execute(table.insert().values(name=name, version=1))
+                else:
+                    with db.session.begin_nested():
+                        db.session.execute(table.insert().values(name=name, version=1))
+            except IntegrityError:
+                execute(table.update().where(table.c.name == name).values(version=table.c.version + 1))
+
+        if connection is not None:
+            self._forget(name)
+        else:
+            db.session.info.setdefault('refdata_invalidate', set()).add(name)
+
+    def _forget(self, name):
+        with self._lock:
+            self._data.pop(name, None)
+            self._checked_at = 0.0
+
+
+refdata = RefdataCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_after_commit(session):
+    for name in session.info.pop('refdata_invalidate', ()):
+        refdata._forget(name)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_invalidations(session, previous_transaction):
+    session.info.pop('refdata_invalidate', None)
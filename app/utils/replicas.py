@@ -0,0 +1,100 @@
+"""
+Định tuyến truy vấn đọc sang DB replica.
+
+- DB_REPLICA_URLS (phân tách bằng dấu phẩy) được thêm vào SQLALCHEMY_BINDS
+  với khóa replica_0, replica_1...; không cấu hình thì mọi thứ đi primary.
+- View đánh dấu @read_only (hoặc cả blueprint qua read_only_blueprint) gửi
+  SELECT sang một replica ngẫu nhiên. Flush, INSERT / UPDATE / DELETE và
+  model có bind_key riêng luôn đi primary.
+- Read-your-writes: request nào ghi vào DB sẽ lưu thời điểm vào session
+  cookie; trong DB_REPLICA_STICKY_SECONDS giây sau đó mọi truy vấn của user
+  này đọc từ primary (bỏ qua độ trễ replication).
+- Thử cục bộ với hai file SQLite: DB_REPLICA_URLS=sqlite:///replica.db rồi
+  `flask replica sync` để chép primary sang replica.
+"""
+import functools
+import random
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_PREFIX = 'replica_'
+STICKY_KEY = '_db_wrote_at'
+
+
+class RoutingSession(Session):
+    """Session của Flask-SQLAlchemy, chọn replica cho truy vấn đọc trong view read-only."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            writing = self._flushing or getattr(clause, 'is_dml', False)
+            if writing:
+                _mark_write()
+            elif _reads_from_replica() and (mapper is None or not _has_bind_key(mapper)):
+                keys = [k for k in self._db.engines if isinstance(k, str) and k.startswith(REPLICA_PREFIX)]
+                if keys:
+                    return self._db.engines[random.choice(keys)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _has_bind_key(mapper):
+    table = getattr(mapper, 'persist_selectable', None)
+    return table is not None and table.metadata.info.get('bind_key') is not None
+
+
+def _mark_write():
+    if has_request_context():
+        g.db_wrote = True
+
+
+def _reads_from_replica():
+    return has_request_context() and g.get('db_read_only', False) and not g.get('db_sticky', False)
+
+
+def read_only(view):
+    """Đánh dấu view chỉ đọc: truy vấn SELECT được gửi sang replica."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def read_only_blueprint(bp, methods=('GET', 'HEAD'), exclude=()):
+    """Chính sách theo blueprint: mọi request `methods` (trừ endpoint trong exclude) đọc từ replica."""
+    @bp.before_request
+    def _mark_read_only():
+        if request.method in methods and request.endpoint not in exclude:
+            g.db_read_only = True
+
+
+class ReplicaRouter:
+    def init_app(self, app):
+        """Gọi trước db.init_app để các replica được tạo engine như một bind."""
+        app.config.setdefault('DB_REPLICA_URLS', [])
+        app.config.setdefault('DB_REPLICA_STICKY_SECONDS', 5)
+        urls = app.config['DB_REPLICA_URLS']
+        if isinstance(urls, str):
+            urls = [u.strip() for u in urls.split(',') if u.strip()]
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        for i, url in enumerate(urls):
+            binds.setdefault(f'{REPLICA_PREFIX}{i}', url)
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.config['DB_REPLICA_URLS'] = urls
+        app.extensions['replicas'] = self
+
+        @app.before_request
+        def _check_sticky():
+            wrote_at = session.get(STICKY_KEY)
+            if wrote_at and time.time() - wrote_at < app.config['DB_REPLICA_STICKY_SECONDS']:
+                g.db_sticky = True
+
+        @app.after_request
+        def _remember_write(response):
+            if g.pop('db_wrote', False) and app.config['DB_REPLICA_URLS']:
+                session[STICKY_KEY] = time.time()
+            return response
+
+
+replicas = ReplicaRouter()
@@ -0,0 +1,395 @@
+"""
+Tìm kiếm có index: người dùng (search_friends) và chi tiêu trong nhóm.
+
+Người dùng (search_friends):
+- SQLite: bảng FTS5 contentless `user_search` (tokenizer unicode61 bỏ dấu),
+  trigger ghi username đã thay đ → d khi đăng ký / sửa hồ sơ; truy vấn tiền
+  tố "từ"* (đã bỏ dấu) cho autocomplete.
+- PostgreSQL: index GIN pg_trgm trên lower(username), lower(email); LIKE
+  'q%' / '% q%' đi qua index trigram, nên truy vấn cần một từ ≥ 3 ký tự.
+- Không có index (DB tạo bằng create_all, SQLite thiếu FTS5): LIKE có giới hạn.
+
+Kết quả xếp theo tầng: bạn bè → người chung nhóm → những người khác; trong
+mỗi tầng theo id. Phân trang keyset với cursor "tầng:id", mỗi trang tối đa
+SEARCH_PAGE_SIZE người. Mọi tầng dùng chung một điều kiện khớp (_user_match);
+tầng 0/1 chỉ xét tập bạn bè / người chung nhóm (nhỏ), tầng 2 đọc từ index
+theo rowid nên chi phí không phụ thuộc số user.
+
+Chi tiêu (title, note), bỏ dấu tiếng Việt kể cả đ → d:
+- SQLite: bảng FTS5 contentless `expense_search`, trigger INSERT / DELETE /
+  UPDATE trên expense ghi bản đã thay đ → d (unicode61 lo phần dấu còn lại)
+  cùng group_id; MATCH lọc theo group_id nên chỉ đọc phần index của nhóm.
+- PostgreSQL: hàm IMMUTABLE expense_search_text(title, note) = tsvector
+  'simple' của unaccent(...) và index GIN trên biểu thức đó.
+- Không có index: LIKE trên cột đã bỏ dấu (_folded), cùng kết quả với FTS.
+- expense_match() trả về một điều kiện lọc để ghép với các bộ lọc ngày /
+  người trả và phân trang keyset sẵn có của expense_list.
+"""
+import re
+import unicodedata
+
+from sqlalchemy import text, or_, and_, exists, select, func, literal_column, table
+
+from app import db
+from app.models import User, Friendship, GroupMember, Expense
+
+SEARCH_PAGE_SIZE = 20
+SUGGEST_SIZE = 8
+MIN_QUERY_LENGTH = 2
+# pg_trgm chỉ dùng được index khi mẫu LIKE có ít nhất 3 ký tự (một trigram)
+MIN_TRGM_QUERY_LENGTH = 3
+TIER_FRIEND, TIER_GROUP, TIER_OTHER = 0, 1, 2
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+_backend_cache = {}
+
+
+def _backend(index):
+    """
+    Backend của index `index` ('user_search' / 'expense_search') trên DB hiện
+    tại: 'fts5', 'trgm', 'tsvector' hoặc 'like' (cache theo engine).
+    """
+    engine = db.engine
+    key = (engine, index)
+    backend = _backend_cache.get(key)
+    if backend is None:
+        if engine.dialect.name == 'sqlite':
+            found = db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {"name": index}).first()
+            backend = 'fts5' if found else 'like'
+        elif engine.dialect.name == 'postgresql' and index == 'user_search':
+            backend = 'trgm'
+        elif engine.dialect.name == 'postgresql':
+            found = db.session.execute(text(
+                "SELECT 1 FROM pg_proc WHERE proname = 'expense_search_text'"
+            )).first()
+            backend = 'tsvector' if found else 'like'
+        else:
+            backend = 'like'
+        _backend_cache[key] = backend
+    return backend
+
+
+def reset_backend_cache():
+    _backend_cache.clear()
+
+
+def fold(value):
+    """Bỏ dấu tiếng Việt và chữ hoa: 'Đà Nẵng' -> 'da nang'."""
+    value = (value or '').replace('đ', 'd').replace('Đ', 'D')
+    value = unicodedata.normalize('NFD', value)
+    return ''.join(ch for ch in value if unicodedata.category(ch) != 'Mn').lower()
+
+
+def words(query):
+    return [w.lower() for w in _WORD.findall(query or '')]
+
+
+def fts_prefix_query(query):
+    """'Đức ng' -> '"duc"* "ng"*' (mọi từ, đã bỏ dấu, phải khớp tiền tố một token)."""
+    return ' '.join(f'"{w}"*' for w in words(fold(query)))
+
+
+def _like_match(query):
+    """Mỗi từ phải là tiền tố của username / email hoặc của một từ trong đó."""
+    conditions = []
+    for w in words(query):
+        w = w.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append(or_(*(
+            func.lower(column).like(f'{boundary}{w}%', escape='\\')
+            for column in (User.username, User.email)
+            for boundary in ('', '% ', '%.', '%@', '%\\_', '%-')
+        )))
+    return and_(*conditions)
+
+
+def _user_match(query):
+    """
+    Điều kiện khớp `query` dùng chung cho mọi tầng, để bạn bè / người chung
+    nhóm được so khớp giống hệt người lạ (FTS5 bỏ dấu nếu có index).
+    """
+    if _backend('user_search') == 'fts5':
+        return User.id.in_(
+            select(literal_column('rowid')).select_from(table('user_search'))
+            .where(text('user_search MATCH :user_q').bindparams(user_q=fts_prefix_query(query)))
+        )
+    return _like_match(query)
+
+
+def _friend_ids(user_id):
+    return select(Friendship.friend_id).where(
+        Friendship.user_id == user_id, Friendship.status == 'accepted'
+    ).union(select(Friendship.user_id).where(
+        Friendship.friend_id == user_id, Friendship.status == 'accepted'
+    ))
+
+
+def _group_mate_ids(user_id):
+    mine = select(GroupMember.c.group_id).where(GroupMember.c.user_id == user_id)
+    return select(GroupMember.c.user_id).where(GroupMember.c.group_id.in_(mine))
+
+
+def _fts_other_ids(user_id, query, after_id, limit):
+    """
+    Tầng 2 trên FTS5: đọc rowid từ index theo từng lô, loại bạn bè / người
+    chung nhóm (đã trả ở tầng trước) trên lô nhỏ vừa đọc.
+    """
+    match = fts_prefix_query(query)
+    batch = limit * 2 + 10
+    result = []
+    while len(result) < limit:
+        rows = db.session.execute(text(
+            "SELECT rowid FROM user_search WHERE user_search MATCH :q AND rowid > :after "
+            "ORDER BY rowid LIMIT :n"
+        ), {"q": match, "after": after_id, "n": batch}).scalars().all()
+        if not rows:
+            break
+        known = set(db.session.execute(
+            select(User.id).where(User.id.in_(rows), or_(
+                User.id.in_(_friend_ids(user_id)), User.id.in_(_group_mate_ids(user_id))
+            ))
+        ).scalars())
+        result += [i for i in rows if i not in known and i != user_id]
+        if len(rows) < batch:
+            break
+        after_id = rows[-1]
+    return result[:limit]
+
+
+def _tier_ids(tier, user_id, query, after_id, limit):
+    """Id người dùng khớp `query` trong một tầng, id > after_id, tăng dần."""
+    if tier == TIER_FRIEND:
+        q = select(User.id).where(User.id.in_(_friend_ids(user_id)), _user_match(query))
+    elif tier == TIER_GROUP:
+        q = select(User.id).where(
+            User.id.in_(_group_mate_ids(user_id)), User.id.notin_(_friend_ids(user_id)), _user_match(query)
+        )
+    else:
+        if _backend('user_search') == 'fts5':
+            return _fts_other_ids(user_id, query, after_id, limit)
+        q = select(User.id).where(
+            _like_match(query),
+            ~exists().where(Friendship.status == 'accepted', or_(
+                and_(Friendship.user_id == user_id, Friendship.friend_id == User.id),
+                and_(Friendship.friend_id == user_id, Friendship.user_id == User.id),
+            )),
+            User.id.notin_(_group_mate_ids(user_id)),
+        )
+    q = q.where(User.id > after_id, User.id != user_id).order_by(User.id).limit(limit)
+    return db.session.execute(q).scalars().all()
+
+
+def encode_cursor(tier, user_id):
+    return f"{tier}:{user_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        tier, last_id = cursor.split(':', 1)
+        return int(tier), int(last_id)
+    except (AttributeError, ValueError):
+        return TIER_FRIEND, 0
+
+
+def min_query_length():
+    """Số ký tự tối thiểu của truy vấn: 3 với index trigram, còn lại MIN_QUERY_LENGTH."""
+    return MIN_TRGM_QUERY_LENGTH if _backend('user_search') == 'trgm' else MIN_QUERY_LENGTH
+
+
+def search_users(user_id, query, cursor=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Trả về (danh sách (User, tầng), cursor trang sau hoặc None).
+    Truy vấn ngắn hơn min_query_length() ký tự không tìm gì; với pg_trgm từ
+    dài nhất phải đủ 3 ký tự, nếu không LIKE sẽ quét cả bảng user.
+    """
+    terms = words(query)
+    if len(''.join(terms)) < MIN_QUERY_LENGTH:
+        return [], None
+    if _backend('user_search') == 'trgm' and max(map(len, terms)) < MIN_TRGM_QUERY_LENGTH:
+        return [], None
+    tier, after_id = decode_cursor(cursor)
+    found = []
+    while tier <= TIER_OTHER and len(found) < limit + 1:
+        ids = _tier_ids(tier, user_id, query, after_id, limit + 1 - len(found))
+        found += [(i, tier) for i in ids]
+        tier, after_id = tier + 1, 0
+
+    next_cursor = None
+    if len(found) > limit:
+        found = found[:limit]
+        next_cursor = encode_cursor(found[-1][1], found[-1][0])
+
+    users = {u.id: u for u in User.query.filter(User.id.in_([i for i, _ in found])).all()} if found else {}
+    return [(users[i], t) for i, t in found if i in users], next_cursor
+
+
+# Giá trị ghi vào user_search từ một dòng user: username đã thay đ → d (phần
+# dấu còn lại do tokenizer bỏ) để "duc" tìm được "Đức"
+_USER_VALUES = "replace(replace({row}.username, 'đ', 'd'), 'Đ', 'D'), {row}.email"
+
+SQLITE_USER_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(
+        username, email, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_ai AFTER INSERT ON user BEGIN
+        INSERT INTO user_search(rowid, username, email) VALUES (new.id, {_USER_VALUES.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_ad AFTER DELETE ON user BEGIN
+        INSERT INTO user_search(user_search, rowid, username, email)
+        VALUES ('delete', old.id, {_USER_VALUES.format(row='old')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_search_au AFTER UPDATE OF username, email ON user BEGIN
+        INSERT INTO user_search(user_search, rowid, username, email)
+        VALUES ('delete', old.id, {_USER_VALUES.format(row='old')});
+        INSERT INTO user_search(rowid, username, email) VALUES (new.id, {_USER_VALUES.format(row='new')});
+    END""",
+]
+
+# Dựng lại từ đầu (bản cũ là external content trên bảng user, chưa thay đ)
+SQLITE_USER_DROP = [
+    "DROP TRIGGER IF EXISTS user_search_au",
+    "DROP TRIGGER IF EXISTS user_search_ad",
+    "DROP TRIGGER IF EXISTS user_search_ai",
+    "DROP TABLE IF EXISTS user_search",
+]
+
+POSTGRES_USER_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS ix_user_username_trgm ON "user" USING gin (lower(username) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_user_email_trgm ON "user" USING gin (lower(email) gin_trgm_ops)',
+]
+
+
+def rebuild_user_index():
+    """
+    Tạo index tìm kiếm người dùng nếu chưa có (DB dựng bằng create_all) và
+    (SQLite) nạp lại toàn bộ bảng FTS5 từ bảng user. Trả về backend đang dùng.
+    """
+    dialect = db.engine.dialect.name
+    statements = {'sqlite': SQLITE_USER_DROP + SQLITE_USER_INDEX,
+                  'postgresql': POSTGRES_USER_INDEX}.get(dialect, [])
+    for statement in statements:
+        db.session.execute(text(statement))
+    if dialect == 'sqlite':
+        # Bảng contentless vừa tạo lại: nạp cùng biểu thức với trigger
+        db.session.execute(text(
+            f"INSERT INTO user_search(rowid, username, email) SELECT id, {_USER_VALUES.format(row='user')} FROM user"
+        ))
+    db.session.commit()
+    reset_backend_cache()
+    return _backend('user_search')
+
+
+def expense_match(group_id, query):
+    """
+    Điều kiện lọc Expense của nhóm `group_id` khớp `query` (mọi từ, theo tiền
+    tố, bỏ dấu) hoặc None nếu query rỗng. Vẫn ghép cùng Expense.group_id == ...
+    """
+    terms = words(fold(query))
+    if not terms:
+        return None
+    backend = _backend('expense_search')
+    if backend == 'fts5':
+        # group_id là một cột được index của bảng FTS5: lọc nhóm ngay trong
+        # MATCH để chỉ đọc posting list của nhóm, không quét cả bảng
+        match = f'group_id:"{int(group_id)}" AND {{title note}}:(' + ' '.join(f'"{w}"*' for w in terms) + ')'
+        return Expense.id.in_(
+            select(literal_column('rowid')).select_from(table('expense_search'))
+            .where(text('expense_search MATCH :expense_q').bindparams(expense_q=match))
+        )
+    if backend == 'tsvector':
+        tsquery = ' & '.join(f"'{w}':*" for w in terms)
+        return func.expense_search_text(Expense.title, Expense.note).op('@@')(
+            func.to_tsquery('simple', tsquery)
+        )
+    # Không có index: tiền tố của một từ trong bản đã bỏ dấu, như token FTS
+    conditions = []
+    for w in terms:
+        w = w.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append(or_(*(
+            _folded(column).like(f'{boundary}{w}%', escape='\\')
+            for column in (Expense.title, Expense.note)
+            for boundary in _EXPENSE_BOUNDARIES
+        )))
+    return and_(*conditions)
+
+
+_EXPENSE_BOUNDARIES = ('', '% ', '%-', '%/', '%.', '%,', '%(')
+
+
+# Chữ có dấu tiếng Việt (thường) và bản bỏ dấu, cho translate() phía DB
+_VN_ACCENTED = ('àáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọôồốổỗộơờớởỡợ'
+                'ùúủũụưừứửữựỳýỷỹỵđ')
+_VN_FOLDED = fold(_VN_ACCENTED)
+
+
+def _folded(column):
+    """
+    `column` đã bỏ dấu và chữ hoa phía DB, giống fold(): SQLite dùng hàm
+    vn_fold đăng ký trên mỗi kết nối (db_profiles), DB khác dùng translate().
+    """
+    if db.engine.dialect.name == 'sqlite':
+        return func.vn_fold(column)
+    return func.translate(func.lower(func.coalesce(column, '')), _VN_ACCENTED, _VN_FOLDED)
+
+
+# Giá trị ghi vào expense_search từ một dòng expense (đ → d; phần dấu còn lại do tokenizer bỏ)
+_EXPENSE_VALUES = ("replace(replace({row}.title, 'đ', 'd'), 'Đ', 'D'), "
+                   "replace(replace(coalesce({row}.note, ''), 'đ', 'd'), 'Đ', 'D'), "
+                   "{row}.group_id")
+
+SQLITE_EXPENSE_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS expense_search USING fts5(
+        title, note, group_id, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS expense_search_ai AFTER INSERT ON expense BEGIN
+        INSERT INTO expense_search(rowid, title, note, group_id) VALUES (new.id, {_EXPENSE_VALUES.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expense_search_ad AFTER DELETE ON expense BEGIN
+        INSERT INTO expense_search(expense_search, rowid, title, note, group_id)
+        VALUES ('delete', old.id, {_EXPENSE_VALUES.format(row='old')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expense_search_au AFTER UPDATE OF title, note, group_id ON expense BEGIN
+        INSERT INTO expense_search(expense_search, rowid, title, note, group_id)
+        VALUES ('delete', old.id, {_EXPENSE_VALUES.format(row='old')});
+        INSERT INTO expense_search(rowid, title, note, group_id) VALUES (new.id, {_EXPENSE_VALUES.format(row='new')});
+    END""",
+]
+
+# Dựng lại từ đầu (lược đồ bảng FTS5 / trigger có thể là bản cũ)
+SQLITE_EXPENSE_DROP = [
+    "DROP TRIGGER IF EXISTS expense_search_au",
+    "DROP TRIGGER IF EXISTS expense_search_ad",
+    "DROP TRIGGER IF EXISTS expense_search_ai",
+    "DROP TABLE IF EXISTS expense_search",
+]
+
+POSTGRES_EXPENSE_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """CREATE OR REPLACE FUNCTION expense_search_text(title text, note text) RETURNS tsvector
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+        SELECT to_tsvector('simple'::regconfig,
+                           public.unaccent('public.unaccent'::regdictionary, coalesce(title, '') || ' ' || coalesce(note, '')))
+    $$""",
+    "CREATE INDEX IF NOT EXISTS ix_expense_search ON expense USING gin (expense_search_text(title, note))",
+]
+
+
+def rebuild_expense_index():
+    """
+    Tạo index tìm kiếm chi tiêu nếu chưa có và (SQLite) nạp lại toàn bộ từ
+    bảng expense. Trả về backend đang dùng.
+    """
+    dialect = db.engine.dialect.name
+    statements = {'sqlite': SQLITE_EXPENSE_DROP + SQLITE_EXPENSE_INDEX,
+                  'postgresql': POSTGRES_EXPENSE_INDEX}.get(dialect, [])
+    for statement in statements:
+        db.session.execute(text(statement))
+    if dialect == 'sqlite':
+        # Bảng contentless vừa tạo lại: nạp cùng biểu thức với trigger
+        db.session.execute(text(
+            f"INSERT INTO expense_search(rowid, title, note, group_id) "
+            f"SELECT id, {_EXPENSE_VALUES.format(row='expense')} FROM expense"
+        ))
+    db.session.commit()
+    reset_backend_cache()
+    return _backend('expense_search')
@@ -0,0 +1,169 @@
+"""
+Sinh dữ liệu giả ở quy mô production để đo hiệu năng (`flask seed-load`).
+
+Mọi bảng được ghi bằng insert hàng loạt của SQLAlchemy Core theo lô; sổ cái
+group_balance và bảng thống kê group_spending được tính lại một lần ở cuối.
+Cùng `seed` cho cùng dữ liệu, nên kết quả benchmark so sánh được giữa các commit.
+"""
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Category, Expense, ExpenseShare, Group, GroupMember, Notification, User
+from app.utils.analytics import rebuild_group_spending
+from app.utils.balances import rebuild_group_balances
+from app.utils.exchange_rate import FixedRateProvider
+from app.utils.notification_counts import record_unread
+from app.utils.refdata import refdata
+
+BATCH_SIZE = 5000
+SEED_PASSWORD = 'password'
+
+DEFAULT_CATEGORIES = [
+    ("Ăn uống", "🍔"), ("Đi lại", "🚗"), ("Mua sắm", "🛍️"),
+    ("Giải trí", "🎮"), ("Hóa đơn", "💡"), ("Khác", "📌"),
+]
+# (tiền tệ, trọng số, khoảng số tiền gốc)
+CURRENCY_MIX = [
+    ("VND", 80, (20000, 2000000)),
+    ("USD", 8, (5, 300)),
+    ("EUR", 4, (5, 250)),
+    ("JPY", 3, (500, 30000)),
+    ("THB", 3, (100, 5000)),
+    ("SGD", 2, (5, 300)),
+]
+# Trọng số loại chi tiêu (theo thứ tự DEFAULT_CATEGORIES); phần còn lại không phân loại
+CATEGORY_WEIGHTS = [35, 15, 15, 10, 10, 5]
+UNCATEGORIZED_WEIGHT = 10
+
+
+def _ensure_categories():
+    existing = dict(db.session.query(Category.name, Category.id).all())
+    missing = [{"name": n, "icon": i} for n, i in DEFAULT_CATEGORIES if n not in existing]
+    if missing:
+        db.session.execute(db.insert(Category), missing)
+        refdata.invalidate('categories')
+        existing = dict(db.session.query(Category.name, Category.id).all())
+    return [existing[n] for n, _ in DEFAULT_CATEGORIES]
+
+
+def _insert_returning(model, rows):
+    return db.session.scalars(
+        db.insert(model).returning(model.id, sort_by_parameter_order=True), rows
+    ).all()
+
+
+def seed_users(n, prefix='load'):
+    """Tạo n user (mật khẩu chung SEED_PASSWORD); trả về danh sách id."""
+    password_hash = generate_password_hash(SEED_PASSWORD)  # băm một lần, dùng chung
+    offset = db.session.query(db.func.count(User.id)).scalar() or 0
+    ids = []
+    for lo in range(0, n, BATCH_SIZE):
+        ids += _insert_returning(User, [
+            {"username": f"{prefix}{offset + i}", "email": f"{prefix}{offset + i}@example.com",
+             "password_hash": password_hash}
+            for i in range(lo, min(lo + BATCH_SIZE, n))
+        ])
+    return ids
+
+
+def seed_expenses(group_id, member_ids, n, rnd, category_ids, start, days, settled_ratio=0.1):
+    """Sinh n chi tiêu chia đều cho các thành viên, theo lô."""
+    rates = FixedRateProvider.FIXED_RATES
+    currencies = [c for c, _, _ in CURRENCY_MIX]
+    currency_weights = [w for _, w, _ in CURRENCY_MIX]
+    ranges = {c: r for c, _, r in CURRENCY_MIX}
+    categories = category_ids + [None]
+    category_weights = CATEGORY_WEIGHTS[:len(category_ids)] + [UNCATEGORIZED_WEIGHT]
+    span = days * 86400
+
+    for lo in range(0, n, BATCH_SIZE):
+        size = min(BATCH_SIZE, n - lo)
+        picked_currencies = rnd.choices(currencies, currency_weights, k=size)
+        picked_categories = rnd.choices(categories, category_weights, k=size)
+        rows = []
+        for i in range(size):
+            currency = picked_currencies[i]
+            low, high = ranges[currency]
+            amount = float(rnd.randint(low, high))
+            if currency == 'VND':
+                amount = round(amount, -3)
+            payer = rnd.choice(member_ids)
+            rows.append({
+                "title": f"Chi tiêu {lo + i}", "amount": amount, "currency": currency,
+                "base_amount_vnd": amount * rates[currency],
+                "date": start + timedelta(seconds=rnd.randrange(span)),
+                "group_id": group_id, "user_id": payer, "created_by": payer,
+                "category_id": picked_categories[i],
+            })
+        ids = _insert_returning(Expense, rows)
+
+        shares = []
+        for expense_id, row in zip(ids, rows):
+            per_person = round(row["base_amount_vnd"] / len(member_ids), 2)
+            for uid in member_ids:
+                shares.append({"expense_id": expense_id, "user_id": uid, "share_amount": per_person,
+                               "is_settled": rnd.random() < settled_ratio})
+        db.session.execute(db.insert(ExpenseShare), shares)
+        db.session.commit()
+
+
+def seed_notifications(user_ids, per_user, rnd, start, days):
+    rows = []
+    unread = Counter()
+    span = days * 86400
+    for uid in user_ids:
+        for k in range(per_user):
+            is_read = rnd.random() < 0.7
+            unread[uid] += not is_read
+            rows.append({"user_id": uid, "message": f"Thông báo thử {k}", "type": "expense",
+                         "is_read": is_read, "link": "#",
+                         "created_at": start + timedelta(seconds=rnd.randrange(span))})
+            if len(rows) >= BATCH_SIZE:
+                db.session.execute(db.insert(Notification), rows)
+                rows = []
+    if rows:
+        db.session.execute(db.insert(Notification), rows)
+    record_unread(unread)
+    db.session.commit()
+
+
+def seed_load(users=100, groups=10, members=5, expenses=10000, notifications=50, days=730, seed=42,
+              progress=None):
+    """
+    Sinh `users` user, `groups` nhóm (mỗi nhóm `members` thành viên ngẫu nhiên),
+    tổng cộng `expenses` chi tiêu chia đều giữa các nhóm trong `days` ngày gần
+    nhất và `notifications` thông báo mỗi user. Trả về dict thống kê.
+    """
+    rnd = random.Random(seed)
+    progress = progress or (lambda message: None)
+    members = max(1, min(members, users))
+    start = datetime.utcnow() - timedelta(days=days)
+
+    category_ids = _ensure_categories()
+    user_ids = seed_users(users)
+    db.session.commit()
+    progress(f"{len(user_ids)} user")
+
+    group_ids = []
+    for k in range(groups):
+        member_ids = rnd.sample(user_ids, members)
+        group = Group(name=f"Load {k + 1}", creator_id=member_ids[0])
+        db.session.add(group)
+        db.session.flush()
+        db.session.execute(db.insert(GroupMember), [{"group_id": group.id, "user_id": uid} for uid in member_ids])
+        n = expenses // groups + (1 if k < expenses % groups else 0)
+        seed_expenses(group.id, member_ids, n, rnd, category_ids, start, days)
+        rebuild_group_balances(group)
+        rebuild_group_spending(group.id)
+        db.session.commit()
+        group_ids.append(group.id)
+        progress(f"nhóm {group.id}: {members} thành viên, {n} chi tiêu")
+
+    seed_notifications(user_ids, notifications, rnd, start, days)
+    progress(f"{len(user_ids) * notifications} thông báo")
+    return {"users": user_ids, "groups": group_ids, "expenses": expenses,
+            "notifications": len(user_ids) * notifications}
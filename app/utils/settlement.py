@@ -0,0 +1,156 @@
+"""
+Gợi ý thanh toán nợ giữa các thành viên.
+
+Mọi phép tính dùng số nguyên theo đơn vị nhỏ nhất (1/100 đồng, khớp với
+round(..., 2) khi chia phần), nên không còn phần dư float làm sinh thêm
+gợi ý rác. Nhóm nhỏ dùng thuật toán tối ưu số lần chuyển tiền, nhóm lớn
+dùng thuật toán tham lam. Kết quả được cache theo (group_id, revision).
+"""
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+MINOR_PER_VND = 100
+# Số dư |b| <= ngưỡng này (VND) coi như đã cân bằng
+DEFAULT_TOLERANCE_VND = 1.0
+# Nhóm có tối đa bấy nhiêu người còn số dư thì dùng chế độ tối ưu (O(2^n · n))
+DEFAULT_EXACT_MAX = 10
+CACHE_SIZE = 512
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def to_minor(amount_vnd):
+    return int(round(float(amount_vnd or 0) * MINOR_PER_VND))
+
+
+def to_vnd(amount_minor):
+    return amount_minor / MINOR_PER_VND
+
+
+def _normalize(balances, tolerance):
+    """
+    Bỏ các số dư nhỏ hơn ngưỡng; nếu tổng còn dư trong ngưỡng (sai số làm tròn)
+    thì dồn phần dư vào người có số dư lớn nhất để tổng bằng đúng 0.
+    """
+    items = {uid: amt for uid, amt in balances.items() if abs(amt) > tolerance}
+    residue = sum(items.values())
+    if items and residue and abs(residue) <= tolerance * len(items):
+        largest = max(items, key=lambda uid: abs(items[uid]))
+        items[largest] -= residue
+        if abs(items[largest]) <= tolerance:
+            del items[largest]
+    return items
+
+
+def settle_greedy(balances, tolerance=0):
+    """
+    Ghép người nợ nhiều nhất với người được nhận nhiều nhất.
+    balances: {user_id: số dư (đơn vị nhỏ)}; trả về [(from_id, to_id, amount)].
+    """
+    debtors = sorted(((-amt, uid) for uid, amt in balances.items() if amt < -tolerance), reverse=True)
+    creditors = sorted(((amt, uid) for uid, amt in balances.items() if amt > tolerance), reverse=True)
+    debtors = [[amt, uid] for amt, uid in debtors]
+    creditors = [[amt, uid] for amt, uid in creditors]
+
+    transfers = []
+    i = j = 0
+    while i < len(debtors) and j < len(creditors):
+        debtor, creditor = debtors[i], creditors[j]
+        amount = min(debtor[0], creditor[0])
+        transfers.append((debtor[1], creditor[1], amount))
+        debtor[0] -= amount
+        creditor[0] -= amount
+        if debtor[0] <= tolerance:
+            i += 1
+        if creditor[0] <= tolerance:
+            j += 1
+    return transfers
+
+
+def settle_optimal(balances, tolerance=0):
+    """
+    Số lần chuyển tiền tối thiểu = n - (số nhóm con có tổng bằng 0 nhiều nhất).
+    Quy hoạch động trên bitmask, rồi áp dụng tham lam trong từng nhóm con.
+    Chỉ dùng khi tổng số dư bằng 0 và n nhỏ.
+    """
+    ids = list(balances)
+    amounts = [balances[uid] for uid in ids]
+    n = len(ids)
+    full = (1 << n) - 1
+
+    sums = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + amounts[low.bit_length() - 1]
+
+    best = [0] * (full + 1)
+    choice = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        best_val, best_low = -1, 0
+        m = mask
+        while m:
+            low = m & -m
+            if best[mask ^ low] > best_val:
+                best_val, best_low = best[mask ^ low], low
+            m ^= low
+        best[mask] = best_val + (1 if abs(sums[mask]) <= tolerance else 0)
+        choice[mask] = best_low
+
+    # Tách các nhóm con có tổng bằng 0 theo thứ tự đã chọn
+    transfers = []
+    mask, current = full, 0
+    while mask:
+        low = choice[mask]
+        current |= low
+        mask ^= low
+        if abs(sums[mask]) <= tolerance:
+            subset = {ids[k]: amounts[k] for k in range(n) if current >> k & 1}
+            transfers.extend(settle_greedy(subset, tolerance))
+            current = 0
+    return transfers
+
+
+def settle(balances, tolerance=0, exact_max=DEFAULT_EXACT_MAX):
+    """Chọn thuật toán: tối ưu cho nhóm nhỏ cân bằng, tham lam cho còn lại."""
+    items = _normalize(balances, tolerance)
+    if len(items) <= exact_max and abs(sum(items.values())) <= tolerance:
+        return settle_optimal(items, tolerance)
+    return settle_greedy(items, tolerance)
+
+
+def _config():
+    tolerance = current_app.config.get('SETTLEMENT_TOLERANCE_VND', DEFAULT_TOLERANCE_VND)
+    exact_max = current_app.config.get('SETTLEMENT_EXACT_MAX', DEFAULT_EXACT_MAX)
+    return to_minor(tolerance), exact_max
+
+
+def suggest_settlements(group, member_balances):
+    """
+    Trả về [{"from": User, "to": User, "amount": float VND}] cho template.
+    Kết quả tính theo id được cache theo group.revision, nên các lần xem lại
+    trang khi nhóm chưa thay đổi không phải tính lại.
+    """
+    tolerance, exact_max = _config()
+    key = (group.id, group.revision, tolerance, exact_max)
+    with _cache_lock:
+        transfers = _cache.get(key)
+        if transfers is not None:
+            _cache.move_to_end(key)
+
+    if transfers is None:
+        minor = {uid: to_minor(row["balance"]) for uid, row in member_balances.items()}
+        transfers = tuple(settle(minor, tolerance, exact_max))
+        with _cache_lock:
+            _cache[key] = transfers
+            while len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    users = {uid: row["user"] for uid, row in member_balances.items()}
+    return [
+        {"from": users[frm], "to": users[to], "amount": to_vnd(amount)}
+        for frm, to, amount in transfers
+        if frm in users and to in users
+    ]
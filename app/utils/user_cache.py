@@ -0,0 +1,107 @@
+"""
+Cache LRU trong tiến trình cho user loader của Flask-Login.
+
+Mỗi request đã đăng nhập (kể cả poll thông báo) trước đây tốn một truy vấn
+`SELECT user`. Cache lưu các cột của User (bản ghi nhẹ, không kèm
+relationship) với TTL ngắn; khi trúng cache, đối tượng được gắn lại vào
+session bằng merge(load=False) nên không có round trip DB nào, còn
+relationship vẫn lazy-load bình thường.
+
+Thay đổi qua ORM (tên, email, mật khẩu, avatar...) tự vô hiệu entry sau khi
+commit. Cập nhật bằng UPDATE hàng loạt / SQL thô phải gọi
+user_cache.invalidate(user_id). Các worker khác thấy thay đổi sau tối đa
+USER_CACHE_TTL giây.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app import db
+
+
+class UserCache:
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # user_id -> (hết hạn, {cột: giá trị})
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_SIZE', self.maxsize)
+        app.config.setdefault('USER_CACHE_TTL', self.ttl)
+        self.maxsize = app.config['USER_CACHE_SIZE']
+        self.ttl = app.config['USER_CACHE_TTL']
+        app.extensions['user_cache'] = self
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user):
+        if not self.ttl or not self.maxsize:
+            return
+        columns = {attr.key: getattr(user, attr.key) for attr in inspect(type(user)).column_attrs}
+        with self._lock:
+            self._data[user.id] = (time.monotonic() + self.ttl, columns)
+            self._data.move_to_end(user.id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """Xóa một user (hoặc toàn bộ cache nếu user_id=None)."""
+        with self._lock:
+            if user_id is None:
+                self._data.clear()
+            else:
+                self._data.pop(user_id, None)
+
+    def load(self, user_id):
+        """User gắn với session hiện tại; chỉ truy vấn DB khi không có trong cache."""
+        from app.models import User
+        columns = self.get(user_id)
+        if columns is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self.put(user)
+            return user
+        user = User(**columns)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+
+user_cache = UserCache()
+
+
+def _mark_changed(session, instance):
+    session.info.setdefault('user_cache_invalidate', set()).add(instance.id)
+    user_cache.invalidate(instance.id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_user_changes(session, flush_context):
+    from app.models import User
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            _mark_changed(session, instance)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # Xóa lại sau commit: request khác có thể đã nạp bản cũ trong lúc chờ commit
+    for user_id in session.info.pop('user_cache_invalidate', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_user_changes(session, previous_transaction):
+    session.info.pop('user_cache_invalidate', None)
@@ -0,0 +1,61 @@
+"""
+Benchmark Group.calculate_balances: cách cũ (vòng lặp Python) so với
+truy vấn tổng hợp SQL trong app/utils/balances.py.
+
+    python benchmarks/bench_balances.py --sizes 1000 10000 100000 --members 10
+
+Cột "ms/1k" gần như không đổi khi số chi tiêu tăng ⇒ độ phức tạp tuyến tính.
+"""
+import argparse
+import os
+
+from common import make_app, seed_group, timed
+from app import db
+from app.models import Group
+
+
+def legacy_calculate_balances(group):
+    # Bản sao của cài đặt cũ, dùng để so sánh kết quả và thời gian
+    balances = {}
+    for member in group.members:
+        paid = sum(e.base_amount_vnd for e in group.expenses if e.user_id == member.id)
+        owed = 0
+        for e in group.expenses:
+            for s in e.shares:
+                if s.user_id == member.id and not getattr(s, 'is_settled', False):
+                    owed += s.share_amount
+        balances[member.id] = {"user": member, "paid": paid, "owed": owed, "balance": paid - owed}
+    return balances
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--members', type=int, default=10)
+    parser.add_argument('--legacy-max', type=int, default=10000,
+                        help='chỉ chạy cài đặt cũ khi số chi tiêu <= giá trị này')
+    args = parser.parse_args()
+
+    print(f"{'expenses':>10} {'sql (ms)':>10} {'ms/1k':>8} {'legacy (ms)':>12}")
+    for size in args.sizes:
+        app, path = make_app()
+        try:
+            with app.app_context():
+                group_id = seed_group(args.members, size)
+                group = db.session.get(Group, group_id)
+                sql_time, fast = timed(group.calculate_balances)
+
+                legacy_ms = '-'
+                if size <= args.legacy_max:
+                    db.session.expire_all()
+                    legacy_time, slow = timed(lambda: legacy_calculate_balances(group), repeat=1)
+                    legacy_ms = f"{legacy_time * 1000:.1f}"
+                    for uid, row in slow.items():
+                        assert abs(row["balance"] - fast[uid]["balance"]) < 1e-3, uid
+            print(f"{size:>10} {sql_time * 1000:>10.1f} {sql_time * 1e6 / size:>8.2f} {legacy_ms:>12}")
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+So sánh thông lượng ghi đồng thời giữa profile engine 'default' và profile
+đã tinh chỉnh (app/utils/db_profiles.py).
+
+    python benchmarks/bench_db_profiles.py --writers 8 --readers 4 --seconds 10
+    python benchmarks/bench_db_profiles.py --url postgresql://user:pw@localhost/bench_db
+
+Mỗi writer lặp lại đúng các bước của expense_new (INSERT expense, INSERT
+phần chia, UPDATE sổ cái group_balance) trong một transaction; reader đọc
+trang đầu expense_list. Không có --url: dùng file SQLite tạm, so sánh
+'default' với 'sqlite'. Có --url: so sánh 'default' với 'postgresql'
+(CẢNH BÁO: mọi bảng trong DB đó bị drop / tạo lại).
+"""
+import argparse
+import os
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from common import make_app, seed_group
+from app import db
+from app.models import Expense, ExpenseShare, GroupMember
+from app.utils.balances import record_expense
+
+
+def run(profile, args):
+    overrides = {"DB_ENGINE_PROFILE": profile, "OUTBOX_DISPATCH_MODE": 'external', "METRICS_ENABLED": False}
+    if args.url:
+        overrides["SQLALCHEMY_DATABASE_URI"] = args.url
+    app, path = make_app(**overrides)
+    try:
+        with app.app_context():
+            group_id = seed_group(args.members, args.expenses)
+            member_ids = [uid for (uid,) in db.session.query(GroupMember.c.user_id)
+                          .filter(GroupMember.c.group_id == group_id)]
+
+        stop = threading.Event()
+        counts = {"writes": 0, "reads": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def bump(key):
+            with lock:
+                counts[key] += 1
+
+        def writer(n):
+            with app.app_context():
+                i = 0
+                while not stop.is_set():
+                    i += 1
+                    try:
+                        expense = Expense(title=f"w{n}-{i}", amount=100000.0, currency='VND',
+                                          base_amount_vnd=100000.0, group_id=group_id,
+                                          user_id=member_ids[0], created_by=member_ids[0])
+                        db.session.add(expense)
+                        db.session.flush()
+                        per_person = round(expense.base_amount_vnd / len(member_ids), 2)
+                        shares = [ExpenseShare(expense_id=expense.id, user_id=uid, share_amount=per_person)
+                                  for uid in member_ids]
+                        db.session.add_all(shares)
+                        record_expense(expense, shares)
+                        db.session.commit()
+                        bump("writes")
+                    except OperationalError:
+                        db.session.rollback()
+                        bump("errors")
+                db.session.remove()
+
+        def reader(n):
+            with app.app_context():
+                while not stop.is_set():
+                    try:
+                        Expense.query.filter_by(group_id=group_id).order_by(
+                            Expense.date.desc(), Expense.id.desc()).limit(50).all()
+                        db.session.rollback()
+                        bump("reads")
+                    except OperationalError:
+                        db.session.rollback()
+                        bump("errors")
+                db.session.remove()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        with app.app_context():
+            db.engine.dispose()
+        return {k: v / elapsed for k, v in counts.items() if k != "errors"} | {"errors": counts["errors"]}
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='URL PostgreSQL dùng để đo (DB sẽ bị xóa sạch)')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--members', type=int, default=5)
+    parser.add_argument('--expenses', type=int, default=10000, help='số chi tiêu có sẵn trước khi đo')
+    args = parser.parse_args()
+
+    tuned = 'postgresql' if args.url else 'sqlite'
+    print(f"{'profile':>12} {'writes/s':>10} {'reads/s':>10} {'errors':>8}")
+    for profile in ('default', tuned):
+        r = run(profile, args)
+        print(f"{profile:>12} {r['writes']:>10.1f} {r['reads']:>10.1f} {r['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
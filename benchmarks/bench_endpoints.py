@@ -0,0 +1,138 @@
+"""
+Đo độ trễ (p50 / p99) và số câu SQL của các endpoint chính qua Flask test
+client, ở nhiều quy mô dữ liệu sinh bằng app/utils/seed_load.py.
+
+    python benchmarks/bench_endpoints.py --scales 10000 100000 --requests 50 --output bench.json
+
+Kết quả là JSON (kèm commit git hiện tại) để so sánh giữa các commit.
+"""
+import argparse
+import json
+import os
+import subprocess
+import time
+
+from sqlalchemy import event
+
+from common import make_app
+from app import db
+from app.models import Expense, ExpenseShare, GroupMember, User
+from app.utils.seed_load import seed_load, SEED_PASSWORD
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._on_query)
+
+    def _on_query(self, *args):
+        self.count += 1
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(scale, args):
+    app, path = make_app(EXCHANGE_RATE_PROVIDERS=['fixed'], OUTBOX_DISPATCH_MODE='external',
+                         METRICS_SLOW_REQUEST_MS=0, EXPORT_ASYNC_THRESHOLD=10 ** 9)
+    try:
+        with app.app_context():
+            t0 = time.perf_counter()
+            seeded = seed_load(users=args.users, groups=args.groups, members=args.members,
+                               expenses=scale, notifications=args.notifications, seed=args.seed)
+            seed_seconds = time.perf_counter() - t0
+            group_id = seeded["groups"][0]
+            member_ids = [uid for (uid,) in db.session.query(GroupMember.c.user_id)
+                          .filter(GroupMember.c.group_id == group_id).order_by(GroupMember.c.user_id)]
+            creditor, debtors = member_ids[0], member_ids[1:] or member_ids
+            email = db.session.get(User, creditor).email
+            counter = QueryCounter(db.engine)
+
+        client = app.test_client()
+        client.post('/auth/login', data={"email": email, "password": SEED_PASSWORD})
+
+        def settle_debt(i):
+            debtor = debtors[i % len(debtors)]
+            with app.app_context():
+                # Đặt lại phần chia ngoài thời gian đo để mỗi lần đều có nợ cần xác nhận
+                db.session.query(ExpenseShare).filter(
+                    ExpenseShare.user_id == debtor,
+                    ExpenseShare.expense_id.in_(db.select(Expense.id).where(Expense.group_id == group_id))
+                ).update({ExpenseShare.is_settled: False}, synchronize_session=False)
+                db.session.commit()
+            return 'POST', f'/expenses/settle_debt/{debtor}/{creditor}/{group_id}'
+
+        scenarios = {
+            "expense_list": lambda i: ('GET', f'/expenses/{group_id}/list'),
+            "notifications_data": lambda i: ('GET', '/auth/notifications_data'),
+            "export_expenses_csv": lambda i: ('GET', f'/expenses/{group_id}/export?format=csv'),
+            "group_list": lambda i: ('GET', '/groups/list'),
+            "settle_debt": settle_debt,
+        }
+        results = {}
+        for name, make_request in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            latencies, queries = [], []
+            for i in range(args.requests):
+                method, url = make_request(i)
+                before = counter.count
+                t0 = time.perf_counter()
+                response = client.open(url, method=method)
+                response.get_data()  # đọc hết response stream
+                latencies.append((time.perf_counter() - t0) * 1000)
+                queries.append(counter.count - before)
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{name}: {method} {url} -> {response.status_code}')
+            results[name] = {
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "max_ms": round(max(latencies), 2),
+                "queries_p50": percentile(queries, 50),
+                "queries_max": max(queries),
+            }
+        return {"expenses": scale, "seed_seconds": round(seed_seconds, 1), "endpoints": results}
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='tổng số chi tiêu cho mỗi lần chạy')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--groups', type=int, default=5)
+    parser.add_argument('--members', type=int, default=5)
+    parser.add_argument('--notifications', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=30, help='số request mỗi endpoint')
+    parser.add_argument('--only', nargs='+', help='chỉ chạy các kịch bản này')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='ghi JSON ra file thay vì stdout')
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git_commit(),
+        "params": {k: v for k, v in vars(args).items() if k != 'output'},
+        "runs": [run_scale(scale, args) for scale in args.scales],
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Đo bộ nhớ đỉnh (tracemalloc) khi xuất CSV / Excel ở nhiều kích thước nhóm.
+
+    python benchmarks/bench_export.py --sizes 10000 50000 200000
+
+Bộ nhớ đỉnh gần như không đổi khi số chi tiêu tăng.
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from common import make_app, seed_group
+from app import db
+from app.models import Expense
+from app.utils.expense_export import export_query, iter_rows, stream_csv, write_xlsx
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000])
+    parser.add_argument('--members', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'expenses':>10} {'csv s':>8} {'csv MiB':>8} {'xlsx s':>8} {'xlsx MiB':>9}")
+    for size in args.sizes:
+        app, path = make_app()
+        try:
+            with app.app_context():
+                group_id = seed_group(args.members, size)
+                filters = [Expense.group_id == group_id]
+
+                def run_csv():
+                    for _ in stream_csv(iter_rows(export_query(filters))):
+                        pass
+
+                def run_xlsx():
+                    write_xlsx(iter_rows(export_query(filters)), title='bench').close()
+
+                db.session.expire_all()
+                csv_s, csv_mb = measure(run_csv)
+                xlsx_s, xlsx_mb = measure(run_xlsx)
+            print(f"{size:>10} {csv_s:>8.2f} {csv_mb:>8.1f} {xlsx_s:>8.2f} {xlsx_mb:>9.1f}")
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
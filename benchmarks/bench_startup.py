@@ -0,0 +1,113 @@
+"""
+Đo thời gian khởi động lạnh và bộ nhớ mỗi worker gunicorn (Linux, đọc /proc).
+
+    python benchmarks/bench_startup.py --workers 4 --runs 5
+
+- cold start: thời gian tiến trình con chạy `create_app()` (trung vị của --runs).
+- Khởi động gunicorn (gunicorn.conf.py) với GUNICORN_PRELOAD=1 và =0, chờ
+  worker trả lời rồi đọc RSS và PSS (bộ nhớ chia đều phần dùng chung) của
+  master và từng worker. Preload + copy-on-write làm PSS mỗi worker giảm.
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def cold_start(runs, env):
+    code = 'import time; t0 = time.perf_counter(); from app import create_app; create_app(); ' \
+           'print(time.perf_counter() - t0)'
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(float(out.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _memory_kb(pid):
+    """(RSS, PSS) tính bằng KiB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def _children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def gunicorn_memory(preload, workers, env, timeout=60):
+    port = _free_port()
+    env = dict(env, GUNICORN_PRELOAD='1' if preload else '0', GUNICORN_WORKERS=str(workers),
+               GUNICORN_BIND=f'127.0.0.1:{port}')
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + timeout
+        while True:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline or proc.poll() is not None:
+                    raise RuntimeError('gunicorn không khởi động được')
+                time.sleep(0.2)
+        ready = time.perf_counter() - t0
+        while len(_children(proc.pid)) < workers and time.time() < deadline:
+            time.sleep(0.2)
+        time.sleep(1)  # chờ mọi worker import xong
+        master = _memory_kb(proc.pid)
+        per_worker = [_memory_kb(pid) for pid in _children(proc.pid)]
+        return {
+            "ready_s": ready,
+            "master_rss_mb": master[0] / 1024,
+            "worker_rss_mb": statistics.mean(r for r, _ in per_worker) / 1024,
+            "worker_pss_mb": statistics.mean(p for _, p in per_worker) / 1024,
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(prefix='bench_startup_', suffix='.db')
+    os.close(fd)
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + db_path, OUTBOX_DISPATCH_MODE='external')
+    try:
+        print(f"cold start create_app(): {cold_start(args.runs, env) * 1000:.0f} ms (trung vị {args.runs} lần)")
+        print(f"{'preload':>8} {'ready s':>8} {'master RSS':>11} {'worker RSS':>11} {'worker PSS':>11}")
+        for preload in (False, True):
+            r = gunicorn_memory(preload, args.workers, env)
+            print(f"{str(preload):>8} {r['ready_s']:>8.2f} {r['master_rss_mb']:>10.1f}M "
+                  f"{r['worker_rss_mb']:>10.1f}M {r['worker_pss_mb']:>10.1f}M")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Đo độ trễ tìm người dùng (search_friends) trước và sau khi có index.
+
+    python benchmarks/bench_user_search.py --users 1000000
+
+Sinh --users user với tên ghép ngẫu nhiên (họ + tên + số), một user "tôi"
+có --friends bạn bè và chung nhóm với --mates người. Đo:
+- ilike: truy vấn cũ `ilike('%q%')` không giới hạn (quét toàn bảng);
+- search_users: index FTS5 (`flask search rebuild`), trang đầu và trang sau.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from common import make_app
+from app import db
+from app.models import User, Friendship, Group, GroupMember
+from app.utils.search import search_users, rebuild_user_index
+
+FAMILY = ['nguyen', 'tran', 'le', 'pham', 'hoang', 'huynh', 'phan', 'vu', 'vo', 'dang', 'bui', 'do']
+GIVEN = ['an', 'binh', 'chi', 'dung', 'giang', 'hanh', 'hieu', 'khanh', 'linh', 'minh', 'nam', 'ngoc',
+         'phuong', 'quang', 'son', 'thao', 'trang', 'tuan', 'viet', 'yen']
+QUERIES = ['ng', 'nguyen an', 'tran li', 'minh', 'yen 7', 'hoang khanh 12']
+
+
+def seed(n, friends, mates, rnd):
+    rows, batch = [], 10000
+    for i in range(n):
+        name = f"{rnd.choice(FAMILY)} {rnd.choice(GIVEN)} {i}"
+        rows.append({"username": name, "email": f"{name.replace(' ', '.')}@example.com", "password_hash": "x"})
+        if len(rows) == batch:
+            db.session.execute(db.insert(User), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(User), rows)
+    me = 1
+    picked = rnd.sample(range(2, n + 1), friends + mates)
+    db.session.execute(db.insert(Friendship), [
+        {"user_id": me, "friend_id": uid, "status": 'accepted'} for uid in picked[:friends]
+    ])
+    group = Group(name='Bench', creator_id=me)
+    db.session.add(group)
+    db.session.flush()
+    db.session.execute(db.insert(GroupMember), [
+        {"group_id": group.id, "user_id": uid} for uid in [me] + picked[friends:]
+    ])
+    db.session.commit()
+    return me
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+        db.session.rollback()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--friends', type=int, default=50)
+    parser.add_argument('--mates', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app, path = make_app(OUTBOX_DISPATCH_MODE='external', METRICS_ENABLED=False)
+    try:
+        with app.app_context():
+            t0 = time.perf_counter()
+            me = seed(args.users, args.friends, args.mates, random.Random(42))
+            print(f"Seed {args.users} user: {time.perf_counter() - t0:.1f}s")
+            t0 = time.perf_counter()
+            backend = rebuild_user_index()
+            print(f"Dựng index ({backend}): {time.perf_counter() - t0:.1f}s\n")
+
+            print(f"{'query':<16} {'ilike ms':>10} {'rows':>8} {'search ms':>10} {'page2 ms':>10}")
+            for q in QUERIES:
+                old = measure(lambda: User.query.filter(
+                    User.username.ilike(f"%{q}%") | User.email.ilike(f"%{q}%")).all(), args.repeat)
+                old_rows = User.query.filter(User.username.ilike(f"%{q}%") | User.email.ilike(f"%{q}%")).count()
+                new = measure(lambda: search_users(me, q), args.repeat)
+                _, cursor = search_users(me, q)
+                page2 = measure(lambda: search_users(me, q, cursor=cursor), args.repeat) if cursor else 0.0
+                print(f"{q:<16} {old:>10.1f} {old_rows:>8} {new:>10.1f} {page2:>10.1f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Tiện ích dùng chung cho các script benchmark trong thư mục benchmarks/."""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from config import Config  # noqa: E402
+from app import create_app, db  # noqa: E402
+
+
+def make_app(db_path=None, **overrides):
+    """Tạo app trỏ tới một file SQLite tạm (không đụng vào app.db)."""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix='bench_', suffix='.db')
+        os.close(fd)
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app, db_path
+
+
+def seed_group(n_members, n_expenses, seed=42):
+    """
+    Tạo 1 nhóm với n_members thành viên và n_expenses chi tiêu chia đều.
+    Dùng insert hàng loạt của SQLAlchemy Core để seed nhanh. Trả về group_id.
+    """
+    from app.models import User, Group, GroupMember, Expense, ExpenseShare
+
+    rnd = random.Random(seed)
+    offset = db.session.query(db.func.count(User.id)).scalar() or 0
+    db.session.execute(db.insert(User), [
+        {"username": f"user{offset + i}", "email": f"user{offset + i}@example.com", "password_hash": "x"}
+        for i in range(n_members)
+    ])
+    user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id).offset(offset).all()]
+
+    group = Group(name=f"Bench {n_expenses}", creator_id=user_ids[0])
+    db.session.add(group)
+    db.session.flush()
+    db.session.execute(db.insert(GroupMember), [
+        {"group_id": group.id, "user_id": uid} for uid in user_ids
+    ])
+
+    start = datetime(2020, 1, 1)
+    batch = 5000
+    for lo in range(0, n_expenses, batch):
+        rows = []
+        for i in range(lo, min(lo + batch, n_expenses)):
+            amount = float(rnd.randint(10, 5000) * 1000)
+            payer = rnd.choice(user_ids)
+            rows.append({
+                "title": f"Chi tiêu {i}", "amount": amount, "currency": "VND",
+                "base_amount_vnd": amount, "date": start + timedelta(minutes=i),
+                "group_id": group.id, "user_id": payer, "created_by": payer,
+            })
+        db.session.execute(db.insert(Expense), rows)
+        first_id = db.session.query(db.func.max(Expense.id)).scalar() - len(rows) + 1
+        shares = []
+        for k, row in enumerate(rows):
+            per_person = round(row["base_amount_vnd"] / len(user_ids), 2)
+            for uid in user_ids:
+                shares.append({
+                    "expense_id": first_id + k, "user_id": uid,
+                    "share_amount": per_person, "is_settled": rnd.random() < 0.1,
+                })
+        db.session.execute(db.insert(ExpenseShare), shares)
+    db.session.commit()
+    return group.id
+
+
+def timed(fn, repeat=3):
+    """Chạy fn nhiều lần, trả về (thời gian tốt nhất tính bằng giây, kết quả)."""
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
@@ -0,0 +1,99 @@
+"""
+In kế hoạch thực thi (EXPLAIN) cho truy vấn nóng của từng route để xác nhận
+index được dùng. Chạy trên DB theo DATABASE_URL (SQLite hoặc PostgreSQL):
+
+    DATABASE_URL=sqlite:////path/app.db python benchmarks/explain_queries.py
+    DATABASE_URL=postgresql://user:pw@localhost/expenses python benchmarks/explain_queries.py
+
+Không có DATABASE_URL: tạo DB SQLite tạm với dữ liệu mẫu nhỏ.
+"""
+import os
+from datetime import datetime
+
+from common import make_app, seed_group
+from app import db
+from app.models import Expense, ExpenseShare, Friendship, Group, GroupMember, Notification, User
+from app.utils.balances import _unsettled
+
+
+def route_queries(group_id, user_id):
+    since = datetime(2020, 1, 1)
+    return {
+        "expenses.expense_list (trang đầu)": db.session.query(Expense).filter(
+            Expense.group_id == group_id
+        ).order_by(Expense.date.desc(), Expense.id.desc()).limit(51),
+        "expenses.expense_list (lọc người trả + ngày)": db.session.query(Expense).filter(
+            Expense.group_id == group_id, Expense.user_id == user_id, Expense.date >= since
+        ).order_by(Expense.date.desc(), Expense.id.desc()).limit(51),
+        "expenses.expense_list (tổng)": db.session.query(db.func.sum(Expense.base_amount_vnd)).filter(
+            Expense.group_id == group_id
+        ),
+        "balances.paid_by_user": db.session.query(Expense.user_id, db.func.sum(Expense.base_amount_vnd)).filter(
+            Expense.group_id == group_id
+        ).group_by(Expense.user_id),
+        "balances.owed_by_user": db.session.query(ExpenseShare.user_id, db.func.sum(ExpenseShare.share_amount)).join(
+            Expense, ExpenseShare.expense_id == Expense.id
+        ).filter(Expense.group_id == group_id, _unsettled()).group_by(ExpenseShare.user_id),
+        "expenses.settle_debt": db.session.query(ExpenseShare).join(Expense).filter(
+            Expense.group_id == group_id, ExpenseShare.user_id == user_id, ExpenseShare.is_settled == False  # noqa: E712
+        ),
+        "expenses.expense_detail (shares)": db.session.query(ExpenseShare).filter(ExpenseShare.expense_id == 1),
+        "auth.notifications_data (delta)": db.session.query(Notification).filter(
+            Notification.user_id == user_id, Notification.id > 0
+        ).order_by(Notification.id.asc()).limit(21),
+        "auth.notifications_data (trang đầu)": db.session.query(Notification).filter(
+            Notification.user_id == user_id
+        ).order_by(Notification.id.desc()).limit(21),
+        "auth.profile (bạn bè)": db.session.query(User).join(Friendship, Friendship.friend_id == User.id).filter(
+            Friendship.user_id == user_id, Friendship.status == 'accepted'
+        ),
+        "groups.group_list": db.session.query(Group).filter(
+            (Group.creator_id == user_id) | (Group.members.any(id=user_id))
+        ),
+        "groups.remove_member": db.session.query(GroupMember).filter(
+            GroupMember.c.group_id == group_id, GroupMember.c.user_id == user_id
+        ),
+    }
+
+
+def explain(conn, query):
+    compiled = query.statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    return conn.exec_driver_sql(prefix + compiled.string, params).fetchall()
+
+
+def main():
+    url = os.environ.get('DATABASE_URL')
+    if url:
+        from config import Config
+        from app import create_app
+        app, path = create_app(Config), None
+        with app.app_context():
+            group_id = db.session.query(db.func.min(Group.id)).scalar() or 1
+            user_id = db.session.query(db.func.min(User.id)).scalar() or 1
+    else:
+        app, path = make_app()
+        with app.app_context():
+            group_id = seed_group(5, 2000)
+            user_id = 1
+
+    try:
+        with app.app_context():
+            conn = db.session.connection()
+            print(f"# {conn.dialect.name} — group_id={group_id}, user_id={user_id}\n")
+            for name, query in route_queries(group_id, user_id).items():
+                print(f"## {name}")
+                for row in explain(conn, query):
+                    print("   ", " | ".join(str(col) for col in row))
+                print()
+    finally:
+        if path:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
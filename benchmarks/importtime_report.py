@@ -0,0 +1,86 @@
+"""
+Báo cáo thời gian import khi khởi động, gộp theo blueprint / module của app.
+
+    python benchmarks/importtime_report.py --top 5
+
+Chạy `python -X importtime -c "from app import create_app; create_app()"`
+trong tiến trình con, dựng cây import và quy mỗi module (kể cả thư viện bên
+thứ ba) về module app.* gần nhất đã kéo nó vào (app.expenses, app.utils...).
+Thư viện chỉ được import bởi Flask / SQLAlchemy... nằm trong nhóm "(khác)".
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)')
+
+
+def run_importtime(code):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    return proc.stderr.splitlines()
+
+
+def parse_tree(lines):
+    """-X importtime in theo thứ tự hậu tố (con trước cha); dựng lại cây theo độ thụt lề."""
+    pending = defaultdict(list)
+    for line in lines:
+        m = LINE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, name = int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)
+        node = {"name": name, "self": self_us, "cumulative": cumulative_us,
+                "children": pending.pop(indent + 2, [])}
+        pending[indent].append(node)
+    return [node for level in sorted(pending) for node in pending[level]]
+
+
+def group_of(name):
+    parts = name.split('.')
+    if parts[0] != 'app':
+        return None
+    return '.'.join(parts[:2]) if len(parts) > 1 else 'app'
+
+
+def attribute(roots):
+    """{nhóm: {module: self_us}} — mỗi module quy về module app.* gần nhất phía trên."""
+    groups = defaultdict(dict)
+
+    def walk(node, owner):
+        owner = group_of(node["name"]) or owner
+        groups[owner][node["name"]] = node["self"]
+        for child in node["children"]:
+            walk(child, owner)
+
+    for root in roots:
+        walk(root, '(khác)')
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=5, help='số module nặng nhất in ra cho mỗi nhóm')
+    parser.add_argument('--code', default='from app import create_app; create_app()')
+    args = parser.parse_args()
+
+    groups = attribute(parse_tree(run_importtime(args.code)))
+    total = sum(sum(mods.values()) for mods in groups.values())
+    print(f"Tổng thời gian import: {total / 1000:.1f} ms\n")
+    print(f"{'nhóm':<28} {'ms':>8} {'%':>6} {'module':>7}")
+    for name, mods in sorted(groups.items(), key=lambda kv: -sum(kv[1].values())):
+        spent = sum(mods.values())
+        print(f"{name:<28} {spent / 1000:>8.1f} {100 * spent / total:>6.1f} {len(mods):>7}")
+        heavy = sorted(((us, mod) for mod, us in mods.items() if group_of(mod) != name), reverse=True)
+        for us, mod in heavy[:args.top]:
+            print(f"    {mod:<40} {us / 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,67 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Profile engine: 'auto' (theo URI), 'sqlite', 'postgresql' hoặc 'default'
+    # (xem app/utils/db_profiles.py); DB_PGBOUNCER=1 khi kết nối qua PgBouncer
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE', 'auto')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 20)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', '0') == '1'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
+    # Replica chỉ đọc (phân tách bằng dấu phẩy) cho các view @read_only; sau khi
+    # ghi, user đọc từ primary trong DB_REPLICA_STICKY_SECONDS giây
+    DB_REPLICA_URLS = os.environ.get('DB_REPLICA_URLS', '')
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS') or 5)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 25)
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+
+    # Gợi ý thanh toán nợ: số dư dưới ngưỡng (VND) coi như đã cân bằng;
+    # nhóm có tối đa SETTLEMENT_EXACT_MAX người còn nợ dùng thuật toán tối ưu
+    SETTLEMENT_TOLERANCE_VND = float(os.environ.get('SETTLEMENT_TOLERANCE_VND') or 1.0)
+    SETTLEMENT_EXACT_MAX = int(os.environ.get('SETTLEMENT_EXACT_MAX') or 10)
+
+    # Kênh SSE thông báo: 'db' = poll bảng notification để nhận thông báo từ
+    # worker khác (chạy nhiều worker gunicorn), 'local' = chỉ trong tiến trình.
+    # Mỗi kết nối SSE giữ một thread gthread: giới hạn số kết nối / worker
+    NOTIFICATION_HUB_BACKEND = os.environ.get('NOTIFICATION_HUB_BACKEND', 'db')
+    NOTIFICATION_STREAM_MAX_CONNECTIONS = int(os.environ.get('NOTIFICATION_STREAM_MAX_CONNECTIONS') or 4)
+
+    # Tỷ giá: thứ tự provider (phân tách bằng dấu phẩy), TTL cache và timeout
+    EXCHANGE_RATE_PROVIDERS = (os.environ.get('EXCHANGE_RATE_PROVIDERS') or 'exchangerate_host,fixed').split(',')
+    EXCHANGE_RATE_TTL = int(os.environ.get('EXCHANGE_RATE_TTL') or 3600)
+    EXCHANGE_RATE_CONNECT_TIMEOUT = float(os.environ.get('EXCHANGE_RATE_CONNECT_TIMEOUT') or 2.0)
+    EXCHANGE_RATE_READ_TIMEOUT = float(os.environ.get('EXCHANGE_RATE_READ_TIMEOUT') or 3.0)
+
+    # Outbox thông báo: 'thread' (luồng nền), 'inline' (sau mỗi request) hoặc
+    # 'external' (chạy `flask outbox dispatch --loop` riêng)
+    OUTBOX_DISPATCH_MODE = os.environ.get('OUTBOX_DISPATCH_MODE', 'thread')
+
+    # Công việc nền (`flask worker`): giới hạn số job chạy đồng thời theo loại,
+    # job định kỳ {type: giây} và thư mục chứa file kết quả (mặc định instance/jobs)
+    JOB_CONCURRENCY = {'expenses.export': 2, 'groups.delete': 1}
+    JOB_SCHEDULE = {'rates.refresh': 1800, 'jobs.cleanup': 3600}
+    JOB_OUTPUT_DIR = os.environ.get('JOB_OUTPUT_DIR')
+    JOB_RETENTION_DAYS = 7
+    EXPORT_ASYNC_THRESHOLD = int(os.environ.get('EXPORT_ASYNC_THRESHOLD', 20000))
+    GROUP_DELETE_ASYNC_THRESHOLD = int(os.environ.get('GROUP_DELETE_ASYNC_THRESHOLD', 5000))
+
+    # Đo SQL / độ trễ theo endpoint (xuất ở /metrics); request chậm hơn
+    # METRICS_SLOW_REQUEST_MS (0 = tắt) được log kèm các câu SQL tốn thời gian nhất
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS') or 1000)
+    METRICS_SLOW_TOP_SQL = 5
+    # Ai được đọc /metrics: IP / mạng CIDR (phân tách bằng dấu phẩy, là
+    # REMOTE_ADDR, tức địa chỉ proxy nếu có) hoặc header Bearer METRICS_TOKEN
+    METRICS_ALLOWED_IPS = (os.environ.get('METRICS_ALLOWED_IPS') or '127.0.0.1,::1').split(',')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Cache user cho Flask-Login (trong tiến trình): số user tối đa và TTL (giây, 0 = tắt)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+
+    # Cache dữ liệu tham chiếu (loại chi tiêu, tỷ giá đã lưu): số giây tối đa
+    # giữa hai lần kiểm tra phiên bản trong bảng refdata_version
+    REFDATA_CHECK_INTERVAL = float(os.environ.get('REFDATA_CHECK_INTERVAL') or 5.0)
@@ -0,0 +1,50 @@
+"""
+Cấu hình gunicorn cho production:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+preload_app: tiến trình master import và gọi create_app() một lần, các worker
+được fork ra và dùng chung (copy-on-write) phần bộ nhớ đó. Để trang nhớ
+chung không bị "chạm" và chép lại:
+  - gc.freeze() trước khi fork: GC của worker không duyệt / sửa header các
+    object đã nạp sẵn trong master;
+  - engine DB được dispose sau khi fork: worker không dùng chung kết nối
+    của master;
+  - thread nền (outbox, SSE hub) chỉ khởi động lười trong worker, không
+    bao giờ trong master.
+Dùng worker gthread vì kênh SSE giữ kết nối lâu. Mỗi kết nối SSE chiếm một
+thread trong `threads` của worker, nên hub giới hạn
+NOTIFICATION_STREAM_MAX_CONNECTIONS (mặc định 4, tức một nửa của 8 thread)
+kết nối / worker; phần còn lại nhận 503 và poll /auth/notifications_data.
+Khi tăng giới hạn này, tăng GUNICORN_THREADS tương ứng.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS') or min(multiprocessing.cpu_count() * 2 + 1, 8))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS') or 8)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 60)
+graceful_timeout = 30
+keepalive = 5
+# Tái sinh worker định kỳ để chặn rò rỉ bộ nhớ dài hạn
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 5000)
+max_requests_jitter = 500
+accesslog = '-'
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import db
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
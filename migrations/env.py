@@ -51,6 +51,21 @@ def get_metadata():
     return target_db.metadata
 
 
+# Index tìm kiếm tạo bằng SQL thô trong migration (app/utils/search.py), không
+# có trong metadata của model: bảng FTS5 + shadow table của SQLite và index
+# pg_trgm / tsvector của PostgreSQL. Bỏ qua để autogenerate không sinh lệnh DROP.
+SEARCH_TABLE_PREFIXES = ('user_search', 'expense_search')
+SEARCH_INDEXES = {'ix_user_username_trgm', 'ix_user_email_trgm', 'ix_expense_search'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and reflected and compare_to is None and name.startswith(SEARCH_TABLE_PREFIXES):
+        return False
+    if type_ == 'index' and name in SEARCH_INDEXES:
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +80,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -90,6 +106,9 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    conf_args = dict(current_app.extensions['migrate'].configure_args)
+    conf_args.setdefault('include_object', include_object)
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
@@ -97,7 +116,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=get_metadata(),
             process_revision_directives=process_revision_directives,
-            **current_app.extensions['migrate'].configure_args
+            **conf_args
         )
 
         with context.begin_transaction():
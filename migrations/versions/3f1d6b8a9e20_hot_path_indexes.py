@@ -0,0 +1,67 @@
+"""hot path indexes and group_member primary key
+
+Revision ID: 3f1d6b8a9e20
+Revises: e7b3a9c1d2f4
+Create Date: 2026-10-17 13:41:07.553921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d6b8a9e20'
+down_revision = 'e7b3a9c1d2f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # group_member: bỏ dòng NULL / trùng trước khi thêm khóa chính
+    op.execute("DELETE FROM group_member WHERE user_id IS NULL OR group_id IS NULL")
+    op.execute("CREATE TABLE group_member_dedup AS SELECT DISTINCT group_id, user_id FROM group_member")
+    op.execute("DELETE FROM group_member")
+    op.execute("INSERT INTO group_member (group_id, user_id) SELECT group_id, user_id FROM group_member_dedup")
+    op.drop_table('group_member_dedup')
+
+    with op.batch_alter_table('group_member', schema=None) as batch_op:
+        batch_op.alter_column('group_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_primary_key('pk_group_member', ['group_id', 'user_id'])
+        batch_op.create_index('ix_group_member_user_id', ['user_id', 'group_id'], unique=False)
+
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.create_index('ix_expense_group_id_date', ['group_id', 'date', 'id'], unique=False)
+        batch_op.create_index('ix_expense_group_id_user_id', ['group_id', 'user_id'], unique=False)
+
+    with op.batch_alter_table('expense_share', schema=None) as batch_op:
+        batch_op.create_index('ix_expense_share_expense_id', ['expense_id'], unique=False)
+        batch_op.create_index('ix_expense_share_user_id_is_settled', ['user_id', 'is_settled'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_id_id', ['user_id', 'id'], unique=False)
+
+    with op.batch_alter_table('friendship', schema=None) as batch_op:
+        batch_op.create_index('ix_friendship_user_id_status', ['user_id', 'status', 'friend_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('friendship', schema=None) as batch_op:
+        batch_op.drop_index('ix_friendship_user_id_status')
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_user_id_id')
+
+    with op.batch_alter_table('expense_share', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_share_user_id_is_settled')
+        batch_op.drop_index('ix_expense_share_expense_id')
+
+    with op.batch_alter_table('expense', schema=None) as batch_op:
+        batch_op.drop_index('ix_expense_group_id_user_id')
+        batch_op.drop_index('ix_expense_group_id_date')
+
+    with op.batch_alter_table('group_member', schema=None) as batch_op:
+        batch_op.drop_index('ix_group_member_user_id')
+        batch_op.drop_constraint('pk_group_member', type_='primary')
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('group_id', existing_type=sa.Integer(), nullable=True)
@@ -0,0 +1,26 @@
+"""group revision
+
+Revision ID: 5c8e2f4b71d3
+Revises: a4951d7dde15
+Create Date: 2026-10-17 10:02:11.430876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e2f4b71d3'
+down_revision = 'a4951d7dde15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('group', schema=None) as batch_op:
+        batch_op.drop_column('revision')
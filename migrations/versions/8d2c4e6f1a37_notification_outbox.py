@@ -0,0 +1,51 @@
+"""notification outbox
+
+Revision ID: 8d2c4e6f1a37
+Revises: 3f1d6b8a9e20
+Create Date: 2026-10-17 15:08:33.214950
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2c4e6f1a37'
+down_revision = '3f1d6b8a9e20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=True),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['actor_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['group_id'], ['group.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('outbox_event', schema=None) as batch_op:
+        batch_op.create_index('ix_outbox_event_dispatched_at_id', ['dispatched_at', 'id'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_notification_event_id', 'outbox_event', ['event_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('uq_notification_event_id_user_id', ['event_id', 'user_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('uq_notification_event_id_user_id')
+        batch_op.drop_constraint('fk_notification_event_id', type_='foreignkey')
+        batch_op.drop_column('event_id')
+
+    with op.batch_alter_table('outbox_event', schema=None) as batch_op:
+        batch_op.drop_index('ix_outbox_event_dispatched_at_id')
+
+    op.drop_table('outbox_event')
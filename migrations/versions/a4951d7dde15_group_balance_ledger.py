@@ -0,0 +1,51 @@
+"""group balance ledger
+
+Revision ID: a4951d7dde15
+Revises: 0a3ae6187f45
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4951d7dde15'
+down_revision = '0a3ae6187f45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('group_balance',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('paid', sa.Float(), nullable=False),
+    sa.Column('owed', sa.Float(), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['group.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('group_id', 'user_id')
+    )
+
+    # Khởi tạo sổ cái từ dữ liệu hiện có
+    op.execute("""
+        INSERT INTO group_balance (group_id, user_id, paid, owed, balance)
+        SELECT gm.group_id, gm.user_id,
+               COALESCE(p.paid, 0), COALESCE(o.owed, 0),
+               COALESCE(p.paid, 0) - COALESCE(o.owed, 0)
+        FROM (SELECT DISTINCT group_id, user_id FROM group_member
+              WHERE group_id IS NOT NULL AND user_id IS NOT NULL) gm
+        LEFT JOIN (SELECT group_id, user_id, SUM(base_amount_vnd) AS paid
+                   FROM expense GROUP BY group_id, user_id) p
+               ON p.group_id = gm.group_id AND p.user_id = gm.user_id
+        LEFT JOIN (SELECT e.group_id, s.user_id, SUM(s.share_amount) AS owed
+                   FROM expense_share s JOIN expense e ON e.id = s.expense_id
+                   WHERE s.is_settled IS NULL OR s.is_settled = false
+                   GROUP BY e.group_id, s.user_id) o
+               ON o.group_id = gm.group_id AND o.user_id = gm.user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('group_balance')
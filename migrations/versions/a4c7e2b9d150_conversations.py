@@ -0,0 +1,62 @@
+"""conversations
+
+Revision ID: a4c7e2b9d150
+Revises: f2d8a6c3e417
+Create Date: 2026-10-17 19:40:12.883104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e2b9d150'
+down_revision = 'f2d8a6c3e417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_low_id', sa.Integer(), nullable=False),
+    sa.Column('user_high_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_high_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['user_low_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_low_id', 'user_high_id', name='uq_conversation_pair')
+    )
+    op.create_table('conversation_participant',
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('other_user_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=False),
+    sa.Column('last_read_id', sa.Integer(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversation.id'], ),
+    sa.ForeignKeyConstraint(['other_user_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('conversation_id', 'user_id')
+    )
+    with op.batch_alter_table('conversation_participant', schema=None) as batch_op:
+        batch_op.create_index('ix_conversation_participant_user_id_last', ['user_id', 'last_message_id'], unique=False)
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('conversation_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_message_conversation', 'conversation', ['conversation_id'], ['id'])
+        batch_op.create_index('ix_message_conversation_id_id', ['conversation_id', 'id'], unique=False)
+    # Tin nhắn cũ (nếu có): chạy `flask messages rebuild` để gán hội thoại và tính bộ đếm
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id_id')
+        batch_op.drop_constraint('fk_message_conversation', type_='foreignkey')
+        batch_op.drop_column('conversation_id')
+
+    with op.batch_alter_table('conversation_participant', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversation_participant_user_id_last')
+
+    op.drop_table('conversation_participant')
+    op.drop_table('conversation')
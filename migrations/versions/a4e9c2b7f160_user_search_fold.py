@@ -0,0 +1,77 @@
+"""user search index folds đ
+
+Revision ID: a4e9c2b7f160
+Revises: c6f1a8d3e592
+Create Date: 2026-10-17 23:58:42.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e9c2b7f160'
+down_revision = 'c6f1a8d3e592'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ('user_search_au', 'user_search_ad', 'user_search_ai')
+
+# unicode61 remove_diacritics không đổi đ thành d: ghi username đã thay đ → d
+FOLDED = "replace(replace({row}.username, 'đ', 'd'), 'Đ', 'D'), {row}.email"
+RAW = "{row}.username, {row}.email"
+
+
+def _create(options, values):
+    op.execute(f"""
+        CREATE VIRTUAL TABLE user_search USING fts5(
+            username, email, {options}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')
+    """)
+    op.execute(f"""
+        CREATE TRIGGER user_search_ai AFTER INSERT ON user BEGIN
+            INSERT INTO user_search(rowid, username, email) VALUES (new.id, {values.format(row='new')});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER user_search_ad AFTER DELETE ON user BEGIN
+            INSERT INTO user_search(user_search, rowid, username, email)
+            VALUES ('delete', old.id, {values.format(row='old')});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER user_search_au AFTER UPDATE OF username, email ON user BEGIN
+            INSERT INTO user_search(user_search, rowid, username, email)
+            VALUES ('delete', old.id, {values.format(row='old')});
+            INSERT INTO user_search(rowid, username, email) VALUES (new.id, {values.format(row='new')});
+        END
+    """)
+
+
+def _drop():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS user_search")
+
+
+def _has_index():
+    return op.get_bind().execute(sa.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_search'"
+    )).first() is not None
+
+
+def upgrade():
+    # Chỉ SQLite: external content đọc lại cột gốc của bảng user nên không
+    # lưu được bản đã thay đ; chuyển sang bảng contentless như expense_search
+    if op.get_bind().dialect.name != 'sqlite' or not _has_index():
+        return
+    _drop()
+    _create("content=''", FOLDED)
+    op.execute(f"INSERT INTO user_search(rowid, username, email) SELECT id, {FOLDED.format(row='user')} FROM user")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite' or not _has_index():
+        return
+    _drop()
+    _create("content='user', content_rowid='id'", RAW)
+    op.execute("INSERT INTO user_search(user_search) VALUES ('rebuild')")
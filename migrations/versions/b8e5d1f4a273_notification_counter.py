@@ -0,0 +1,38 @@
+"""notification counter
+
+Revision ID: b8e5d1f4a273
+Revises: a4c7e2b9d150
+Create Date: 2026-10-17 20:15:36.472019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e5d1f4a273'
+down_revision = 'a4c7e2b9d150'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_counter',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Khởi tạo từ dữ liệu hiện có
+    op.execute("""
+        INSERT INTO notification_counter (user_id, unread_count)
+        SELECT user_id, COUNT(*)
+        FROM notification
+        WHERE is_read IS NULL OR is_read = false
+        GROUP BY user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('notification_counter')
@@ -0,0 +1,45 @@
+"""group spending rollup
+
+Revision ID: c3e8a1f5b720
+Revises: b61f0d3c9a52
+Create Date: 2026-10-17 17:05:41.092716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a1f5b720'
+down_revision = 'b61f0d3c9a52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('group_spending',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('year_month', sa.String(length=7), nullable=False),
+    sa.Column('total_vnd', sa.Float(), nullable=False),
+    sa.Column('expense_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['group.id'], ),
+    sa.PrimaryKeyConstraint('group_id', 'category_id', 'year_month')
+    )
+
+    # Khởi tạo từ dữ liệu hiện có
+    if op.get_bind().dialect.name == 'postgresql':
+        month = "to_char(date, 'YYYY-MM')"
+    else:
+        month = "strftime('%Y-%m', date)"
+    op.execute(f"""
+        INSERT INTO group_spending (group_id, category_id, year_month, total_vnd, expense_count)
+        SELECT group_id, COALESCE(category_id, 0), {month}, SUM(COALESCE(base_amount_vnd, 0)), COUNT(*)
+        FROM expense
+        WHERE date IS NOT NULL
+        GROUP BY group_id, COALESCE(category_id, 0), {month}
+    """)
+
+
+def downgrade():
+    op.drop_table('group_spending')
@@ -0,0 +1,77 @@
+"""expense search index by group
+
+Revision ID: c6f1a8d3e592
+Revises: b8e5d1f4a273
+Create Date: 2026-10-17 23:41:09.215734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f1a8d3e592'
+down_revision = 'b8e5d1f4a273'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ('expense_search_au', 'expense_search_ad', 'expense_search_ai')
+
+# Giá trị ghi vào expense_search từ một dòng expense (đ → d; phần dấu còn lại do tokenizer bỏ)
+VALUES = ("replace(replace({row}.title, 'đ', 'd'), 'Đ', 'D'), "
+          "replace(replace(coalesce({row}.note, ''), 'đ', 'd'), 'Đ', 'D')")
+
+
+def _create(columns, values, update_of):
+    op.execute(f"""
+        CREATE VIRTUAL TABLE expense_search USING fts5(
+            {columns}, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')
+    """)
+    op.execute(f"""
+        CREATE TRIGGER expense_search_ai AFTER INSERT ON expense BEGIN
+            INSERT INTO expense_search(rowid, {columns}) VALUES (new.id, {values.format(row='new')});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER expense_search_ad AFTER DELETE ON expense BEGIN
+            INSERT INTO expense_search(expense_search, rowid, {columns})
+            VALUES ('delete', old.id, {values.format(row='old')});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER expense_search_au AFTER UPDATE OF {update_of} ON expense BEGIN
+            INSERT INTO expense_search(expense_search, rowid, {columns})
+            VALUES ('delete', old.id, {values.format(row='old')});
+            INSERT INTO expense_search(rowid, {columns}) VALUES (new.id, {values.format(row='new')});
+        END
+    """)
+    op.execute(f"INSERT INTO expense_search(rowid, {columns}) SELECT id, {values.format(row='expense')} FROM expense")
+
+
+def _drop():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS expense_search")
+
+
+def _has_index():
+    return op.get_bind().execute(sa.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expense_search'"
+    )).first() is not None
+
+
+def upgrade():
+    # Chỉ SQLite: thêm group_id vào bảng FTS5 để MATCH lọc theo nhóm.
+    # Bảng contentless không lưu giá trị cột nên cột UNINDEXED không lọc
+    # được; group_id vì vậy được index như một token.
+    if op.get_bind().dialect.name != 'sqlite' or not _has_index():
+        return
+    _drop()
+    _create('title, note, group_id', VALUES + ", {row}.group_id", 'title, note, group_id')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite' or not _has_index():
+        return
+    _drop()
+    _create('title, note', VALUES, 'title, note')
@@ -0,0 +1,32 @@
+"""refdata version
+
+Revision ID: d5a7c2e9f813
+Revises: c3e8a1f5b720
+Create Date: 2026-10-17 17:48:19.630145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a7c2e9f813'
+down_revision = 'c3e8a1f5b720'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    refdata_version = op.create_table('refdata_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(refdata_version, [
+        {"name": "categories", "version": 1},
+        {"name": "exchange_rates", "version": 1},
+    ])
+
+
+def downgrade():
+    op.drop_table('refdata_version')
@@ -0,0 +1,30 @@
+"""exchange rate
+
+Revision ID: e7b3a9c1d2f4
+Revises: 5c8e2f4b71d3
+Create Date: 2026-10-17 11:20:54.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3a9c1d2f4'
+down_revision = '5c8e2f4b71d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('exchange_rate',
+    sa.Column('currency', sa.String(length=10), nullable=False),
+    sa.Column('rate_vnd', sa.Float(), nullable=False),
+    sa.Column('provider', sa.String(length=50), nullable=True),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('currency')
+    )
+
+
+def downgrade():
+    op.drop_table('exchange_rate')
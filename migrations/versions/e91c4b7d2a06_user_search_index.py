@@ -0,0 +1,64 @@
+"""user search index
+
+Revision ID: e91c4b7d2a06
+Revises: d5a7c2e9f813
+Create Date: 2026-10-17 18:31:07.215480
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91c4b7d2a06'
+down_revision = 'd5a7c2e9f813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute('CREATE INDEX ix_user_username_trgm ON "user" USING gin (lower(username) gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_user_email_trgm ON "user" USING gin (lower(email) gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        try:
+            op.execute("""
+                CREATE VIRTUAL TABLE user_search USING fts5(
+                    username, email, content='user', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3')
+            """)
+        except sa.exc.OperationalError:
+            # SQLite build không có FTS5: app tự quay về LIKE có giới hạn
+            return
+        op.execute("""
+            CREATE TRIGGER user_search_ai AFTER INSERT ON user BEGIN
+                INSERT INTO user_search(rowid, username, email) VALUES (new.id, new.username, new.email);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER user_search_ad AFTER DELETE ON user BEGIN
+                INSERT INTO user_search(user_search, rowid, username, email)
+                VALUES ('delete', old.id, old.username, old.email);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER user_search_au AFTER UPDATE OF username, email ON user BEGIN
+                INSERT INTO user_search(user_search, rowid, username, email)
+                VALUES ('delete', old.id, old.username, old.email);
+                INSERT INTO user_search(rowid, username, email) VALUES (new.id, new.username, new.email);
+            END
+        """)
+        op.execute("INSERT INTO user_search(user_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_user_email_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_user_username_trgm")
+    elif dialect == 'sqlite':
+        for trigger in ('user_search_au', 'user_search_ad', 'user_search_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS user_search")
@@ -0,0 +1,73 @@
+"""expense search index
+
+Revision ID: f2d8a6c3e417
+Revises: e91c4b7d2a06
+Create Date: 2026-10-17 19:02:44.508316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2d8a6c3e417'
+down_revision = 'e91c4b7d2a06'
+branch_labels = None
+depends_on = None
+
+# Giá trị ghi vào expense_search từ một dòng expense (đ → d; phần dấu còn lại do tokenizer bỏ)
+VALUES = ("replace(replace({row}.title, 'đ', 'd'), 'Đ', 'D'), "
+          "replace(replace(coalesce({row}.note, ''), 'đ', 'd'), 'Đ', 'D')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute("""
+            CREATE OR REPLACE FUNCTION expense_search_text(title text, note text) RETURNS tsvector
+                LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+                SELECT to_tsvector('simple'::regconfig,
+                                   public.unaccent('public.unaccent'::regdictionary, coalesce(title, '') || ' ' || coalesce(note, '')))
+            $$
+        """)
+        op.execute("CREATE INDEX ix_expense_search ON expense USING gin (expense_search_text(title, note))")
+    elif dialect == 'sqlite':
+        try:
+            op.execute("""
+                CREATE VIRTUAL TABLE expense_search USING fts5(
+                    title, note, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3')
+            """)
+        except sa.exc.OperationalError:
+            # SQLite build không có FTS5: app tự quay về LIKE
+            return
+        op.execute(f"""
+            CREATE TRIGGER expense_search_ai AFTER INSERT ON expense BEGIN
+                INSERT INTO expense_search(rowid, title, note) VALUES (new.id, {VALUES.format(row='new')});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER expense_search_ad AFTER DELETE ON expense BEGIN
+                INSERT INTO expense_search(expense_search, rowid, title, note)
+                VALUES ('delete', old.id, {VALUES.format(row='old')});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER expense_search_au AFTER UPDATE OF title, note ON expense BEGIN
+                INSERT INTO expense_search(expense_search, rowid, title, note)
+                VALUES ('delete', old.id, {VALUES.format(row='old')});
+                INSERT INTO expense_search(rowid, title, note) VALUES (new.id, {VALUES.format(row='new')});
+            END
+        """)
+        op.execute(f"INSERT INTO expense_search(rowid, title, note) SELECT id, {VALUES.format(row='expense')} FROM expense")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_expense_search")
+        op.execute("DROP FUNCTION IF EXISTS expense_search_text(text, text)")
+    elif dialect == 'sqlite':
+        for trigger in ('expense_search_au', 'expense_search_ad', 'expense_search_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS expense_search")
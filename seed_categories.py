@@ -1,5 +1,6 @@
 from app import create_app, db
 from app.models import Category
+from app.utils.refdata import refdata
 
 app = create_app()
 
@@ -19,5 +20,6 @@ with app.app_context():
             new_cate = Category(name=c["name"], icon=c["icon"])
             db.session.add(new_cate)
 
+    refdata.invalidate('categories')
     db.session.commit()
     print("✅ Đã thêm dữ liệu Category vào database!")
@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from config import Config  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, Group, GroupMember, Friendship  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'test.db')
+        TESTING = True
+        OUTBOX_DISPATCH_MODE = 'external'
+        METRICS_ENABLED = False
+        USER_CACHE_TTL = 0
+        EXCHANGE_RATE_PROVIDERS = ['fixed']
+        DB_REPLICA_URLS = ''
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        from app.utils.search import rebuild_user_index, rebuild_expense_index
+        db.create_all()
+        rebuild_user_index()
+        rebuild_expense_index()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def make_user(app):
+    counter = iter(range(1, 10 ** 6))
+
+    def make(username=None, email=None):
+        n = next(counter)
+        user = User(username=username or f"user{n}", email=email or f"user{n}@example.com", password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def make_group(app):
+    def make(creator, members=()):
+        group = Group(name='Nhóm test', creator_id=creator.id)
+        db.session.add(group)
+        db.session.flush()
+        db.session.execute(db.insert(GroupMember), [
+            {"group_id": group.id, "user_id": u.id} for u in [creator, *members]
+        ])
+        db.session.commit()
+        return group
+    return make
+
+
+@pytest.fixture
+def befriend(app):
+    def make(user, friend):
+        db.session.add(Friendship(user_id=user.id, friend_id=friend.id, status='accepted'))
+        db.session.commit()
+    return make
+
+
+@pytest.fixture
+def login(app):
+    def make(user):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+        return client
+    return make
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from app import db
+from app.models import Expense, GroupSpending
+from app.utils.analytics import record_spending, verify_group_spending
+
+
+def _expense(group, user, amount, date):
+    expense = Expense(title='x', amount=amount, base_amount_vnd=amount, date=date,
+                      group_id=group.id, user_id=user.id, created_by=user.id)
+    db.session.add(expense)
+    db.session.flush()
+    record_spending(expense)
+    db.session.commit()
+    return expense
+
+
+def test_incremental_spending_matches_full_recompute(make_user, make_group):
+    me = make_user('an')
+    group = make_group(me)
+    _expense(group, me, 1000, datetime(2026, 1, 5))
+    _expense(group, me, 2500, datetime(2026, 1, 20))
+    removed = _expense(group, me, 700, datetime(2026, 2, 1))
+    record_spending(removed, sign=-1)
+    db.session.delete(removed)
+    db.session.commit()
+
+    assert verify_group_spending(group.id) == []
+
+
+def test_analytics_verify_then_rebuild(app, make_user, make_group):
+    me = make_user('an')
+    group = make_group(me)
+    _expense(group, me, 1000, datetime(2026, 1, 5))
+    db.session.query(GroupSpending).update({GroupSpending.total_vnd: 1})
+    db.session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['analytics', 'verify'])
+    assert result.exit_code == 1
+    assert 'total_vnd' in result.output
+
+    assert runner.invoke(args=['analytics', 'rebuild']).exit_code == 0
+    assert runner.invoke(args=['analytics', 'verify']).exit_code == 0
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.exchange_rate import FALLBACK_TTL, ExchangeRateUnavailable, UnsupportedCurrency, rate_service
+
+
+class SlowLiveProvider:
+    name = 'slow'
+    live = True
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.calls = 0
+
+    def get_rate(self, currency):
+        self.calls += 1
+        time.sleep(0.05)
+        if self.rate is None:
+            raise ExchangeRateUnavailable('slow: lỗi')
+        return self.rate
+
+
+def _use(providers):
+    rate_service._providers = providers
+    rate_service.clear()
+
+
+def test_static_fallback_is_cached_briefly(app):
+    from app.utils.exchange_rate import FixedRateProvider
+    _use([SlowLiveProvider(), FixedRateProvider()])
+
+    assert rate_service.get_rate('USD') == FixedRateProvider.FIXED_RATES['USD']
+    _, expires = rate_service._cache['USD']
+    assert expires - time.monotonic() <= FALLBACK_TTL
+
+
+def test_concurrent_misses_call_the_provider_once(app):
+    live = SlowLiveProvider(26000.0)
+    _use([live])
+
+    results = []
+
+    def lookup():
+        with app.app_context():
+            results.append(rate_service.get_rate('USD'))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [26000.0] * 8
+    assert live.calls == 1
+
+
+def test_unknown_currency_is_rejected_without_provider_call(app, make_user, login):
+    live = SlowLiveProvider(1.0)
+    _use([live])
+
+    with pytest.raises(UnsupportedCurrency):
+        rate_service.get_rate('AAB')
+    response = login(make_user('an')).get('/expenses/get_rate/aaa')
+
+    assert response.status_code == 400
+    assert live.calls == 0
+    assert not {'AAA', 'AAB'} & (set(rate_service._cache) | set(rate_service._flights))
+
+
+def test_refresh_only_fetches_supported_currencies(app):
+    live = SlowLiveProvider(2.0)
+    _use([live])
+
+    assert rate_service.refresh(['usd', 'zzz']) == {'USD': 2.0}
+    assert live.calls == 1
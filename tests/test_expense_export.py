@@ -0,0 +1,74 @@
+import csv
+import io
+from datetime import datetime
+
+from app import db
+from app.models import Expense, Job
+from app.utils import expense_export
+from app.utils.expense_export import EXPORT_HEADER, export_query, iter_rows, stream_csv
+
+
+def _expenses(group, user, count):
+    db.session.execute(db.insert(Expense), [
+        {"title": f"chi {i}", "amount": 1000 + i, "currency": "VND", "base_amount_vnd": 1000 + i,
+         "date": datetime(2026, 1, 1 + i % 28), "group_id": group.id, "user_id": user.id, "created_by": user.id}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def _parse(body):
+    return list(csv.reader(io.StringIO(body.decode('utf-8-sig'))))
+
+
+def test_stream_csv_yields_one_chunk_per_chunk_size_rows(monkeypatch):
+    monkeypatch.setattr(expense_export, 'CHUNK_SIZE', 3)
+    rows = [[f"chi {i}", i, "VND", i, "2026-01-01", "", "an", ""] for i in range(7)]
+
+    chunks = list(stream_csv(iter(rows)))
+
+    # tiêu đề + 3 dòng, 3 dòng, 1 dòng cuối
+    assert len(chunks) == 3
+    parsed = _parse(b''.join(chunks))
+    assert parsed[0] == EXPORT_HEADER
+    assert [r[0] for r in parsed[1:]] == [f"chi {i}" for i in range(7)]
+
+
+def test_export_query_streams_joined_rows(make_user, make_group):
+    me = make_user('an')
+    group = make_group(me)
+    _expenses(group, me, 5)
+
+    query = export_query([Expense.group_id == group.id])
+    assert query.get_execution_options()['yield_per'] == expense_export.CHUNK_SIZE
+    rows = list(iter_rows(query))
+
+    assert len(rows) == 5
+    assert rows[0] == ["chi 0", 1000, "VND", 1000, "2026-01-01", "", "an", ""]
+
+
+def test_csv_export_route_is_streamed(make_user, make_group, login):
+    me = make_user('an')
+    group = make_group(me)
+    _expenses(group, me, 30)
+
+    response = login(me).get(f'/expenses/{group.id}/export?format=csv')
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert len(_parse(response.data)) == 31
+
+
+def test_large_export_runs_as_job(app, make_user, make_group, login):
+    app.config['EXPORT_ASYNC_THRESHOLD'] = 10
+    me = make_user('an')
+    group = make_group(me)
+    _expenses(group, me, 11)
+
+    response = login(me).get(f'/expenses/{group.id}/export?format=csv')
+
+    job = Job.query.one()
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/jobs/{job.id}')
+    assert (job.type, job.created_by) == ('expenses.export', me.id)
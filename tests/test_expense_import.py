@@ -0,0 +1,97 @@
+import io
+
+import pytest
+
+from app import db
+from app.models import Expense, ExpenseShare
+from app.utils import expense_import
+from app.utils.expense_export import EXPORT_HEADER
+from app.utils.expense_import import MAX_ERRORS, ImportValidationError, import_expenses, read_rows
+
+
+class _Rows:
+    """Như read_rows: duyệt lại được, ghi lại các dòng đã đọc."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.consumed = []
+
+    def __iter__(self):
+        for line_no, row in enumerate(self.lines, 2):
+            self.consumed.append(line_no)
+            yield line_no, list(row)
+
+
+def _rows(lines):
+    return _Rows(lines)
+
+
+def _good(payer, i):
+    return [f'Chi {i}', '1000', 'VND', '', '2026-01-02', '', payer, '']
+
+
+@pytest.fixture
+def group(make_user, make_group):
+    me, mate = make_user('an'), make_user('binh')
+    return make_group(me, [mate]), me
+
+
+def test_import_inserts_in_batches(app, group, monkeypatch):
+    group, me = group
+    monkeypatch.setattr(expense_import, 'BATCH_SIZE', 3)
+    with app.test_request_context():
+        count, total = import_expenses(group, _rows([_good('an', i) for i in range(7)]), me)
+    db.session.commit()
+
+    assert (count, total) == (7, 7000.0)
+    assert Expense.query.filter_by(group_id=group.id).count() == 7
+    assert ExpenseShare.query.count() == 14
+
+
+def test_all_bad_file_stops_at_max_errors(app, group):
+    group, me = group
+    rows = _rows([['x', 'không phải số', 'VND', '', '2026-01-02', '', 'an', '']] * (MAX_ERRORS * 3))
+
+    with pytest.raises(ImportValidationError) as e:
+        import_expenses(group, rows, me)
+
+    assert len(e.value.errors) == MAX_ERRORS
+    assert len(rows.consumed) == MAX_ERRORS
+
+
+def test_late_error_writes_nothing(app, group, monkeypatch):
+    group, me = group
+    monkeypatch.setattr(expense_import, 'BATCH_SIZE', 2)
+    lines = [_good('an', i) for i in range(5)] + [_good('người lạ', 5)]
+
+    with app.test_request_context(), pytest.raises(ImportValidationError) as e:
+        import_expenses(group, _rows(lines), me)
+    db.session.rollback()
+
+    assert e.value.errors == [(7, "'người lạ' không phải thành viên nhóm")]
+    assert Expense.query.count() == 0
+
+
+def test_rates_are_resolved_before_the_first_insert(app, group, monkeypatch):
+    group, me = group
+    monkeypatch.setattr(expense_import, 'BATCH_SIZE', 2)
+    lines = [_good('an', i) for i in range(3)] + [['Vé', '10', 'USD', '', '2026-01-02', '', 'an', '']]
+    seen = []
+
+    def fake_rate(currency, to_currency):
+        seen.append((currency, Expense.query.count()))
+        return 25000.0 if currency == 'USD' else 1.0
+    monkeypatch.setattr(expense_import, 'get_exchange_rate', fake_rate)
+
+    with app.test_request_context():
+        assert import_expenses(group, _rows(lines), me) == (4, 253000.0)
+    assert seen == [('VND', 0), ('USD', 0)]
+
+
+def test_read_rows_can_be_read_twice():
+    body = ','.join(EXPORT_HEADER) + '\nĂn trưa,50000,VND,,2026-01-02,,an,\n'
+    stream = io.BytesIO(body.encode('utf-8-sig'))
+    rows = read_rows(stream, 'chi.csv')
+
+    assert list(rows) == list(rows) == [(2, ['Ăn trưa', '50000', 'VND', '', '2026-01-02', '', 'an', ''])]
+    assert not stream.closed
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Job
+from app.utils.jobs import (HANDLERS, QUEUED, RUNNING, SUCCEEDED, FAILED, enqueue_job, claim_job,
+                            extend_lease, run_job)
+
+
+def _job(job_type='jobs.cleanup', created_by=None, payload=None):
+    job = enqueue_job(job_type, payload, created_by=created_by)
+    db.session.commit()
+    return job.id
+
+
+def test_job_is_claimed_only_once(app):
+    job_id = _job()
+
+    assert claim_job('jobs.cleanup', 'w1', 60) == job_id
+    assert claim_job('jobs.cleanup', 'w2', 60) is None
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.locked_by, job.attempts) == (RUNNING, 'w1', 1)
+
+
+def test_expired_lease_is_claimed_again(app):
+    job_id = _job()
+    assert claim_job('jobs.cleanup', 'w1', 60) == job_id
+
+    # Worker w1 chết: lease hết hạn mà không được gia hạn
+    db.session.get(Job, job_id).locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    assert claim_job('jobs.cleanup', 'w2', 60) == job_id
+    extend_lease([job_id], 'w1', 600)
+    run_job(job_id, 'w1')
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.locked_by, job.attempts) == (RUNNING, 'w2', 2)
+
+
+def test_failed_job_backs_off_then_fails(app, monkeypatch):
+    calls = []
+
+    def boom(payload, job):
+        calls.append(job.attempts)
+        raise ZeroDivisionError
+
+    monkeypatch.setitem(HANDLERS, 'test.boom', (boom, 2))
+    job_id = _job('test.boom')
+
+    claim_job('test.boom', 'w1', 60)
+    run_job(job_id, 'w1')
+    job = db.session.get(Job, job_id)
+    assert job.status == QUEUED
+    assert job.run_after > datetime.utcnow()
+    assert 'ZeroDivisionError' in job.error
+    # Chưa tới run_after thì không ai nhận được
+    assert claim_job('test.boom', 'w1', 60) is None
+
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    claim_job('test.boom', 'w1', 60)
+    run_job(job_id, 'w1')
+
+    job = db.session.get(Job, job_id)
+    assert calls == [1, 2]
+    assert job.status == FAILED
+    assert job.finished_at is not None
+
+
+def test_download_is_owner_only(app, tmp_path, make_user, make_group, login):
+    app.config['JOB_OUTPUT_DIR'] = str(tmp_path / 'jobs')
+    owner, other = make_user('an'), make_user('binh')
+    group = make_group(owner, [other])
+    job_id = _job('expenses.export', owner.id, {"group_id": group.id, "format": "csv"})
+    assert claim_job('expenses.export', 'w1', 60) == job_id
+    run_job(job_id, 'w1')
+    assert db.session.get(Job, job_id).status == SUCCEEDED
+
+    # Mỗi request một app context riêng: current_user lưu trên g của app context
+    with app.app_context():
+        response = login(owner).get(f'/jobs/{job_id}/download')
+        assert response.status_code == 200
+        assert response.data.decode('utf-8-sig').startswith('Tên chi tiêu')
+        response.close()
+
+    for url in (f'/jobs/{job_id}', f'/jobs/{job_id}/status', f'/jobs/{job_id}/download'):
+        with app.app_context():
+            assert login(other).get(url).status_code == 404
@@ -0,0 +1,34 @@
+from app import db
+from app.models import Message, ConversationParticipant
+from app.utils.messaging import rebuild_conversations, send_message, unread_total
+
+
+def test_read_with_blank_up_to_id_marks_everything(make_user, login):
+    me, friend = make_user('an'), make_user('binh')
+    send_message(friend, me.id, 'chào')
+    send_message(friend, me.id, 'khỏe không')
+    db.session.commit()
+    assert unread_total(me.id) == 2
+
+    response = login(me).post(f'/messages/with/{friend.id}/read', data={'up_to_id': ''})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"marked": 2, "unread_total": 0}
+
+
+def test_rebuild_skips_messages_without_both_users(make_user):
+    me, friend = make_user('an'), make_user('binh')
+    db.session.add_all([
+        Message(sender_id=me.id, receiver_id=friend.id, content='a', is_read=False),
+        Message(sender_id=friend.id, receiver_id=me.id, content='b', is_read=False),
+        Message(sender_id=None, receiver_id=me.id, content='hệ thống', is_read=False),
+        Message(sender_id=me.id, receiver_id=None, content='mồ côi', is_read=False),
+        Message(sender_id=me.id, receiver_id=me.id, content='ghi chú', is_read=False),
+    ])
+    db.session.commit()
+
+    assert rebuild_conversations() == 1
+
+    assert Message.query.filter(Message.conversation_id.isnot(None)).count() == 2
+    unread = dict(db.session.query(ConversationParticipant.user_id, ConversationParticipant.unread_count).all())
+    assert unread == {me.id: 1, friend.id: 1}
@@ -0,0 +1,34 @@
+import pytest
+
+from config import Config
+from app import create_app
+
+
+@pytest.fixture
+def metrics_app(tmp_path):
+    class MetricsConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'metrics.db')
+        TESTING = True
+        OUTBOX_DISPATCH_MODE = 'external'
+        METRICS_ENABLED = True
+        METRICS_ALLOWED_IPS = ['10.0.0.0/8']
+        METRICS_TOKEN = 'bí-mật'.encode().hex()
+        DB_REPLICA_URLS = ''
+    return create_app(MetricsConfig)
+
+
+def _get(app, remote_addr, token=None):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return app.test_client().get('/metrics', headers=headers, environ_base={'REMOTE_ADDR': remote_addr})
+
+
+def test_metrics_hidden_from_other_addresses(metrics_app):
+    assert _get(metrics_app, '203.0.113.7').status_code == 404
+    assert _get(metrics_app, '203.0.113.7', token='sai').status_code == 404
+
+
+def test_metrics_for_allowed_network_or_token(metrics_app):
+    assert _get(metrics_app, '10.1.2.3').status_code == 200
+    response = _get(metrics_app, '203.0.113.7', token=metrics_app.config['METRICS_TOKEN'])
+    assert response.status_code == 200
+    assert b'http_requests_total' in response.data
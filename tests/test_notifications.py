@@ -0,0 +1,54 @@
+from app import db
+from app.models import Notification
+from app.utils.notification_counts import add_notifications, unread_count
+
+
+def _notify(user, count):
+    add_notifications([Notification(user_id=user.id, message=f"tb {i}", is_read=False) for i in range(count)])
+    db.session.commit()
+
+
+def test_notifications_data_etag_changes_after_mark_read(make_user, login):
+    me = make_user('toi')
+    _notify(me, 3)
+    client = login(me)
+
+    first = client.get('/auth/notifications_data')
+    etag = first.headers['ETag']
+    assert not any(item['is_read'] for item in first.get_json()['items'])
+    assert client.get('/auth/notifications_data', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.post('/auth/notifications/mark_read', json={}).get_json() == {"marked": 3, "unread": 0}
+    assert unread_count(me.id) == 0
+
+    again = client.get('/auth/notifications_data', headers={'If-None-Match': etag})
+    assert again.status_code == 200
+    assert all(item['is_read'] for item in again.get_json()['items'])
+
+
+def test_notifications_data_since_id_without_news(make_user, login):
+    me = make_user('toi')
+    _notify(me, 2)
+    client = login(me)
+    latest_id = client.get('/auth/notifications_data').get_json()['latest_id']
+    url = f'/auth/notifications_data?since_id={latest_id}'
+
+    # Không có If-None-Match: luôn 200 (không 304 vô điều kiện)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.get_json() == {"items": [], "latest_id": latest_id, "has_more": False}
+
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_stream_over_worker_cap_returns_503(app, make_user, login):
+    from app.utils.notify_hub import hub
+    me = make_user('toi')
+    app.config['NOTIFICATION_STREAM_MAX_CONNECTIONS'] = 1
+    held = hub.subscribe(me.id)
+    try:
+        response = login(me).get('/auth/notifications/stream')
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+    finally:
+        hub.unsubscribe(held)
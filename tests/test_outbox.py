@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Notification, OutboxEvent
+from app.utils.notification_counts import unread_count
+from app.utils.outbox import dispatch_event, dispatch_pending, dispatcher, enqueue
+
+
+def _event(payload='{"message": "tb"}'):
+    evt = OutboxEvent(kind='test', group_id=None, actor_id=None, payload=payload)
+    db.session.add(evt)
+    db.session.commit()
+    return evt.id
+
+
+def test_failing_event_does_not_block_the_batch(app):
+    bad = _event('{not json')
+    good = _event()
+
+    assert dispatch_pending() == 1
+
+    assert db.session.get(OutboxEvent, good).dispatched_at is not None
+    bad_evt = db.session.get(OutboxEvent, bad)
+    assert bad_evt.dispatched_at is None
+    assert bad_evt.attempts == 1
+
+
+def test_thread_mode_starts_dispatcher_on_first_request(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(dispatcher, '_thread', None)
+    monkeypatch.setattr(dispatcher, '_ensure_thread', lambda: started.append(True))
+    app.config['OUTBOX_DISPATCH_MODE'] = 'thread'
+
+    app.test_client().get('/auth/login')
+
+    assert started == [True]
+
+
+def test_redispatching_a_dispatched_event_changes_nothing(make_user, make_group):
+    actor, member = make_user('an'), make_user('binh')
+    group = make_group(actor, [member])
+    enqueue('expense', group.id, actor.id, message='an thêm chi tiêu')
+    db.session.commit()
+    assert dispatch_pending() == 1
+
+    # Dispatcher chậm chân còn giữ sự kiện đọc từ trước khi bị phát
+    evt = OutboxEvent.query.one()
+    assert dispatch_event(evt) is False
+    db.session.commit()
+
+    assert Notification.query.filter_by(user_id=member.id).count() == 1
+    assert unread_count(member.id) == 1
+
+
+def _group_event(make_user, make_group):
+    actor, b, c = make_user('an'), make_user('binh'), make_user('chi')
+    group = make_group(actor, [b, c])
+    evt = enqueue('expense', group.id, actor.id, message='an thêm chi tiêu')
+    db.session.commit()
+    return evt.id, actor, [b, c]
+
+
+def test_event_retried_after_crash_notifies_each_member_once(make_user, make_group):
+    event_id, actor, members = _group_event(make_user, make_group)
+
+    # Dispatcher chết sau khi fan-out, trước khi commit
+    dispatch_event(db.session.get(OutboxEvent, event_id))
+    db.session.rollback()
+    assert db.session.get(OutboxEvent, event_id).dispatched_at is None
+
+    assert dispatch_pending() == 1
+    assert dispatch_pending() == 0
+
+    for m in members:
+        assert Notification.query.filter_by(user_id=m.id, event_id=event_id).count() == 1
+        assert unread_count(m.id) == 1
+    assert Notification.query.filter_by(user_id=actor.id).count() == 0
+
+
+def test_fan_out_skips_members_already_notified(make_user, make_group):
+    event_id, _, (b, c) = _group_event(make_user, make_group)
+    db.session.add(Notification(user_id=b.id, message='đã có', event_id=event_id, is_read=False))
+    db.session.commit()
+
+    assert dispatch_pending() == 1
+
+    assert Notification.query.filter_by(event_id=event_id).count() == 2
+    assert Notification.query.filter_by(user_id=c.id, event_id=event_id).count() == 1
+
+
+def test_one_notification_per_event_and_user_is_enforced(make_user, make_group):
+    event_id, _, (b, _c) = _group_event(make_user, make_group)
+    assert dispatch_pending() == 1
+
+    db.session.add(Notification(user_id=b.id, message='trùng', event_id=event_id))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
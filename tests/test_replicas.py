@@ -0,0 +1,80 @@
+import pytest
+
+from config import Config
+from app import create_app, db
+from app.models import Job
+from app.utils.jobs import enqueue_job, SUCCEEDED
+from app.utils.replicas import STICKY_KEY
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Primary và một replica SQLite; replica chỉ thấy dữ liệu khi `flask replica sync`."""
+    # init_app tạo metadata cho mỗi bind trên đối tượng db dùng chung: không để
+    # bind replica_0 lọt sang các test khác
+    monkeypatch.setattr(db, 'metadatas', dict(db.metadatas))
+
+    class ReplicaConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'primary.db')
+        DB_REPLICA_URLS = 'sqlite:///' + str(tmp_path / 'replica.db')
+        TESTING = True
+        OUTBOX_DISPATCH_MODE = 'external'
+        METRICS_ENABLED = False
+        USER_CACHE_TTL = 0
+        EXCHANGE_RATE_PROVIDERS = ['fixed']
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _sync(app):
+    assert app.test_cli_runner().invoke(args=['replica', 'sync']).exit_code == 0
+
+
+def _status(app, client, job_id):
+    # Mỗi request một app context riêng: cờ định tuyến nằm trên g
+    with app.app_context():
+        return client.get(f'/jobs/{job_id}/status').get_json()['status']
+
+
+def test_read_after_write_goes_to_primary(app, make_user, login):
+    me = make_user('an')
+    job = enqueue_job('jobs.cleanup', created_by=me.id)
+    db.session.commit()
+    job_id = job.id
+    _sync(app)
+    db.session.get(Job, job_id).status = SUCCEEDED
+    db.session.commit()
+
+    client = login(me)
+    # Replica chưa đồng bộ: view read-only còn thấy trạng thái cũ
+    assert _status(app, client, job_id) == 'queued'
+
+    with app.app_context():
+        assert client.post('/auth/notifications/mark_read', json={}).status_code == 200
+    with client.session_transaction() as session:
+        assert STICKY_KEY in session
+    assert _status(app, client, job_id) == SUCCEEDED
+
+    # Hết DB_REPLICA_STICKY_SECONDS: đọc lại từ replica
+    with client.session_transaction() as session:
+        session[STICKY_KEY] -= app.config['DB_REPLICA_STICKY_SECONDS'] + 1
+    assert _status(app, client, job_id) == 'queued'
+
+
+def test_requests_without_writes_are_not_sticky(app, make_user, login):
+    me = make_user('an')
+    job = enqueue_job('jobs.cleanup', created_by=me.id)
+    db.session.commit()
+    _sync(app)
+
+    client = login(me)
+    _status(app, client, job.id)
+
+    with client.session_transaction() as session:
+        assert STICKY_KEY not in session
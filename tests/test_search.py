@@ -0,0 +1,140 @@
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models import Expense
+from app.utils import search
+from app.utils.search import (search_users, expense_match, min_query_length, reset_backend_cache,
+                              SQLITE_EXPENSE_DROP, TIER_FRIEND, TIER_GROUP, TIER_OTHER)
+
+
+def _tiers(results):
+    return {user.username: tier for user, tier in results}
+
+
+def test_friend_with_diacritics_found_by_unaccented_query(make_user, befriend):
+    me = make_user('toi')
+    friend = make_user('Nguyễn Văn An', 'an@example.com')
+    make_user('Nguyen Thi Binh', 'binh@example.com')
+    befriend(me, friend)
+
+    results, _ = search_users(me.id, 'nguyen')
+
+    assert _tiers(results) == {'Nguyễn Văn An': TIER_FRIEND, 'Nguyen Thi Binh': TIER_OTHER}
+    assert results[0][0].id == friend.id
+
+
+def test_underscore_username_matches_inner_word_in_every_tier(make_user, befriend, make_group):
+    me = make_user('toi')
+    friend = make_user('tran_minh', 'tm@example.com')
+    mate = make_user('le_minh', 'lm@example.com')
+    make_user('vo_minh', 'vm@example.com')
+    befriend(me, friend)
+    make_group(me, [mate])
+
+    results, _ = search_users(me.id, 'minh')
+
+    assert _tiers(results) == {'tran_minh': TIER_FRIEND, 'le_minh': TIER_GROUP, 'vo_minh': TIER_OTHER}
+
+
+def test_keyset_pages_cover_every_match_once(make_user, befriend, make_group):
+    me = make_user('toi')
+    users = [make_user(f'pham {i}', f'p{i}@example.com') for i in range(12)]
+    for u in users[:3]:
+        befriend(me, u)
+    make_group(me, users[3:6])
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = search_users(me.id, 'pham', cursor=cursor, limit=5)
+        seen += [(u.id, tier) for u, tier in page]
+        if cursor is None:
+            break
+
+    assert sorted(i for i, _ in seen) == sorted(u.id for u in users)
+    assert [tier for _, tier in seen] == sorted(tier for _, tier in seen)
+
+
+def test_short_query_returns_nothing(make_user):
+    me = make_user('toi')
+    make_user('an', 'an@example.com')
+    assert search_users(me.id, 'a') == ([], None)
+
+
+def _expense(group, user, title, note=None):
+    expense = Expense(title=title, note=note, amount=1000, group_id=group.id,
+                      user_id=user.id, created_by=user.id)
+    db.session.add(expense)
+    db.session.commit()
+    return expense
+
+
+def _found(group, query):
+    return {e.title for e in Expense.query.filter(Expense.group_id == group.id,
+                                                  expense_match(group.id, query)).all()}
+
+
+@pytest.fixture
+def expenses(make_user, make_group):
+    me = make_user('toi')
+    mine, other = make_group(me), make_group(me)
+    _expense(mine, me, 'Khách sạn Đà Nẵng', 'đặt phòng 2 đêm')
+    _expense(mine, me, 'Ăn tối', 'hải sản Đà Nẵng')
+    _expense(mine, me, 'Vé xe', 'Hội An')
+    _expense(other, me, 'Khách sạn Đà Lạt')
+    return mine, other
+
+
+def _drop_expense_index():
+    for statement in SQLITE_EXPENSE_DROP:
+        db.session.execute(text(statement))
+    db.session.commit()
+    reset_backend_cache()
+
+
+def test_expense_search_folds_diacritics_and_stays_in_group(expenses):
+    mine, other = expenses
+    assert _found(mine, 'da nang') == {'Khách sạn Đà Nẵng', 'Ăn tối'}
+    assert _found(mine, 'khach') == {'Khách sạn Đà Nẵng'}
+    assert _found(mine, 'dat phong') == {'Khách sạn Đà Nẵng'}
+    assert _found(other, 'khach san') == {'Khách sạn Đà Lạt'}
+
+
+def test_expense_search_follows_updates(expenses):
+    mine, other = expenses
+    expense = Expense.query.filter_by(title='Vé xe').one()
+    expense.group_id = other.id
+    db.session.commit()
+    assert _found(mine, 'hoi an') == set()
+    assert _found(other, 'hoi an') == {'Vé xe'}
+
+
+@pytest.mark.parametrize('query', ['da nang', 'khach', 'dat phong', 'an', 'ang', 'hoi'])
+def test_expense_like_fallback_matches_index(expenses, query):
+    mine, _ = expenses
+    indexed = _found(mine, query)
+    _drop_expense_index()
+    assert _found(mine, query) == indexed
+
+
+def test_d_with_stroke_is_folded_in_user_search(make_user):
+    me = make_user('toi')
+    duc = make_user('Đức Anh', 'da@example.com')
+
+    assert [u.id for u, _ in search_users(me.id, 'duc')[0]] == [duc.id]
+    assert [u.id for u, _ in search_users(me.id, 'Đức')[0]] == [duc.id]
+
+    duc.username = 'Đăng Khoa'
+    db.session.commit()
+    assert search_users(me.id, 'duc') == ([], None)
+    assert [u.id for u, _ in search_users(me.id, 'dang')[0]] == [duc.id]
+
+
+def test_trigram_backend_needs_a_three_letter_word(make_user, monkeypatch):
+    me = make_user('toi')
+    make_user('an', 'an@example.com')
+    monkeypatch.setitem(search._backend_cache, (db.engine, 'user_search'), 'trgm')
+
+    assert min_query_length() == 3
+    assert search_users(me.id, 'an') == ([], None)
+    assert search_users(me.id, 'an b') == ([], None)
@@ -0,0 +1,70 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from app.utils.settlement import settle, settle_greedy, settle_optimal, to_minor
+
+
+def _apply(balances, transfers):
+    left = dict(balances)
+    for frm, to, amount in transfers:
+        assert amount > 0
+        left[frm] += amount
+        left[to] -= amount
+    return left
+
+
+def _min_transfers(amounts):
+    """Vét cạn: n - số nhóm con rời nhau tổng bằng 0 nhiều nhất."""
+    amounts = [a for a in amounts if a]
+    if not amounts:
+        return 0
+    first, rest = amounts[0], amounts[1:]
+    best = None
+    for size in range(len(rest) + 1):
+        for combo in combinations(range(len(rest)), size):
+            if first + sum(rest[i] for i in combo) == 0:
+                others = [rest[i] for i in range(len(rest)) if i not in combo]
+                cost = size + _min_transfers(others)
+                best = cost if best is None else min(best, cost)
+    return best
+
+
+def _random_balances(rng, n):
+    values = [rng.choice([-3, -2, -1, 1, 2, 3]) * 1000 for _ in range(n - 1)]
+    values.append(-sum(values))
+    return {uid: v for uid, v in enumerate(values, 1)}
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_optimal_is_minimal_and_settles_everything(seed):
+    balances = _random_balances(random.Random(seed), random.Random(seed).randint(2, 7))
+
+    transfers = settle_optimal(balances)
+
+    assert all(v == 0 for v in _apply(balances, transfers).values())
+    assert len(transfers) == _min_transfers(list(balances.values()))
+    assert len(transfers) <= len(settle_greedy(balances))
+
+
+def test_optimal_beats_greedy():
+    # {3: -3, 4: 3} tự cân bằng: tối ưu 4 lần chuyển, tham lam ghép lệch cần 5
+    balances = {1: -8, 2: 6, 3: -3, 4: 3, 5: 4, 6: -2}
+    greedy, optimal = settle_greedy(balances), settle_optimal(balances)
+
+    assert (len(greedy), len(optimal)) == (5, 4)
+    assert all(v == 0 for v in _apply(balances, optimal).values())
+    assert settle(balances) == optimal
+
+
+def test_settle_drops_rounding_dust():
+    # Ba người chia đều 100.000đ: phần chia 33.333,33 để lại dư 0,01đ
+    share = to_minor(round(100000 / 3, 2))
+    balances = {1: to_minor(100000) - share, 2: -share, 3: -share}
+    assert sum(balances.values()) != 0
+
+    transfers = settle(balances, tolerance=to_minor(1))
+
+    assert sorted((frm, to) for frm, to, _ in transfers) == [(2, 1), (3, 1)]
+    assert all(abs(v) <= to_minor(1) for v in _apply(balances, transfers).values())
@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import User
+from app.utils.user_cache import user_cache
+
+
+@pytest.fixture
+def cache(app, monkeypatch):
+    monkeypatch.setattr(user_cache, 'ttl', 60)
+    monkeypatch.setattr(user_cache, 'maxsize', 2)
+    user_cache.invalidate()
+    yield user_cache
+    user_cache.invalidate()
+
+
+@pytest.fixture
+def selects(app):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _fresh_load(user_id):
+    # Như một request mới: session rỗng, chỉ còn cache của tiến trình
+    db.session.remove()
+    return user_cache.load(user_id)
+
+
+def test_cached_user_is_loaded_without_query(cache, selects, make_user):
+    uid = make_user('an').id
+    _fresh_load(uid)
+    selects.clear()
+
+    user = _fresh_load(uid)
+
+    assert selects == []
+    assert (user.id, user.username) == (uid, 'an')
+    assert user in db.session
+
+
+def test_editing_user_invalidates_cached_copy(cache, make_user):
+    uid = make_user('an').id
+    _fresh_load(uid)
+    user = _fresh_load(uid)  # bản lấy từ cache, gắn lại bằng merge
+    assert cache.get(uid) is not None
+
+    user.username = 'an_moi'
+    db.session.commit()
+
+    assert cache.get(uid) is None
+    assert _fresh_load(uid).username == 'an_moi'
+
+
+def test_copy_cached_before_commit_is_dropped_after_commit(cache, make_user):
+    uid = make_user('an').id
+    user = _fresh_load(uid)
+    user.email = 'moi@example.com'
+    db.session.flush()
+
+    # Request khác nạp lại bản cũ trong lúc transaction ghi chưa commit
+    cache.put(User(id=uid, username='an', email='user1@example.com', password_hash='x'))
+    db.session.commit()
+
+    assert cache.get(uid) is None
+
+
+def test_least_recently_used_user_is_evicted(cache, make_user):
+    a, b, c = (make_user().id for _ in range(3))
+    _fresh_load(a)
+    _fresh_load(b)
+    _fresh_load(a)
+    _fresh_load(c)
+
+    assert cache.get(b) is None
+    assert cache.get(a) is not None
+    assert cache.get(c) is not None